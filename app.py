@@ -1,40 +1,116 @@
 import os
 import re
+import csv
+import atexit
+import json
+import time
+import hashlib
+import secrets
+import difflib
+import gzip
+import pickle
+import io
+import shutil
+import tempfile
+import zipfile
 import sqlite3
+import threading
+import signal
+import socket
+import multiprocessing
 import mimetypes
 import urllib.parse
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime, timedelta
 from functools import wraps
+from contextlib import closing, contextmanager
+from collections import OrderedDict, deque
+import click
+from markupsafe import Markup, escape
 from flask import (
-    Flask, render_template, request, redirect, url_for, make_response,
-    session, send_file, send_from_directory, flash, jsonify, Response
+    Flask, Request, render_template, request, redirect, url_for, make_response,
+    session, send_file, send_from_directory, flash, get_flashed_messages, jsonify, Response, g, stream_with_context,
+    has_request_context, before_render_template, template_rendered
 )
+from jinja2 import FileSystemBytecodeCache
+try:
+    from PIL import Image, ImageOps  # 썸네일 생성 (없으면 원본 이미지 사용)
+except ImportError:
+    Image = ImageOps = None
+try:
+    import openpyxl  # 엑셀 내보내기/가져오기 (없으면 CSV만)
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:
+    openpyxl = InvalidFileException = None
+try:
+    import xlrd  # 예전 .xls 가져오기
+except ImportError:
+    xlrd = None
+try:
+    import pandas as pd  # 통계 주/월 집계
+except ImportError:
+    pd = None
+try:
+    import brotli  # 응답/정적 파일 br 압축 (없으면 gzip만)
+except ImportError:
+    brotli = None
 app = Flask(__name__, template_folder="templates")
-app.secret_key = "gaja_yonsei_secret_key"
 
 # -------------------------------
-# 업로드 폴더 및 DB 경로 설정 (Persistent Disk)
+# 설정 (환경변수 기본값 → create_app(config)로 덮어쓰기)
 # -------------------------------
-
+# import 시에는 설정값만 읽고, 폴더 생성/DB 마이그레이션은 create_app()에서 한 번만 실행
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Render Persistent Disk 경로
-DATA_DIR = "/var/data"
-DB_PATH = os.path.join(DATA_DIR, "reports.db")
-UPLOAD_FOLDER = os.path.join(DATA_DIR, "uploads")
+DEPT_LIST = ["외래", "병동", "수술실", "상담실"]
+# 보고서 카테고리 (form.html / edit.html 선택지와 동일)
+REPORT_CATEGORIES = ["일 반", "인사행정", "사건보고", "구매요청", "요청사항", "장비수리", "특이사항", "익일업무"]
+
+DEFAULT_SECRET_KEY = "gaja_yonsei_secret_key"
+# 기본 계정 (USERS_FILE 환경변수로 JSON 파일을 지정하면 대체)
+DEFAULT_USERS = {
+    "gajakjh":   {"password": "1234", "department": "관리자"},
+    "gajaopd":   {"password": "1234", "department": "외래"},
+    "gajaward":  {"password": "1234", "department": "병동"},
+    "gajaor":    {"password": "1234", "department": "수술실"},
+    "gajacoordi":{"password": "1234", "department": "상담실"},
+}
+
 
-# 폴더 생성 (없으면 자동 생성)
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+def data_paths(data_dir):
+    """데이터 폴더 기준 DB/업로드 경로"""
+    return {
+        "DATA_DIR": data_dir,
+        "DB_PATH": os.path.join(data_dir, "reports.db"),
+        "UPLOAD_FOLDER": os.path.join(data_dir, "uploads"),
+        "RENDER_CACHE_PATH": os.path.join(data_dir, "render_cache.db"),
+        "TEMPLATE_CACHE_DIR": os.path.join(data_dir, "template_cache"),
+        # 백업은 가능하면 다른 디스크에 (BACKUP_DIR 환경변수)
+        "BACKUP_DIR": os.environ.get("BACKUP_DIR") or os.path.join(data_dir, "backups"),
+    }
 
-# 부서별 하위 폴더도 자동 생성
-DEPT_LIST = ["외래", "병동", "수술실", "상담실"]
-for dept in ["관리자", *DEPT_LIST]:
-    os.makedirs(os.path.join(UPLOAD_FOLDER, dept), exist_ok=True)
 
-# Flask 설정 등록
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+def load_users(path):
+    """{아이디: {"password": ..., "department": ...}} JSON 파일 읽기 (경로가 없으면 기본 계정)"""
+    if not path:
+        return dict(DEFAULT_USERS)
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+# Render Persistent Disk 경로 (로컬 테스트/벤치마크 시 DATA_DIR 환경변수로 변경 가능)
+app.config.update(data_paths(os.environ.get("DATA_DIR", "/var/data")))
+app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", DEFAULT_SECRET_KEY)
+app.config["USERS"] = load_users(os.environ.get("USERS_FILE"))
+
+# 업로드 용량 제한 (MB, 환경변수로 변경 가능)
+# - 요청 전체: 초과 시 본문을 읽기 전에 413
+# - 파일 1개: 스트리밍 저장 중 초과하는 순간 중단 후 413
+MAX_UPLOAD_FILE_MB = int(os.environ.get("MAX_UPLOAD_FILE_MB", "100"))
+MAX_UPLOAD_REQUEST_MB = int(os.environ.get("MAX_UPLOAD_REQUEST_MB", "300"))
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_REQUEST_MB * 1024 * 1024
+app.config["MAX_UPLOAD_FILE_SIZE"] = MAX_UPLOAD_FILE_MB * 1024 * 1024
 
 # =========================
 # 🔹 파일명 정제 함수 (한글·특수문자 허용 버전)
@@ -49,21 +125,151 @@ def clean_filename(filename: str) -> str:
 # =========================
 # DB 연결 및 초기화
 # =========================
-def get_db():
-    """DB 연결 및 자동 생성"""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(DB_PATH):
-        print("⚙️ reports.db not found. Creating new persistent database...")
+# SQLite 연결 설정 (연결을 새로 만들 때 1회만 적용)
+# - journal_mode=WAL은 DB 파일에 기록되는 설정이라 init_db에서 한 번만 지정
+# - WAL + synchronous=NORMAL: 읽기가 쓰기를 막지 않고, 커밋마다 fsync하지 않음
+DB_BUSY_TIMEOUT_MS = 5000
+DB_PRAGMAS = [
+    f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",        # ON DELETE CASCADE 적용
+    "PRAGMA cache_size = -16000",      # 약 16MB 페이지 캐시
+    "PRAGMA mmap_size = 134217728",    # 128MB 메모리 맵 읽기
+    "PRAGMA temp_store = MEMORY",
+]
+
+_db_ready = False
+_local = threading.local()
+
+
+def connect_db():
+    """설정(PRAGMA)이 적용된 새 연결 생성 (요청 밖 스크립트/CLI에서도 사용)"""
+    if not _db_ready:
+        # create_app()을 거치지 않은 경우(flask CLI, app:app)에만 여기서 1회 초기화
         init_db()
-        print("✅ reports.db created successfully at /var/data")
-    conn = sqlite3.connect(DB_PATH)
+    factory = InstrumentedConnection if app.config["METRICS_ENABLED"] else sqlite3.Connection
+    conn = sqlite3.connect(app.config["DB_PATH"], timeout=DB_BUSY_TIMEOUT_MS / 1000, factory=factory)
     conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _thread_connection():
+    """스레드(워커)별로 유지되는 연결 반환 (gunicorn fork 이후에는 새로 연결)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.path != app.config["DB_PATH"]:
+        conn = connect_db()
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.path = app.config["DB_PATH"]
     return conn
 
 
+def _discard_thread_connection():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def get_db():
+    """
+    현재 요청에서 사용할 DB 연결 (flask.g에 보관)
+    - 연결은 스레드별로 재사용되며, 요청 종료 시 release_db()가 반납 처리
+    - 라우트에서 conn.close()를 호출하지 않는다
+    """
+    if "db" not in g:
+        g.db = _thread_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    """요청 종료 시 연결 반납 (커밋되지 않은 트랜잭션은 롤백, 오류 발생 시 연결 폐기)"""
+    conn = g.pop("db", None)
+    if conn is None:
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        exc = exc or True
+    if exc is not None:
+        _discard_thread_connection()
+
+
+def init_data_dirs():
+    """데이터/업로드 폴더 생성 (부서별 기존 폴더 + 첨부파일 저장소 임시 폴더)"""
+    upload_folder = app.config["UPLOAD_FOLDER"]
+    os.makedirs(app.config["DATA_DIR"], exist_ok=True)
+    for dept in ["관리자", *DEPT_LIST]:
+        os.makedirs(os.path.join(upload_folder, dept), exist_ok=True)
+    os.makedirs(os.path.join(upload_folder, STORE_DIR, "tmp"), exist_ok=True)
+    os.makedirs(app.config["TEMPLATE_CACHE_DIR"], exist_ok=True)
+
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    """폴더 생성 + 스키마 마이그레이션 적용 + 검색 색인 준비 (여러 번 호출해도 안전)"""
+    global _db_ready
+    init_data_dirs()
+    db_path = app.config["DB_PATH"]
+    if not os.path.exists(db_path):
+        print("⚙️ reports.db not found. Creating new persistent database...")
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrate(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        ensure_search_index(conn)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    _db_ready = True
+
+
+@contextmanager
+def write_transaction(conn, undo=None):
+    """
+    BEGIN IMMEDIATE ~ COMMIT 쓰기 트랜잭션 (예외 발생 시 ROLLBACK)
+    - 시작 시점에 쓰기 잠금을 잡으므로 트랜잭션 안에서 읽은 값이 커밋 전까지 바뀌지 않음
+    - 다른 쓰기 트랜잭션이 진행 중이면 busy_timeout 동안 대기
+    - undo: 트랜잭션 안에서 한 DB 밖 작업(저장소 파일 생성 등)을 되돌릴 함수 목록
+      → ROLLBACK 직전(쓰기 잠금을 잡은 채로) 실행
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        for fn in reversed(undo or []):
+            try:
+                fn()
+            except OSError as e:
+                print(f"⚠️ Rollback cleanup failed: {e}")
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def allocate_local_id(cur, department):
+    """부서별 다음 순번(local_id) 발급 (write_transaction 안에서 호출, 롤백 시 번호도 함께 취소)"""
+    return cur.execute("""
+        INSERT INTO department_counters (department, last_local_id) VALUES (?, 1)
+        ON CONFLICT(department) DO UPDATE SET last_local_id = last_local_id + 1
+        RETURNING last_local_id
+    """, (department,)).fetchone()[0]
+
+
+# =========================
+# 🔧 DB 스키마 마이그레이션 (schema_version)
+# =========================
+# 새 스키마 변경은 MIGRATIONS 끝에 (번호, 설명, 함수)로 추가한다.
+# 이미 적용된 번호는 다시 실행하지 않으며, 번호마다 하나의 트랜잭션으로 적용된다.
+def _migration_base_tables(conn):
+    """최초 테이블 생성 + 구버전 DB의 report_files.original_name 컬럼 보강"""
     conn.execute("""
         CREATE TABLE IF NOT EXISTS reports (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -92,8 +298,556 @@ def init_db():
             original_name TEXT
         )
     """)
-    conn.commit()
-    conn.close()
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(report_files)")]
+    if "original_name" not in columns:
+        conn.execute("ALTER TABLE report_files ADD COLUMN original_name TEXT")
+
+
+def _rebuild_table(conn, table, create_sql, columns):
+    """SQLite는 제약조건 변경을 지원하지 않으므로 새 테이블로 복사 후 교체 (AUTOINCREMENT 값 유지)"""
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    conn.execute(create_sql.format(name=f"{table}_new"))
+    conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if seq:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table)
+        )
+
+
+def _migration_constraints(conn):
+    """UNIQUE(department, local_id) + ON DELETE CASCADE 외래키 적용"""
+    # 부서 내 중복 local_id는 해당 부서의 다음 번호로 재부여 (먼저 작성된 보고서가 번호 유지)
+    dupes = conn.execute("""
+        SELECT id, department FROM reports r
+        WHERE local_id IS NULL OR EXISTS (
+            SELECT 1 FROM reports o
+            WHERE o.department = r.department AND o.local_id = r.local_id AND o.id < r.id
+        )
+        ORDER BY id
+    """).fetchall()
+    for report_id, department in dupes:
+        conn.execute("""
+            UPDATE reports SET local_id = (
+                SELECT COALESCE(MAX(local_id), 0) + 1 FROM reports WHERE department = ?
+            ) WHERE id = ?
+        """, (department, report_id))
+    if dupes:
+        print(f"⚠️ Renumbered {len(dupes)} reports with duplicate local_id")
+
+    # 이미 삭제된 보고서를 가리키는 내용/첨부 행 정리 (외래키 검사 통과용)
+    for table in ("report_contents", "report_files"):
+        removed = conn.execute(
+            f"DELETE FROM {table} WHERE report_id NOT IN (SELECT id FROM reports)"
+        ).rowcount
+        if removed:
+            print(f"⚠️ Removed {removed} orphan rows from {table}")
+
+    _rebuild_table(conn, "reports", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            local_id INTEGER NOT NULL,
+            title TEXT,
+            date TEXT,
+            department TEXT NOT NULL,
+            created_at TEXT,
+            UNIQUE(department, local_id)
+        )
+    """, "id, local_id, title, date, department, created_at")
+    _rebuild_table(conn, "report_contents", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+            category TEXT,
+            content TEXT
+        )
+    """, "id, report_id, category, content")
+    _rebuild_table(conn, "report_files", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+            department TEXT,
+            filename TEXT,
+            original_name TEXT
+        )
+    """, "id, report_id, department, filename, original_name")
+
+    problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if problems:
+        raise sqlite3.IntegrityError(f"foreign key check failed: {problems[:5]}")
+
+
+def _migration_indexes(conn):
+    """목록/상세/첨부파일 조회용 보조 인덱스"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_department_date ON reports(department, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_date ON reports(date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_contents_report_id ON report_contents(report_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_files_report_id ON report_files(report_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_files_department_filename ON report_files(department, filename)")
+
+
+def _migration_department_counters(conn):
+    """부서별 순번 카운터 테이블 (MAX(local_id) 조회 대신 원자적 증가)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS department_counters (
+            department TEXT PRIMARY KEY,
+            last_local_id INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO department_counters (department, last_local_id)
+        SELECT department, MAX(local_id) FROM reports GROUP BY department
+    """)
+
+
+def _migration_content_hash(conn):
+    """첨부파일 내용 해시 (썸네일 캐시 키)"""
+    conn.execute("ALTER TABLE report_files ADD COLUMN content_hash TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_files_content_hash ON report_files(content_hash)")
+
+
+def _migration_attachment_blobs(conn):
+    """해시 저장소 참조 수 테이블 + report_files 트리거 (기존 해시 값으로 초기화)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS attachment_blobs (
+            content_hash TEXT PRIMARY KEY,
+            refcount INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO attachment_blobs (content_hash, refcount)
+        SELECT content_hash, COUNT(*) FROM report_files
+        WHERE content_hash IS NOT NULL
+        GROUP BY content_hash
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_files_blob_ai AFTER INSERT ON report_files
+        WHEN new.content_hash IS NOT NULL BEGIN
+            INSERT INTO attachment_blobs (content_hash, refcount) VALUES (new.content_hash, 1)
+            ON CONFLICT(content_hash) DO UPDATE SET refcount = refcount + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_files_blob_ad AFTER DELETE ON report_files
+        WHEN old.content_hash IS NOT NULL BEGIN
+            UPDATE attachment_blobs SET refcount = refcount - 1 WHERE content_hash = old.content_hash;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_files_blob_au AFTER UPDATE OF content_hash ON report_files
+        WHEN old.content_hash IS NOT new.content_hash BEGIN
+            UPDATE attachment_blobs SET refcount = refcount - 1 WHERE content_hash = old.content_hash;
+            INSERT INTO attachment_blobs (content_hash, refcount)
+            SELECT new.content_hash, 1 WHERE new.content_hash IS NOT NULL
+            ON CONFLICT(content_hash) DO UPDATE SET refcount = refcount + 1;
+        END
+    """)
+
+
+def _migration_report_stats(conn):
+    """부서 × 카테고리 × 날짜별 내용 건수 집계 테이블 + 작성/수정/삭제 시 증감 트리거"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS report_stats (
+            department TEXT NOT NULL,
+            category TEXT NOT NULL,
+            date TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (date, department, category)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO report_stats (department, category, date, count)
+        SELECT r.department, c.category, r.date, COUNT(*)
+        FROM report_contents c JOIN reports r ON r.id = c.report_id
+        GROUP BY r.department, c.category, r.date
+    """)
+    # 내용 추가/삭제/변경
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_contents_stats_ai AFTER INSERT ON report_contents BEGIN
+            INSERT INTO report_stats (department, category, date, count)
+            SELECT department, new.category, date, 1 FROM reports WHERE id = new.report_id
+            ON CONFLICT(date, department, category) DO UPDATE SET count = count + 1;
+        END
+    """)
+    # 보고서 삭제(CASCADE) 중에는 reports 행이 이미 없으므로 아래 두 트리거는 아무 일도 하지 않고
+    # reports_stats_bd가 보고서 단위로 한 번에 차감한다.
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_contents_stats_ad AFTER DELETE ON report_contents BEGIN
+            UPDATE report_stats SET count = count - 1
+            WHERE category = old.category
+              AND (department, date) = (SELECT department, date FROM reports WHERE id = old.report_id);
+            DELETE FROM report_stats
+            WHERE category = old.category AND count <= 0
+              AND (department, date) = (SELECT department, date FROM reports WHERE id = old.report_id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS report_contents_stats_au AFTER UPDATE OF category, report_id ON report_contents BEGIN
+            UPDATE report_stats SET count = count - 1
+            WHERE category = old.category
+              AND (department, date) = (SELECT department, date FROM reports WHERE id = old.report_id);
+            DELETE FROM report_stats
+            WHERE category = old.category AND count <= 0
+              AND (department, date) = (SELECT department, date FROM reports WHERE id = old.report_id);
+            INSERT INTO report_stats (department, category, date, count)
+            SELECT department, new.category, date, 1 FROM reports WHERE id = new.report_id
+            ON CONFLICT(date, department, category) DO UPDATE SET count = count + 1;
+        END
+    """)
+    # 보고서 삭제/부서·날짜 변경: 그 보고서 내용 전체를 카테고리별로 옮김
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS reports_stats_bd BEFORE DELETE ON reports BEGIN
+            UPDATE report_stats SET count = count - (
+                SELECT COUNT(*) FROM report_contents c
+                WHERE c.report_id = old.id AND c.category = report_stats.category
+            )
+            WHERE department = old.department AND date = old.date
+              AND category IN (SELECT category FROM report_contents WHERE report_id = old.id);
+            DELETE FROM report_stats WHERE department = old.department AND date = old.date AND count <= 0;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS reports_stats_au AFTER UPDATE OF department, date ON reports
+        WHEN old.department IS NOT new.department OR old.date IS NOT new.date BEGIN
+            UPDATE report_stats SET count = count - (
+                SELECT COUNT(*) FROM report_contents c
+                WHERE c.report_id = old.id AND c.category = report_stats.category
+            )
+            WHERE department = old.department AND date = old.date
+              AND category IN (SELECT category FROM report_contents WHERE report_id = old.id);
+            DELETE FROM report_stats WHERE department = old.department AND date = old.date AND count <= 0;
+            INSERT INTO report_stats (department, category, date, count)
+            SELECT new.department, category, new.date, COUNT(*) FROM report_contents
+            WHERE report_id = new.id GROUP BY category
+            ON CONFLICT(date, department, category) DO UPDATE SET count = count + excluded.count;
+        END
+    """)
+
+
+def _migration_jobs(conn):
+    """백그라운드 작업 큐 (업로드 후처리/파일 삭제)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',   -- queued / running / done / failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after REAL NOT NULL,                 -- 이 시각(unix time) 이후 실행
+            locked_by TEXT,
+            locked_at REAL,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after)")
+
+
+def _migration_audit_events(conn):
+    """작성/수정/삭제/다운로드 감사 로그 (추가만 가능, 수정·삭제는 트리거로 차단)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS audit_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            occurred_at TEXT NOT NULL,
+            action TEXT NOT NULL,        -- create / edit / delete / restore / purge / delete_file / download
+            username TEXT,
+            user_department TEXT,        -- 작업한 사용자의 부서
+            department TEXT,             -- 대상 보고서 부서
+            report_id INTEGER,           -- 보고서 삭제 후에도 남도록 외래키 없음
+            title TEXT,
+            files TEXT NOT NULL DEFAULT '[]',
+            detail TEXT,
+            source TEXT NOT NULL DEFAULT 'app'
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_occurred ON audit_events(occurred_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_user ON audit_events(username, occurred_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_report ON audit_events(report_id)")
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS audit_events_no_{event.lower()} BEFORE {event} ON audit_events
+            BEGIN
+                SELECT RAISE(ABORT, 'audit_events is append-only');
+            END
+        """)
+
+
+# 휴지통 보고서(deleted_at 있음)는 통계에서 빠지도록 집계 트리거를 다시 만든다.
+REPORT_STATS_SUBTRACT_SQL = """
+    UPDATE report_stats SET count = count - (
+        SELECT COUNT(*) FROM report_contents c
+        WHERE c.report_id = old.id AND c.category = report_stats.category
+    )
+    WHERE department = old.department AND date = old.date
+      AND category IN (SELECT category FROM report_contents WHERE report_id = old.id);
+    DELETE FROM report_stats WHERE department = old.department AND date = old.date AND count <= 0;
+"""
+REPORT_STATS_ADD_SQL = """
+    INSERT INTO report_stats (department, category, date, count)
+    SELECT new.department, category, new.date, COUNT(*) FROM report_contents
+    WHERE report_id = new.id GROUP BY category
+    ON CONFLICT(date, department, category) DO UPDATE SET count = count + excluded.count;
+"""
+
+
+def _migration_soft_delete(conn):
+    """보고서 휴지통(deleted_at) + 살아 있는 보고서 부분 인덱스 + 통계 트리거 재생성"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+    if "deleted_at" not in columns:
+        conn.execute("ALTER TABLE reports ADD COLUMN deleted_at TEXT")
+    if "deleted_by" not in columns:
+        conn.execute("ALTER TABLE reports ADD COLUMN deleted_by TEXT")
+
+    # 목록 조회는 항상 deleted_at IS NULL 조건을 포함하므로 인덱스도 살아 있는 행만
+    conn.execute("DROP INDEX IF EXISTS idx_reports_department_date")
+    conn.execute("DROP INDEX IF EXISTS idx_reports_date")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reports_live_department_date ON reports(department, date)
+        WHERE deleted_at IS NULL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_live_date ON reports(date) WHERE deleted_at IS NULL")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reports_deleted_at ON reports(deleted_at)
+        WHERE deleted_at IS NOT NULL
+    """)
+
+    for name in ("report_contents_stats_ai", "report_contents_stats_ad", "report_contents_stats_au",
+                 "reports_stats_bd", "reports_stats_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    live_report = "SELECT department, date FROM reports WHERE id = old.report_id AND deleted_at IS NULL"
+    conn.execute("""
+        CREATE TRIGGER report_contents_stats_ai AFTER INSERT ON report_contents BEGIN
+            INSERT INTO report_stats (department, category, date, count)
+            SELECT department, new.category, date, 1 FROM reports WHERE id = new.report_id AND deleted_at IS NULL
+            ON CONFLICT(date, department, category) DO UPDATE SET count = count + 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER report_contents_stats_ad AFTER DELETE ON report_contents BEGIN
+            UPDATE report_stats SET count = count - 1
+            WHERE category = old.category AND (department, date) = ({live_report});
+            DELETE FROM report_stats
+            WHERE category = old.category AND count <= 0 AND (department, date) = ({live_report});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER report_contents_stats_au AFTER UPDATE OF category, report_id ON report_contents BEGIN
+            UPDATE report_stats SET count = count - 1
+            WHERE category = old.category AND (department, date) = ({live_report});
+            DELETE FROM report_stats
+            WHERE category = old.category AND count <= 0 AND (department, date) = ({live_report});
+            INSERT INTO report_stats (department, category, date, count)
+            SELECT department, new.category, date, 1 FROM reports WHERE id = new.report_id AND deleted_at IS NULL
+            ON CONFLICT(date, department, category) DO UPDATE SET count = count + 1;
+        END
+    """)
+    # 영구 삭제(휴지통 비우기)는 이미 휴지통으로 옮길 때 차감했으므로 제외
+    conn.execute(f"""
+        CREATE TRIGGER reports_stats_bd BEFORE DELETE ON reports WHEN old.deleted_at IS NULL BEGIN
+            {REPORT_STATS_SUBTRACT_SQL}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER reports_stats_au AFTER UPDATE OF department, date ON reports
+        WHEN (old.department IS NOT new.department OR old.date IS NOT new.date)
+         AND old.deleted_at IS NULL AND new.deleted_at IS NULL BEGIN
+            {REPORT_STATS_SUBTRACT_SQL}
+            {REPORT_STATS_ADD_SQL}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER reports_stats_trash AFTER UPDATE OF deleted_at ON reports
+        WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL BEGIN
+            {REPORT_STATS_SUBTRACT_SQL}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER reports_stats_restore AFTER UPDATE OF deleted_at ON reports
+        WHEN old.deleted_at IS NOT NULL AND new.deleted_at IS NULL BEGIN
+            {REPORT_STATS_ADD_SQL}
+        END
+    """)
+
+
+def _migration_unique_file_names(conn):
+    """
+    저장소 첨부파일의 (부서, 파일명) 중복 해소
+    - 예전 stored_filename은 해시+원본명만 써서 같은 파일을 여러 보고서에 올리면 이름이 같았음
+      → 가장 먼저 올린 행은 그대로 두고 나머지는 stored_filename 형식(임의 8자리 포함)으로 새 이름
+    - 저장소로 아직 옮기지 않은 파일은 이름이 곧 부서 폴더 경로라 바꾸지 않음
+    """
+    rows = conn.execute("""
+        SELECT f.id, f.filename, f.original_name, f.content_hash FROM report_files f
+        WHERE f.content_hash IS NOT NULL AND EXISTS (
+            SELECT 1 FROM report_files o
+            WHERE o.department = f.department AND o.filename = f.filename AND o.id < f.id
+        )
+    """).fetchall()
+    for row_id, filename, original_name, content_hash in rows:
+        if os.path.exists(blob_path(content_hash)):
+            conn.execute(
+                "UPDATE report_files SET filename = ? WHERE id = ?",
+                (stored_filename(original_name or filename, content_hash), row_id)
+            )
+
+
+MIGRATIONS = [
+    (1, "base tables", _migration_base_tables),
+    (2, "unique local_id + cascade foreign keys", _migration_constraints),
+    (3, "secondary indexes", _migration_indexes),
+    (4, "department local_id counters", _migration_department_counters),
+    (5, "attachment content hash", _migration_content_hash),
+    (6, "content-addressed attachment store", _migration_attachment_blobs),
+    (7, "report statistics summary", _migration_report_stats),
+    (8, "background job queue", _migration_jobs),
+    (9, "audit events", _migration_audit_events),
+    (10, "soft delete (trash)", _migration_soft_delete),
+    (11, "unique attachment file names", _migration_unique_file_names),
+]
+
+
+def migrate(conn):
+    """
+    schema_version 기준으로 미적용 마이그레이션을 순서대로 적용
+    - conn은 isolation_level=None (명시적 트랜잭션)
+    - 여러 워커가 동시에 시작해도 BEGIN IMMEDIATE로 한 번만 적용됨
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )
+    """)
+    # 테이블 재구성 중 외래키 검사 비활성화 (트랜잭션 밖에서만 변경 가능)
+    conn.execute("PRAGMA foreign_keys = OFF")
+    for version, name, migration in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            applied = conn.execute(
+                "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+            ).fetchone()
+            if not applied:
+                migration(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                print(f"✅ DB migration {version} applied: {name}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+# =========================
+# 🔍 전문검색 색인 (SQLite FTS5 + trigram)
+# =========================
+# trigram 토크나이저는 띄어쓰기 단위가 아닌 3글자 조각으로 색인하므로
+# "내시경" 검색 시 "수술실내시경교체"처럼 붙여 쓴 한글 중간도 찾을 수 있다.
+# 3글자 미만 검색어는 trigram으로 찾을 수 없어 LIKE 검색으로 처리한다.
+SEARCH_INDEX_ENABLED = False
+FTS_MIN_QUERY_LEN = 3
+
+SEARCH_INDEX_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+        title, content='reports', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS report_contents_fts USING fts5(
+        category, content, content='report_contents', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    # 원본 테이블 변경 시 색인 자동 동기화 (작성/수정/삭제 모두 적용)
+    """
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+        INSERT INTO reports_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE OF title ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO reports_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_contents_fts_ai AFTER INSERT ON report_contents BEGIN
+        INSERT INTO report_contents_fts(rowid, category, content)
+        VALUES (new.id, new.category, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_contents_fts_ad AFTER DELETE ON report_contents BEGIN
+        INSERT INTO report_contents_fts(report_contents_fts, rowid, category, content)
+        VALUES ('delete', old.id, old.category, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_contents_fts_au AFTER UPDATE ON report_contents BEGIN
+        INSERT INTO report_contents_fts(report_contents_fts, rowid, category, content)
+        VALUES ('delete', old.id, old.category, old.content);
+        INSERT INTO report_contents_fts(rowid, category, content)
+        VALUES (new.id, new.category, new.content);
+    END
+    """,
+]
+
+
+def ensure_search_index(conn):
+    """FTS 색인 테이블/트리거 생성, 새로 만든 경우 기존 데이터로 색인 재구성"""
+    global SEARCH_INDEX_ENABLED
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'reports_fts'"
+    ).fetchone() is not None
+    try:
+        for stmt in SEARCH_INDEX_SCHEMA:
+            conn.execute(stmt)
+    except sqlite3.OperationalError as e:
+        # FTS5/trigram 미지원 SQLite → LIKE 검색으로 동작
+        print(f"⚠️ Full-text search index unavailable: {e}")
+        SEARCH_INDEX_ENABLED = False
+        return False
+    if not existed:
+        conn.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO report_contents_fts(report_contents_fts) VALUES ('rebuild')")
+    SEARCH_INDEX_ENABLED = True
+    return True
+
+
+def _fts_phrase(text):
+    """사용자 입력을 FTS5 구문 검색어로 감싸기 (연산자/따옴표 무력화)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _mark(text):
+    """FTS 하이라이트 구분자를 <mark> 태그로 변환 (나머지는 HTML 이스케이프)"""
+    return escape(text or "").replace("\x02", Markup("<mark>")).replace("\x03", Markup("</mark>"))
+
+
+def highlight_snippet(text, query, width=40):
+    """LIKE 검색 결과용 하이라이트 조각 (FTS snippet()과 같은 형태로 반환)"""
+    text = text or ""
+    pos = text.lower().find(query.lower()) if query else -1
+    if pos < 0:
+        return _mark(text[:width * 2] + ("…" if len(text) > width * 2 else ""))
+    start = max(0, pos - width)
+    end = min(len(text), pos + len(query) + width)
+    piece = (
+        ("…" if start > 0 else "")
+        + text[start:pos] + "\x02" + text[pos:pos + len(query)] + "\x03" + text[pos + len(query):end]
+        + ("…" if end < len(text) else "")
+    )
+    return _mark(piece)
 
 # =========================
 # Auth
@@ -106,13 +860,16 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
-USERS = {
-    "gajakjh":   {"password": "1234", "department": "관리자"},
-    "gajaopd":   {"password": "1234", "department": "외래"},
-    "gajaward":  {"password": "1234", "department": "병동"},
-    "gajaor":    {"password": "1234", "department": "수술실"},
-    "gajacoordi":{"password": "1234", "department": "상담실"},
-}
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if "user" not in session:
+            return redirect("/login")
+        if session["user"]["department"] != "관리자":
+            flash("❌ 관리자만 사용할 수 있습니다.")
+            return redirect("/list")
+        return f(*args, **kwargs)
+    return decorated
 
 # =========================
 # 로그인 / 로그아웃
@@ -126,7 +883,7 @@ def login():
     if request.method == "POST":
         username = request.form.get("username", "")
         password = request.form.get("password", "")
-        user = USERS.get(username)
+        user = app.config["USERS"].get(username)
         if user and user["password"] == password:
             session["user"] = {"username": username, "department": user["department"]}
             return redirect("/list")
@@ -154,69 +911,43 @@ def create_report():
         contents = request.form.getlist("content[]")
 
         conn = get_db()
-        cur = conn.cursor()
-
-        last_local = cur.execute(
-            "SELECT MAX(local_id) FROM reports WHERE department = ?", (dept,)
-        ).fetchone()[0]
-        next_local_id = (last_local or 0) + 1
-
         report_date = date_input or datetime.now().strftime("%Y-%m-%d")
         created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        # ✅ DB 저장
-        cur.execute(
-            """
-            INSERT INTO reports (local_id, title, date, department, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (next_local_id, title, report_date, dept, created_at)
-        )
-        report_id = cur.lastrowid
-
+        # ✅ 첨부파일은 트랜잭션 전에 디스크 기록까지 끝냄 (쓰기 잠금 중에는 이름 변경만)
+        staged = stage_uploads(request.files.getlist("files"))
 
-        # ✅ 카테고리/내용 저장
-        for cat, cont in zip(categories, contents):
-            if cont.strip():
-                cur.execute(
-                    "INSERT INTO report_contents (report_id, category, content) VALUES (?, ?, ?)",
-                    (report_id, cat, cont)
-                )
+        # ✅ 순번 발급부터 저장까지 하나의 쓰기 트랜잭션 (동시 작성 시 순번 중복 방지)
+        undo = []
+        with write_transaction(conn, undo):
+            cur = conn.cursor()
+            next_local_id = allocate_local_id(cur, dept)
 
-        # ✅ 첨부파일 저장 (uploads/부서명/파일명)
-        files = request.files.getlist("files")
-        if files:
-            dept_path = os.path.join(app.config["UPLOAD_FOLDER"], dept)
-            os.makedirs(dept_path, exist_ok=True)
+            # ✅ DB 저장
+            cur.execute(
+                """
+                INSERT INTO reports (local_id, title, date, department, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (next_local_id, title, report_date, dept, created_at)
+            )
+            report_id = cur.lastrowid
 
-            for f in files:
-                if f.filename:
-                    original_name = f.filename
-                    safe_name = clean_filename(original_name)
-                    save_path = os.path.join(dept_path, safe_name)
-
-                    # 같은 이름 존재 시 숫자 붙이기
-                    counter = 1
-                    while os.path.exists(save_path):
-                        name, ext = os.path.splitext(safe_name)
-                        new_name = f"{name}_{counter}{ext}"
-                        save_path = os.path.join(dept_path, new_name)
-                        counter += 1
-
-                    # 파일 저장
-                    f.save(save_path)
-
-                    # DB에 실제 저장된 파일명과 원본명 함께 기록
+            # ✅ 카테고리/내용 저장
+            for cat, cont in zip(categories, contents):
+                if cont.strip():
                     cur.execute(
-                        """
-                        INSERT INTO report_files (report_id, department, filename, original_name)
-                        VALUES (?, ?, ?, ?)
-                        """,
-                        (report_id, dept, os.path.basename(save_path), original_name)
+                        "INSERT INTO report_contents (report_id, category, content) VALUES (?, ?, ?)",
+                        (report_id, cat, cont)
                     )
 
-        conn.commit()
-        conn.close()
+            # ✅ 첨부파일 저장 (uploads/_store/해시, 같은 내용은 1개만 저장)
+            # 썸네일은 작업 큐에서 생성 (커밋되면 바로 응답)
+            saved = save_attachments(cur, report_id, dept, staged, undo)
+            enqueue_thumbnails(cur, saved)
+            record_audit(cur, "create", report_id, title, [name for _, _, name in staged], dept)
+
+        invalidate_report_cache(report_id, dept)
         return redirect("/list")
 
     today = datetime.now().date().isoformat()
@@ -225,189 +956,943 @@ def create_report():
 # =========================
 # 보고서 목록 (검색 + 날짜 필터 유지)
 # =========================
-@app.route("/list")
-@login_required
-def report_list():
-    user = session["user"]
-    dept = user["department"]
-    selected_dept = request.args.get("dept")
-    today = datetime.now().date()
-    two_weeks_ago = today - timedelta(days=14)
-
-    start_date = request.args.get("start_date", two_weeks_ago.isoformat())
-    end_date = request.args.get("end_date", today.isoformat())
-    search_query = request.args.get("search", "").strip()
-    search_filter = request.args.get("filter", "title_content")
-
-    conn = get_db()
-    sql = "SELECT * FROM reports WHERE date BETWEEN ? AND ?"
+def build_report_filter(user_dept, selected_dept, start_date, end_date):
+    """목록 조회용 WHERE 절과 파라미터 생성 (reports 테이블 별칭: r)"""
+    # 휴지통 보고서 제외 (deleted_at IS NULL 부분 인덱스 사용 조건)
+    where = ["r.deleted_at IS NULL", "r.date BETWEEN ? AND ?"]
     params = [start_date, end_date]
 
     # ✅ 관리자 외 부서는 본인 부서만 표시
-    if dept != "관리자":
-        sql += " AND department = ?"
-        params.append(dept)
+    if user_dept != "관리자":
+        where.append("r.department = ?")
+        params.append(user_dept)
     elif selected_dept:
-        sql += " AND department = ?"
+        where.append("r.department = ?")
         params.append(selected_dept)
 
-    sql += " ORDER BY id DESC"
-    base_reports = conn.execute(sql, tuple(params)).fetchall()
+    return " AND ".join(where), params
 
-    enriched = []
 
-    # ✅ 1. 카테고리 검색
-    if search_query and search_filter == "category":
-        q = f"%{search_query.lower()}%"
-        for r in base_reports:
-            matches = conn.execute("""
-                SELECT category, content 
-                FROM report_contents
-                WHERE report_id = ? AND LOWER(category) LIKE ?
-            """, (r["id"], q)).fetchall()
-
-            if matches:  # 카테고리 일치하는 보고서만
-                item = dict(r)
-                item["match_details"] = [
-                    {"category": m["category"], "content": m["content"]}
-                    for m in matches
-                ]
-                files = conn.execute(
-                    "SELECT filename, original_name, department FROM report_files WHERE report_id = ?",
-                    (r["id"],)
-                ).fetchall()
-                item["has_files"] = len(files) > 0
-                item["files"] = [
-                    {
-                        "filename": f["filename"],
-                        "original_name": f["original_name"] or f["filename"],
-                        "department": f["department"]
-                    }
-                    for f in files
-                ]
-                enriched.append(item)
-
-
-    # ✅ 2. 제목 + 내용 검색
-    elif search_query and search_filter == "title_content":
-        q = f"%{search_query.lower()}%"
-        for r in base_reports:
-            # 제목 또는 내용 중 하나라도 검색어 포함 시 포함
-            match_title = conn.execute("""
-                SELECT 1 FROM reports 
-                WHERE id = ? AND LOWER(title) LIKE ?
-            """, (r["id"], q)).fetchone()
-
-            match_content = conn.execute("""
-                SELECT 1 FROM report_contents 
-                WHERE report_id = ? AND LOWER(content) LIKE ?
-            """, (r["id"], q)).fetchone()
-
-            if match_title or match_content:
-                item = dict(r)
-                item["files"] = [
-                    {
-                        "name": f["filename"],
-                        "original_name": f["original_name"] or f["filename"],
-                        "dept": f["department"]
-                    }
-                    for f in files
-                ]
-                item["has_files"] = len(files) > 0
-                item["files"] = [f["filename"] for f in files]
-                item["match_details"] = []
-                enriched.append(item)
-
-    # ✅ 3. 검색어 없음 → 전체 목록
-    else:
-        for r in base_reports:
-            item = dict(r)
-            files = conn.execute(
-                "SELECT filename, original_name, department FROM report_files WHERE report_id = ?",
-                (r["id"],)
-            ).fetchall()
+def _use_search_index(search_query):
+    return SEARCH_INDEX_ENABLED and len(search_query) >= FTS_MIN_QUERY_LEN
 
-            item["has_files"] = len(files) > 0
-            item["files"] = [
-                {
-                    "filename": f["filename"],
-                    "original_name": f["original_name"] or f["filename"],
-                    "department": f["department"]
-                }
-                for f in files
-            ]
-            item["match_details"] = []
-            enriched.append(item)
 
+def build_search_hits(search_query, search_filter):
+    """
+    검색어와 일치하는 보고서 서브쿼리 (컬럼: report_id, score) 생성
+    - FTS 색인 사용 시 bm25 순위(rank, 낮을수록 관련도 높음, 제목 일치는 2배 가중)
+    - 짧은 검색어/색인 미지원 시 LIKE 검색, score는 0
+    검색 조건이 없으면 (None, [])
+    """
+    if not search_query or search_filter not in ("category", "title_content"):
+        return None, []
 
-    conn.close()
+    if _use_search_index(search_query):
+        phrase = _fts_phrase(search_query)
+        if search_filter == "category":
+            return """
+                SELECT report_id, MIN(score) AS score FROM (
+                    SELECT c.report_id, report_contents_fts.rank AS score
+                    FROM report_contents_fts
+                    JOIN report_contents c ON c.id = report_contents_fts.rowid
+                    WHERE report_contents_fts MATCH ?
+                ) GROUP BY report_id
+            """, [f"category : {phrase}"]
+        return """
+            SELECT report_id, MIN(score) AS score FROM (
+                SELECT rowid AS report_id, rank * 2 AS score
+                FROM reports_fts WHERE reports_fts MATCH ?
+                UNION ALL
+                SELECT c.report_id, report_contents_fts.rank
+                FROM report_contents_fts
+                JOIN report_contents c ON c.id = report_contents_fts.rowid
+                WHERE report_contents_fts MATCH ?
+            ) GROUP BY report_id
+        """, [phrase, f"content : {phrase}"]
 
-    return render_template(
-        "list.html",
-        reports=enriched,
-        user=user,
-        departments=DEPT_LIST if dept == "관리자" else None,
-        selected_dept=selected_dept,
-        start_date=start_date,
-        end_date=end_date,
-        search_query=search_query,
-        search_filter=search_filter
-    )
+    q = f"%{search_query.lower()}%"
+    if search_filter == "category":
+        return """
+            SELECT DISTINCT report_id, 0 AS score
+            FROM report_contents WHERE LOWER(category) LIKE ?
+        """, [q]
+    return """
+        SELECT id AS report_id, 0 AS score FROM reports WHERE LOWER(title) LIKE ?
+        UNION
+        SELECT report_id, 0 FROM report_contents WHERE LOWER(content) LIKE ?
+    """, [q, q]
 
-# =========================
-# 보고서 상세보기
-# =========================
-@app.route("/view/<int:report_id>")
-@login_required
-def view_report(report_id):
-    conn = get_db()
-    try:
-        report = conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
-        contents = conn.execute("SELECT * FROM report_contents WHERE report_id = ?", (report_id,)).fetchall()
-
-        # 컬럼 확인 및 파일 로드
-        cursor = conn.cursor()
-        columns = [col[1] for col in cursor.execute("PRAGMA table_info(report_files)").fetchall()]
-
-        if "original_name" in columns:
-            raw_files = cursor.execute("""
-                SELECT filename, department, original_name
-                FROM report_files
-                WHERE report_id = ?
-            """, (report_id,)).fetchall()
+
+def _fetch_match_details(conn, report_ids, search_query, search_filter):
+    """검색 일치 내용 + 하이라이트 조각을 보고서별로 묶어서 반환 (쿼리 1회)"""
+    matches_by_report = {}
+    column = "category" if search_filter == "category" else "content"
+    if _use_search_index(search_query):
+        phrase = _fts_phrase(search_query)
+        rows = conn.execute("""
+            SELECT c.report_id, c.category, c.content,
+                   snippet(report_contents_fts, 1, char(2), char(3), '…', 24) AS snippet
+            FROM report_contents_fts
+            JOIN report_contents c ON c.id = report_contents_fts.rowid
+            WHERE report_contents_fts MATCH ?
+              AND c.report_id IN (SELECT value FROM json_each(?))
+            ORDER BY c.id
+        """, (f"{column} : {phrase}", report_ids))
+    else:
+        rows = conn.execute(f"""
+            SELECT report_id, category, content, NULL AS snippet
+            FROM report_contents
+            WHERE report_id IN (SELECT value FROM json_each(?)) AND LOWER({column}) LIKE ?
+            ORDER BY id
+        """, (report_ids, f"%{search_query.lower()}%"))
+
+    for m in rows:
+        if search_filter == "category":
+            # 카테고리 일치 → 해당 내용 전체 표시
+            snippet = escape(m["content"] or "")
+        elif m["snippet"] is not None:
+            snippet = _mark(m["snippet"])
         else:
-            raw_files = cursor.execute("""
-                SELECT filename, department
-                FROM report_files
-                WHERE report_id = ?
-            """, (report_id,)).fetchall()
-
-        # dict로 변환 (키 누락 방지)
-        files = []
-        for f in raw_files:
-            files.append({
-                "filename": f["filename"],
-                "department": f["department"],
-                "original_name": f["original_name"] if "original_name" in f.keys() else None
-            })
+            snippet = highlight_snippet(m["content"], search_query)
+        matches_by_report.setdefault(m["report_id"], []).append({
+            "category": m["category"],
+            "content": m["content"],
+            "snippet": snippet,
+        })
+    return matches_by_report
 
+
+def _fetch_title_highlights(conn, reports, report_ids, search_query):
+    """제목 하이라이트 (FTS highlight() 또는 LIKE 결과 직접 표시)"""
+    if not _use_search_index(search_query):
+        return {
+            r["id"]: highlight_snippet(r["title"], search_query, width=len(r["title"] or ""))
+            for r in reports
+            if search_query.lower() in (r["title"] or "").lower()
+        }
+    rows = conn.execute("""
+        SELECT rowid, highlight(reports_fts, 0, char(2), char(3)) AS title_html
+        FROM reports_fts
+        WHERE reports_fts MATCH ? AND rowid IN (SELECT value FROM json_each(?))
+    """, (_fts_phrase(search_query), report_ids))
+    return {row["rowid"]: _mark(row["title_html"]) for row in rows}
+
+
+LIST_PAGE_SIZE = 50
+
+
+def _parse_cursor(cursor):
+    """목록 커서 해석: 최신순은 "id", 검색(관련도순)은 "score:id" → (score, id) / 잘못된 값은 None"""
+    if not cursor:
+        return None
+    try:
+        if ":" in cursor:
+            score, report_id = cursor.rsplit(":", 1)
+            return float(score), int(report_id)
+        return None, int(cursor)
+    except ValueError:
+        return None
+
+
+def count_reports(conn, where, params, search_query="", search_filter="title_content"):
+    """조건에 맞는 전체 보고서 수 (검색어 없으면 department/date 인덱스만으로 계산)"""
+    hits_sql, hits_params = build_search_hits(search_query, search_filter)
+    if hits_sql:
+        return conn.execute(f"""
+            SELECT COUNT(*) FROM ({hits_sql}) h
+            JOIN reports r ON r.id = h.report_id
+            WHERE {where}
+        """, [*hits_params, *params]).fetchone()[0]
+    return conn.execute(f"SELECT COUNT(*) FROM reports r WHERE {where}", params).fetchone()[0]
+
+
+def fetch_report_list(conn, where, params, search_query="", search_filter="title_content",
+                      cursor=None, limit=LIST_PAGE_SIZE):
+    """
+    보고서 목록 + 첨부파일 + 검색 일치 내용을 고정된 쿼리 수로 조회
+    - 보고서 1회, 첨부파일 1회, (검색 시) 일치 내용 1회 + 제목 하이라이트 1회
+    - 보고서별 반복 쿼리 없이 Python에서 report_id 기준으로 묶음
+    - 검색 시 관련도순, 아니면 최신순
+    - cursor 다음부터 limit건만 조회 (keyset 페이지네이션, limit=None이면 전체)
+    반환: (보고서 목록, 다음 페이지 커서 또는 None)
+    """
+    position = _parse_cursor(cursor)
+    hits_sql, hits_params = build_search_hits(search_query, search_filter)
+    page_sql, page_params = "", []
+    if limit is not None:
+        page_sql, page_params = "LIMIT ?", [limit + 1]
+
+    if hits_sql:
+        keyset = ""
+        if position and position[0] is not None:
+            keyset = "AND (h.score > ? OR (h.score = ? AND r.id < ?))"
+            page_params = [position[0], position[0], position[1], *page_params]
+        reports = conn.execute(f"""
+            SELECT r.*, h.score
+            FROM ({hits_sql}) h
+            JOIN reports r ON r.id = h.report_id
+            WHERE {where} {keyset}
+            ORDER BY h.score, r.id DESC
+            {page_sql}
+        """, [*hits_params, *params, *page_params]).fetchall()
+    else:
+        keyset = ""
+        if position:
+            keyset = "AND r.id < ?"
+            page_params = [position[1], *page_params]
+        reports = conn.execute(f"""
+            SELECT r.* FROM reports r
+            WHERE {where} {keyset}
+            ORDER BY r.id DESC
+            {page_sql}
+        """, [*params, *page_params]).fetchall()
+
+    next_cursor = None
+    if limit is not None and len(reports) > limit:
+        reports = reports[:limit]
+        last = reports[-1]
+        next_cursor = f"{last['score']!r}:{last['id']}" if hits_sql else str(last["id"])
+    if not reports:
+        return [], None
+
+    # 조회된 보고서 id 목록을 JSON 배열 하나로 전달 (SQLite 변수 개수 제한 회피)
+    report_ids = json.dumps([r["id"] for r in reports])
+
+    files_by_report = {}
+    for f in conn.execute("""
+        SELECT report_id, filename, original_name, department
+        FROM report_files
+        WHERE report_id IN (SELECT value FROM json_each(?))
+        ORDER BY id
+    """, (report_ids,)):
+        files_by_report.setdefault(f["report_id"], []).append({
+            "filename": f["filename"],
+            "original_name": f["original_name"] or f["filename"],
+            "department": f["department"]
+        })
+
+    matches_by_report, titles = {}, {}
+    if hits_sql:
+        matches_by_report = _fetch_match_details(conn, report_ids, search_query, search_filter)
+        if search_filter == "title_content":
+            titles = _fetch_title_highlights(conn, reports, report_ids, search_query)
+
+    enriched = []
+    for r in reports:
+        item = dict(r)
+        item["files"] = files_by_report.get(r["id"], [])
+        item["has_files"] = len(item["files"]) > 0
+        item["match_details"] = matches_by_report.get(r["id"], [])
+        item["title_html"] = titles.get(r["id"])
+        enriched.append(item)
+    return enriched, next_cursor
+
+
+def _list_filters():
+    """/list 계열 요청의 공통 필터 파라미터"""
+    user = session["user"]
+    today = datetime.now().date()
+    two_weeks_ago = today - timedelta(days=14)
+    return {
+        "user": user,
+        "selected_dept": request.args.get("dept"),
+        "start_date": request.args.get("start_date", two_weeks_ago.isoformat()),
+        "end_date": request.args.get("end_date", today.isoformat()),
+        "search_query": request.args.get("search", "").strip(),
+        "search_filter": request.args.get("filter", "title_content"),
+    }
+
+
+@app.route("/list")
+@login_required
+def report_list():
+    filters = _list_filters()
+    user = filters["user"]
+    dept = user["department"]
+    search_query, search_filter = filters["search_query"], filters["search_filter"]
+
+    where, params = build_report_filter(
+        dept, filters["selected_dept"], filters["start_date"], filters["end_date"]
+    )
+    # ✅ 실시간 갱신은 목록을 읽기 직전 위치부터 (그 사이 변경은 중복 전달돼도 같은 행 교체)
+    feed_since = list_feed_position(get_db())
+
+    # ✅ 첫 페이지만 렌더링, 나머지는 스크롤 시 /list/page로 이어서 조회
+    def build():
+        conn = get_db()
+        enriched, next_cursor = fetch_report_list(conn, where, params, search_query, search_filter)
+        return enriched, next_cursor, count_reports(conn, where, params, search_query, search_filter)
+
+    enriched, next_cursor, total_count = get_render_cache().get_or_build(
+        "list", list_generation_names(dept, filters["selected_dept"]),
+        (where, params, search_query, search_filter), build
+    )
+
+    return render_template(
+        "list.html",
+        reports=enriched,
+        next_cursor=next_cursor,
+        total_count=total_count,
+        feed_since=feed_since,
+        row_offset=0,
+        user=user,
+        departments=DEPT_LIST if dept == "관리자" else None,
+        selected_dept=filters["selected_dept"],
+        start_date=filters["start_date"],
+        end_date=filters["end_date"],
+        search_query=search_query,
+        search_filter=search_filter
+    )
+
+
+@app.route("/list/page")
+@login_required
+def report_list_page():
+    """목록 다음 페이지 (JSON: 렌더링된 행 HTML + 다음 커서, 커서 없으면 첫 페이지)"""
+    filters = _list_filters()
+    user = filters["user"]
+    cursor = request.args.get("cursor") or None
+    if cursor and _parse_cursor(cursor) is None:
+        return jsonify({"status": "error", "message": "잘못된 페이지 커서입니다."}), 400
+
+    where, params = build_report_filter(
+        user["department"], filters["selected_dept"], filters["start_date"], filters["end_date"]
+    )
+    # 첫 페이지(날짜 변경 등으로 목록을 새로 그림)면 실시간 갱신 위치도 함께
+    feed_since = None if cursor else list_feed_position(get_db())
+    enriched, next_cursor = get_render_cache().get_or_build(
+        "list_page", list_generation_names(user["department"], filters["selected_dept"]),
+        (where, params, filters["search_query"], filters["search_filter"], cursor),
+        lambda: fetch_report_list(
+            get_db(), where, params, filters["search_query"], filters["search_filter"], cursor=cursor
+        )
+    )
+    html = render_template(
+        "_report_rows.html",
+        reports=enriched,
+        row_offset=request.args.get("offset", 0, type=int),
+        user=user,
+        selected_dept=filters["selected_dept"],
+        search_query=filters["search_query"],
+        search_filter=filters["search_filter"],
+    )
+    return jsonify({
+        "status": "success",
+        "html": html,
+        "count": len(enriched),
+        "next_cursor": next_cursor,
+        "feed_since": feed_since,
+    })
+
+
+# =========================
+# 📊 부서별 카테고리 통계
+# =========================
+# report_stats(부서 × 카테고리 × 날짜 건수)는 트리거가 작성/수정/삭제 때마다 증감하므로
+# 조회 비용은 보고서 수가 아니라 기간 길이(최대 부서 수 × 카테고리 수 × 일수)에만 비례한다.
+# 주/월 단위 합계는 pandas로 한 번에 계산.
+STATS_PERIODS = {"week": 12 * 7, "month": 365}  # 기간 단위별 기본 조회 일수
+
+
+def fetch_stats_rows(conn, start_date, end_date, department=None):
+    sql = "SELECT department, category, date, count FROM report_stats WHERE date BETWEEN ? AND ?"
+    params = [start_date, end_date]
+    if department:
+        sql += " AND department = ?"
+        params.append(department)
+    return conn.execute(sql, params).fetchall()
+
+
+def rollup_stats(rows, period="week"):
+    """
+    일별 집계 행 → (부서, 기간)별 카테고리 건수 표
+    - week: 월요일 시작 주 (YYYY-MM-DD), month: YYYY-MM
+    - 반환: (카테고리 목록, {부서: [(기간, [건수...], 합계)]} 최신 기간부터)
+    """
+    if not rows:
+        return list(REPORT_CATEGORIES), {}
+    df = pd.DataFrame([tuple(r) for r in rows], columns=["department", "category", "date", "count"])
+    # 기간 라벨은 고유 날짜(최대 조회 일수)만 계산한 뒤 매핑
+    days = pd.Series(df["date"].unique())
+    parsed = pd.to_datetime(days, format="%Y-%m-%d", errors="coerce")
+    if period == "month":
+        labels = parsed.dt.strftime("%Y-%m")
+    else:
+        labels = (parsed - pd.to_timedelta(parsed.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")
+    df = df.assign(period=df["date"].map(dict(zip(days, labels)))).dropna(subset=["period"])
+
+    table = df.pivot_table(
+        index=["department", "period"], columns="category", values="count", aggfunc="sum", fill_value=0
+    )
+    # 양식 순서대로, 예전 데이터에만 있는 카테고리는 뒤에
+    categories = list(REPORT_CATEGORIES) + sorted(c for c in table.columns if c not in REPORT_CATEGORIES)
+    table = table.reindex(columns=categories, fill_value=0).sort_index(ascending=[True, False])
+    totals = table.sum(axis=1)
+
+    result = {}
+    for (department, period_label), counts, total in zip(table.index, table.to_numpy().tolist(), totals.tolist()):
+        result.setdefault(department, []).append((period_label, counts, total))
+    return categories, result
+
+
+def _stats_filters():
+    user = session["user"]
+    period = request.args.get("period", "week")
+    if period not in STATS_PERIODS:
+        period = "week"
+    today = datetime.now().date()
+    department = user["department"] if user["department"] != "관리자" else (request.args.get("dept") or None)
+    return {
+        "user": user,
+        "period": period,
+        "department": department,
+        "start_date": request.args.get("start_date") or (today - timedelta(days=STATS_PERIODS[period])).isoformat(),
+        "end_date": request.args.get("end_date") or today.isoformat(),
+    }
+
+
+@app.route("/stats")
+@login_required
+def report_stats():
+    """부서별 주/월 카테고리 건수 (관리자는 전체 부서, 그 외는 본인 부서)"""
+    if pd is None:
+        flash("❌ 통계 기능을 사용할 수 없습니다. (pandas 미설치)")
+        return redirect("/list")
+    filters = _stats_filters()
+    rows = fetch_stats_rows(get_db(), filters["start_date"], filters["end_date"], filters["department"])
+    categories, table = rollup_stats(rows, filters["period"])
+    return render_template(
+        "stats.html",
+        categories=categories,
+        table=table,
+        departments=DEPT_LIST if filters["user"]["department"] == "관리자" else None,
+        **filters,
+    )
+
+
+@app.route("/stats/data")
+@login_required
+def report_stats_data():
+    """통계 JSON (/stats와 같은 파라미터)"""
+    if pd is None:
+        return jsonify({"status": "error", "message": "pandas가 설치되어 있지 않습니다."}), 501
+    filters = _stats_filters()
+    rows = fetch_stats_rows(get_db(), filters["start_date"], filters["end_date"], filters["department"])
+    categories, table = rollup_stats(rows, filters["period"])
+    return jsonify({
+        "status": "success",
+        "period": filters["period"],
+        "start_date": filters["start_date"],
+        "end_date": filters["end_date"],
+        "categories": categories,
+        "rows": [
+            {"department": department, "period": label, "counts": dict(zip(categories, counts)), "total": total}
+            for department, periods in table.items()
+            for label, counts, total in periods
+        ],
+    })
+
+
+# =========================
+# 📥 보고서 일괄 가져오기 (엑셀/CSV, 관리자 전용)
+# =========================
+# 앱 도입 전 스프레드시트를 한 번에 옮기기 위한 기능.
+# 한 행 = 보고서 내용 1건 (내보내기 파일과 같은 형식), 연속된 행 중
+# 부서/날짜/제목(/순번)이 같은 행은 하나의 보고서로 묶는다.
+# 순번(local_id)은 파일 값을 쓰지 않고 부서 카운터에서 새로 발급.
+IMPORT_CHUNK_SIZE = 2000  # 트랜잭션 1회당 보고서 수
+IMPORT_ERROR_LIMIT = 50   # 결과에 보여줄 오류 행 수
+IMPORT_HEADERS = {
+    "department": ("부서", "department"),
+    "local_id": ("순번", "local_id"),
+    "date": ("날짜", "date"),
+    "title": ("제목", "title"),
+    "category": ("카테고리", "category"),
+    "content": ("내용", "content"),
+    "created_at": ("작성/수정 시각", "작성시각", "created_at"),
+}
+IMPORT_REQUIRED = ("department", "date", "title", "content")
+
+
+def _read_sheet_rows(path):
+    """xlsx/xls/csv 파일의 행(값 튜플) 생성기, 첫 행은 헤더"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as fp:
+            try:
+                yield from csv.reader(fp)
+            except (csv.Error, UnicodeDecodeError) as e:
+                raise ValueError(f"CSV 파일을 읽을 수 없습니다 (UTF-8 CSV인지 확인해 주세요): {e}") from e
+    elif ext == ".xlsx":
+        if openpyxl is None:
+            raise ValueError("openpyxl이 설치되어 있지 않습니다.")
+        # 손상됐거나 확장자만 xlsx인 파일 → 파서 예외를 ValueError로 (화면/CLI에서 ❌ 메시지)
+        try:
+            workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as e:
+            raise ValueError(f"엑셀(xlsx) 파일을 읽을 수 없습니다: {e}") from e
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif ext == ".xls":
+        if xlrd is None:
+            raise ValueError("xlrd가 설치되어 있지 않습니다.")
+        try:
+            book = xlrd.open_workbook(path, on_demand=True)
+        except (xlrd.XLRDError, xlrd.compdoc.CompDocError, OSError) as e:
+            raise ValueError(f"엑셀(xls) 파일을 읽을 수 없습니다: {e}") from e
+        sheet = book.sheet_by_index(0)
+        for n in range(sheet.nrows):
+            values = []
+            for cell in sheet.row(n):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    values.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+                else:
+                    values.append(cell.value)
+            yield values
+        book.release_resources()
+    else:
+        raise ValueError("xlsx, xls, csv 파일만 가져올 수 있습니다.")
+
+
+def _import_date(value):
+    """날짜 셀 → YYYY-MM-DD (datetime, 2024-01-05, 2024.1.5, 2024/01/05 허용)"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    match = re.fullmatch(r"\s*(\d{4})[-./](\d{1,2})[-./](\d{1,2})\.?\s*(?:\d{1,2}:\d{2}(?::\d{2})?)?\s*", str(value or ""))
+    if not match:
+        return None
+    try:
+        return datetime(*map(int, match.groups())).date().isoformat()
+    except ValueError:
+        return None
+
+
+def _import_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_import_rows(rows):
+    """
+    시트 행 → 보고서 묶음 생성기
+    - yield ("report", {department, date, title, created_at, contents: [(category, content)]})
+    - yield ("error", (행 번호, 메시지))  ← 잘못된 행은 건너뜀
+    """
+    rows = iter(rows)
+    header = [_import_text(h) for h in next(rows, [])]
+    columns = {}
+    for field, names in IMPORT_HEADERS.items():
+        for name in names:
+            if name in header:
+                columns[field] = header.index(name)
+                break
+    missing = [IMPORT_HEADERS[f][0] for f in IMPORT_REQUIRED if f not in columns]
+    if missing:
+        raise ValueError(f"필수 열이 없습니다: {', '.join(missing)}")
+
+    def cell(values, field):
+        index = columns.get(field)
+        return values[index] if index is not None and index < len(values) else None
+
+    current, current_key = None, None
+    for row_no, values in enumerate(rows, 2):
+        if not any(_import_text(v) for v in values):
+            continue
+        department = _import_text(cell(values, "department"))
+        report_date = _import_date(cell(values, "date"))
+        title = _import_text(cell(values, "title")) or "일일보고서"
+        category = _import_text(cell(values, "category")) or REPORT_CATEGORIES[0]
+        content = _import_text(cell(values, "content"))
+
+        if department not in DEPT_LIST:
+            yield "error", (row_no, f"알 수 없는 부서: {department or '(빈 값)'}")
+            continue
+        if not report_date:
+            yield "error", (row_no, f"날짜 형식 오류: {_import_text(cell(values, 'date')) or '(빈 값)'}")
+            continue
+        if category not in REPORT_CATEGORIES:
+            yield "error", (row_no, f"알 수 없는 카테고리: {category}")
+            continue
+
+        key = (department, report_date, title, _import_text(cell(values, "local_id")))
+        if key != current_key:
+            if current:
+                yield "report", current
+            created_at = cell(values, "created_at")
+            if isinstance(created_at, datetime):
+                created_at = created_at.strftime("%Y-%m-%d %H:%M:%S")
+            current_key = key
+            current = {
+                "department": department,
+                "date": report_date,
+                "title": title,
+                "created_at": _import_text(created_at) or f"{report_date} 00:00:00",
+                "contents": [],
+            }
+        if content:
+            current["contents"].append((category, content))
+    if current:
+        yield "report", current
+
+
+def _insert_report_chunk(conn, reports):
+    """
+    보고서 묶음을 한 트랜잭션으로 저장 (테이블별 INSERT 1회)
+    - 부서별 순번은 카운터에서 건수만큼 한 번에 발급
+    - id는 sqlite_sequence 이후 값으로 미리 정해 내용 행과 연결
+    """
+    with write_transaction(conn):
+        counts = {}
+        for report in reports:
+            counts[report["department"]] = counts.get(report["department"], 0) + 1
+        next_local = {}
+        for department, count in counts.items():
+            last = conn.execute("""
+                INSERT INTO department_counters (department, last_local_id) VALUES (?, ?)
+                ON CONFLICT(department) DO UPDATE SET last_local_id = last_local_id + excluded.last_local_id
+                RETURNING last_local_id
+            """, (department, count)).fetchone()[0]
+            next_local[department] = last - count + 1
+
+        last_id = conn.execute("""
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'reports'), 0),
+                       COALESCE((SELECT MAX(id) FROM reports), 0))
+        """).fetchone()[0]
+        report_rows, content_rows = [], []
+        for report_id, report in enumerate(reports, last_id + 1):
+            department = report["department"]
+            report_rows.append((report_id, next_local[department], report["title"], report["date"],
+                                department, report["created_at"]))
+            next_local[department] += 1
+            content_rows.extend((report_id, category, content) for category, content in report["contents"])
+
+        # executemany 대신 json_each로 묶음 전체를 문장 1개로 저장:
+        # FTS5는 문장마다 색인 버퍼를 디스크에 내려쓰므로 행마다 실행하면 약 5배 느림
+        conn.execute("""
+            INSERT INTO reports (id, local_id, title, date, department, created_at)
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'),
+                   json_extract(value, '$[3]'), json_extract(value, '$[4]'), json_extract(value, '$[5]')
+            FROM json_each(?)
+        """, (json.dumps(report_rows, ensure_ascii=False),))
+        conn.execute("""
+            INSERT INTO report_contents (report_id, category, content)
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+            FROM json_each(?)
+        """, (json.dumps(content_rows, ensure_ascii=False),))
+    return len(content_rows)
+
+
+def import_reports(path, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    스프레드시트 가져오기
+    - dry_run: 검증/집계만 하고 저장하지 않음
+    - 반환: {rows, reports, contents, errors: [(행 번호, 메시지)], error_count, seconds, rows_per_sec}
+    """
+    started = time.perf_counter()
+    result = {"reports": 0, "contents": 0, "errors": [], "error_count": 0, "dry_run": dry_run}
+    conn = None if dry_run else connect_db()
+    chunk = []
+    try:
+        for kind, item in parse_import_rows(_read_sheet_rows(path)):
+            if kind == "error":
+                result["error_count"] += 1
+                if len(result["errors"]) < IMPORT_ERROR_LIMIT:
+                    result["errors"].append(item)
+                continue
+            result["reports"] += 1
+            if dry_run:
+                result["contents"] += len(item["contents"])
+                continue
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                result["contents"] += _insert_report_chunk(conn, chunk)
+                chunk = []
+        if chunk:
+            result["contents"] += _insert_report_chunk(conn, chunk)
+    finally:
+        if conn is not None:
+            conn.close()
+            invalidate_all_render_cache()
+
+    result["rows"] = result["contents"] + result["error_count"]
+    result["seconds"] = time.perf_counter() - started
+    result["rows_per_sec"] = result["rows"] / result["seconds"] if result["seconds"] else 0
+    return result
+
+
+@app.route("/admin/import", methods=["GET", "POST"])
+@admin_required
+def import_reports_view():
+    """스프레드시트 업로드 → 가져오기 (미리 검사 선택 가능)"""
+    result = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("❌ 가져올 파일을 선택해 주세요.")
+            return redirect(url_for("import_reports_view"))
+
+        tmp_path, _ = stage_upload(upload)
+        # 확장자로 형식을 판단하므로 임시 파일 이름에 원본 확장자 부여 (요청 종료 시 삭제)
+        sheet_path = tmp_path + os.path.splitext(upload.filename)[1].lower()
+        os.link(tmp_path, sheet_path)
+        try:
+            result = import_reports(sheet_path, dry_run=bool(request.form.get("dry_run")))
+        except ValueError as e:
+            flash(f"❌ {e}")
+            return redirect(url_for("import_reports_view"))
+        finally:
+            os.remove(sheet_path)
+
+    return render_template("import.html", result=result, categories=REPORT_CATEGORIES, departments=DEPT_LIST)
+
+
+@app.cli.command("import-reports")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="저장하지 않고 검증/집계만")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True, help="트랜잭션 1회당 보고서 수")
+def import_reports_command(path, dry_run, chunk_size):
+    """기존 엑셀/CSV 보고서 일괄 가져오기"""
+    init_db()
+    try:
+        result = import_reports(path, dry_run=dry_run, chunk_size=chunk_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for row_no, message in result["errors"]:
+        click.echo(f"  row {row_no}: {message}", err=True)
+    click.echo(
+        f"import{' (dry run)' if dry_run else ''}: {result['reports']} reports, {result['contents']} contents, "
+        f"{result['error_count']} invalid rows skipped, {result['seconds']:.2f}s "
+        f"({result['rows_per_sec']:,.0f} rows/s)"
+    )
+
+
+# =========================
+# 📤 보고서 내보내기 (엑셀/CSV)
+# =========================
+# /list와 같은 필터(부서/기간/검색)로 보고서 내용 1건당 1행씩 내보낸다.
+# DB 커서에서 EXPORT_BATCH_SIZE씩 읽어 바로 응답으로 흘려보내므로
+# 기간이 길어도 메모리 사용량은 일정하다.
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = ["부서", "순번", "날짜", "제목", "카테고리", "내용", "작성/수정 시각", "첨부파일 수"]
+
+
+def iter_export_rows(where, params, search_query="", search_filter="title_content"):
+    """
+    내보내기 행 생성기 (보고서 × 내용, 내용 없는 보고서도 1행)
+    - 요청 연결(g.db)과 별개의 전용 연결로 읽고, 끝나거나 중단되면 닫음
+    """
+    hits_sql, hits_params = build_search_hits(search_query, search_filter)
+    hit_filter = f"AND r.id IN (SELECT report_id FROM ({hits_sql}))" if hits_sql else ""
+    conn = connect_db()
+    try:
+        cur = conn.execute(f"""
+            SELECT r.department, r.local_id, r.date, r.title, c.category, c.content, r.created_at,
+                   (SELECT COUNT(*) FROM report_files f WHERE f.report_id = r.id) AS file_count
+            FROM reports r
+            LEFT JOIN report_contents c ON c.report_id = r.id
+            WHERE {where} {hit_filter}
+            ORDER BY r.date DESC, r.id DESC, c.id
+        """, [*params, *hits_params])
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row)
     finally:
         conn.close()
 
+
+SPREADSHEET_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _spreadsheet_safe(value):
+    """엑셀에서 수식/제어 입력으로 해석될 수 있는 값(=, +, -, @, 탭, CR 시작)은 앞에 ' 붙임"""
+    if isinstance(value, str) and value.startswith(SPREADSHEET_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """CSV 생성기 (엑셀에서 한글이 깨지지 않도록 UTF-8 BOM)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_COLUMNS)
+    for n, row in enumerate(rows, 1):
+        writer.writerow([_spreadsheet_safe(v) for v in row])
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(rows, chunk_size=256 * 1024):
+    """
+    xlsx 생성기
+    - openpyxl write-only 모드: 행을 임시 파일로 바로 기록 (메모리에 시트 전체를 두지 않음)
+    - xlsx는 zip이라 완성 후에야 전송 가능 → 임시 파일에 저장 후 청크로 전송
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("보고서")
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append([_spreadsheet_safe(v) for v in row])
+    with tempfile.TemporaryFile() as fp:
+        workbook.save(fp)
+        fp.seek(0)
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            yield chunk
+
+
+@app.route("/export")
+@login_required
+def export_reports():
+    """보고서 내보내기 (?format=xlsx|csv|zip, 나머지 파라미터는 /list와 동일, zip은 첨부파일 전체)"""
+    filters = _list_filters()
+    export_format = request.args.get("format", "xlsx")
+    if export_format not in ("xlsx", "csv", "zip"):
+        return jsonify({"status": "error", "message": "지원하지 않는 형식입니다."}), 400
+    if export_format == "xlsx" and openpyxl is None:
+        flash("❌ 엑셀 내보내기를 사용할 수 없습니다. (openpyxl 미설치) CSV로 내보내 주세요.")
+        return redirect(request.referrer or "/list")
+
+    where, params = build_report_filter(
+        filters["user"]["department"], filters["selected_dept"], filters["start_date"], filters["end_date"]
+    )
+    scope = filters["selected_dept"] or filters["user"]["department"]
+    if export_format == "zip":
+        files = iter_zip_file_rows(where, params, filters["search_query"], filters["search_filter"])
+        return zip_response(files, f"첨부파일_{scope}_{filters['start_date']}_{filters['end_date']}.zip")
+
+    rows = iter_export_rows(where, params, filters["search_query"], filters["search_filter"])
+
+    if export_format == "csv":
+        body, mimetype = stream_csv(rows), "text/csv"
+    else:
+        body, mimetype = stream_xlsx(rows), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    download_name = f"보고서_{scope}_{filters['start_date']}_{filters['end_date']}.{export_format}"
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=reports.{export_format}; "
+        f"filename*=UTF-8''{urllib.parse.quote(download_name)}"
+    )
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+# =========================
+# 보고서 상세보기
+# =========================
+VIEW_FLASH_SLOT = "<!-- flash -->"  # view.html에서 flash 메시지가 들어갈 자리
+
+
+@app.route("/view/<int:report_id>")
+@login_required
+def view_report(report_id):
     # ✅ user 세션정보 추가 전달
     user = session.get("user")
 
-    return render_template(
-        "view.html",
-        report=report,
-        contents=contents,
-        files=files,
-        user=user,  # ← 여기가 핵심
-    )
+    def build():
+        conn = get_db()
+        report = conn.execute("SELECT * FROM reports WHERE id = ? AND deleted_at IS NULL", (report_id,)).fetchone()
+        if not report:
+            return None  # 없는 보고서/휴지통 보고서는 캐시하지 않음
+        contents = conn.execute("SELECT * FROM report_contents WHERE report_id = ? ORDER BY id", (report_id,)).fetchall()
+        files = [dict(f) for f in conn.execute("""
+            SELECT filename, department, original_name, content_hash
+            FROM report_files
+            WHERE report_id = ?
+            ORDER BY id
+        """, (report_id,))]
+
+        return render_template(
+            "view.html",
+            report=report,
+            contents=contents,
+            files=files,
+            user=user,  # ← 여기가 핵심
+        )
+
+    # ✅ 화면은 관리자/부서 사용자 두 가지뿐이라 그 구분만 캐시 키에 포함
+    # (CSS 주소도 키에 포함 → 배포로 view.css가 바뀌면 예전 주소를 담은 HTML을 쓰지 않음)
+    is_admin = user["department"] == "관리자"
+    key = (report_id, is_admin, asset_url("css/view.css"))
+    html = get_render_cache().get_or_build("view", [f"report:{report_id}"], key, build)
+    if html is None:
+        flash("❌ 존재하지 않는 보고서입니다.")
+        return redirect("/list")
+    # ✅ flash 메시지(수정 결과 등)는 사용자마다 다르므로 캐시된 HTML의 자리표시에 매번 채움
+    messages = "".join(f'<div class="flash">{escape(m)}</div>' for m in get_flashed_messages())
+    return html.replace(VIEW_FLASH_SLOT, messages, 1)
 
 # =========================
 # 보고서 수정 (edit.html)
 # =========================
+# 저장할 때 내용 행을 전부 지우고 다시 넣지 않고, 기존 행(id 순)과 비교해서
+# 바뀐 행만 UPDATE / INSERT / DELETE 한다. (rowid 유지 → 검색 색인/통계 트리거도 바뀐 행만 처리)
+def plan_content_changes(existing, submitted):
+    """
+    기존 내용 행(id 순)과 제출된 [(카테고리, 내용)] 비교 → (updates, inserts, deletes)
+    - updates: [(id, 카테고리, 내용)], inserts: [(카테고리, 내용)], deletes: [id]
+    - 화면 순서 = id 순이고 새 행은 항상 가장 큰 id를 받으므로 새 행은 맨 뒤에만 올 수 있음
+      → 중간에 끼워 넣은 행부터는 남은 기존 행을 순서대로 UPDATE해서 순서 유지
+    """
+    old = [(row["category"], row["content"]) for row in existing]
+    matched = [None] * len(submitted)  # 제출 위치 → 재사용할 기존 행 위치 (None이면 새 행)
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, submitted, autojunk=False).get_opcodes():
+        if tag in ("equal", "replace"):
+            for k in range(min(i2 - i1, j2 - j1)):
+                matched[j1 + k] = i1 + k
+    if None in matched:
+        first_new = matched.index(None)
+        next_old = max((i for i in matched[:first_new] if i is not None), default=-1) + 1
+        for j in range(first_new, len(submitted)):
+            matched[j] = next_old if next_old < len(old) else None
+            next_old += 1
+
+    updates = [
+        (existing[i]["id"], *submitted[j]) for j, i in enumerate(matched)
+        if i is not None and old[i] != submitted[j]
+    ]
+    inserts = [submitted[j] for j, i in enumerate(matched) if i is None]
+    kept = set(matched)
+    deletes = [row["id"] for i, row in enumerate(existing) if i not in kept]
+    return updates, inserts, deletes
+
+
+def apply_content_changes(cur, report_id, updates, inserts, deletes):
+    """plan_content_changes 결과 반영 (종류별 문장 1개씩) → 바뀐 행 수"""
+    if deletes:
+        cur.execute(
+            "DELETE FROM report_contents WHERE report_id = ? AND id IN (SELECT value FROM json_each(?))",
+            (report_id, json.dumps(deletes))
+        )
+    if updates:
+        cur.execute("""
+            UPDATE report_contents
+            SET category = json_extract(j.value, '$[1]'), content = json_extract(j.value, '$[2]')
+            FROM json_each(?) AS j
+            WHERE report_contents.id = json_extract(j.value, '$[0]') AND report_contents.report_id = ?
+        """, (json.dumps(updates, ensure_ascii=False), report_id))
+    if inserts:
+        # json_each는 배열 순서대로 읽으므로 id도 제출 순서대로 증가
+        cur.execute("""
+            INSERT INTO report_contents (report_id, category, content)
+            SELECT ?, json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+        """, (report_id, json.dumps(inserts, ensure_ascii=False)))
+    return len(updates) + len(inserts) + len(deletes)
+
+
 @app.route("/edit/<int:report_id>", methods=["GET", "POST"])
 @login_required
 def edit_report(report_id):
@@ -415,10 +1900,12 @@ def edit_report(report_id):
     cur = conn.cursor()
 
     if request.method == "GET":
-        report = cur.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
-        contents = cur.execute("SELECT * FROM report_contents WHERE report_id = ?", (report_id,)).fetchall()
+        report = cur.execute("SELECT * FROM reports WHERE id = ? AND deleted_at IS NULL", (report_id,)).fetchone()
+        if not report:
+            flash("❌ 존재하지 않는 보고서입니다.")
+            return redirect("/list")
+        contents = cur.execute("SELECT * FROM report_contents WHERE report_id = ? ORDER BY id", (report_id,)).fetchall()
         files = cur.execute("SELECT * FROM report_files WHERE report_id = ?", (report_id,)).fetchall()
-        conn.close()
         return render_template("edit.html", report=report, contents=contents, files=files)
 
     # ------------------------------
@@ -430,69 +1917,57 @@ def edit_report(report_id):
     contents = request.form.getlist("contents[]")
     new_files = request.files.getlist("new_files")
     dept = session["user"]["department"]
+    submitted = [(cat, text.strip()) for cat, text in zip(categories, contents) if text.strip()]
 
-    # ✅ 날짜 입력 없으면 기존 날짜 유지
-    if date_input:
-        report_date = date_input
-    else:
-        old_date = cur.execute("SELECT date FROM reports WHERE id = ?", (report_id,)).fetchone()
-        report_date = old_date["date"] if old_date else datetime.now().strftime("%Y-%m-%d")
-
-    # ✅ 수정 시각 갱신 (created_at 컬럼에 반영)
-    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # ✅ 보고서 기본 정보 수정
-    cur.execute(
-        """
-        UPDATE reports
-        SET title = ?, date = ?, created_at = ?
-        WHERE id = ?
-        """,
-        (title, report_date, updated_at, report_id)
-    )
-
-    # ✅ 기존 내용 삭제 후 다시 저장
-    cur.execute("DELETE FROM report_contents WHERE report_id = ?", (report_id,))
-    for cat, text in zip(categories, contents):
-        if text.strip():
-            cur.execute(
-                "INSERT INTO report_contents (report_id, category, content) VALUES (?, ?, ?)",
-                (report_id, cat, text.strip())
-            )
+    # ✅ 새 첨부파일은 트랜잭션 전에 디스크 기록까지 끝냄
+    staged = stage_uploads(new_files)
 
-    # ✅ 첨부파일 업로드 처리
-    upload_folder = os.path.join(app.config["UPLOAD_FOLDER"], dept)
-    os.makedirs(upload_folder, exist_ok=True)
-
-    for file in new_files:
-        if file and file.filename:
-            original_name = file.filename
-            safe_name = clean_filename(original_name)
-            save_path = os.path.join(upload_folder, safe_name)
+    undo = []
+    with write_transaction(conn, undo):
+        report = cur.execute(
+            "SELECT title, date, department FROM reports WHERE id = ? AND deleted_at IS NULL", (report_id,)
+        ).fetchone()
+        if not report:
+            # 그 사이 휴지통으로 이동됨 (임시 첨부파일은 요청 종료 시 정리)
+            flash("❌ 존재하지 않는 보고서입니다.")
+            return redirect("/list")
 
-            counter = 1
-            while os.path.exists(save_path):
-                name, ext = os.path.splitext(safe_name)
-                new_name = f"{name}_{counter}{ext}"
-                save_path = os.path.join(upload_folder, new_name)
-                counter += 1
+        # ✅ 날짜 입력 없으면 기존 날짜 유지
+        report_date = date_input or report["date"]
 
-            # 파일 저장
-            file.save(save_path)
+        # ✅ 기존 내용과 비교해서 바뀐 행만 반영
+        existing = cur.execute(
+            "SELECT id, category, content FROM report_contents WHERE report_id = ? ORDER BY id", (report_id,)
+        ).fetchall()
+        changes = plan_content_changes(existing, submitted)
+        touched = apply_content_changes(cur, report_id, *changes) + len(staged)
 
-            # DB에 저장된 파일명 + 원본 이름 기록
+        if touched or (title, report_date) != (report["title"], report["date"]):
+            # ✅ 수정 시각 갱신 (created_at 컬럼에 반영)
+            updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             cur.execute(
-                """
-                INSERT INTO report_files (report_id, department, filename, original_name)
-                VALUES (?, ?, ?, ?)
-                """,
-                (report_id, dept, os.path.basename(save_path), original_name)
+                "UPDATE reports SET title = ?, date = ?, created_at = ? WHERE id = ?",
+                (title, report_date, updated_at, report_id)
             )
+            touched += 1
 
-    conn.commit()
-    conn.close()
-    flash("✅ 보고서가 수정되었습니다.")
-    return redirect(url_for("view_report", report_id=report_id))
+            # ✅ 첨부파일 업로드 처리 (디스크 기록은 트랜잭션 전에 완료)
+            saved = save_attachments(cur, report_id, dept, staged, undo)
+            enqueue_thumbnails(cur, saved)
+            updates, inserts, deletes = changes
+            record_audit(cur, "edit", report_id, title, [name for _, _, name in staged], report["department"],
+                         detail={"rows": touched, "updated": len(updates), "inserted": len(inserts),
+                                 "deleted": len(deletes)})
+
+    if touched:
+        invalidate_report_cache(report_id, report["department"])
+        flash(f"✅ 보고서가 수정되었습니다. (변경 {touched}행)")
+    else:
+        # 바뀐 것이 없으면 아무것도 쓰지 않음 (수정 시각도 그대로)
+        flash("ℹ️ 변경된 내용이 없습니다.")
+    response = redirect(url_for("view_report", report_id=report_id))
+    response.headers["X-Rows-Touched"] = str(touched)
+    return response
 
 
 # =========================
@@ -505,30 +1980,25 @@ def delete_report(report_id):
     cur = conn.cursor()
 
     # 보고서 및 첨부파일 조회
-    report = cur.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+    report = cur.execute("SELECT * FROM reports WHERE id = ? AND deleted_at IS NULL", (report_id,)).fetchone()
     files = cur.execute("SELECT * FROM report_files WHERE report_id = ?", (report_id,)).fetchall()
 
     if not report:
-        conn.close()
         flash("❌ 존재하지 않는 보고서입니다.")
         return redirect("/list")
 
-    # 첨부파일 실제 파일 삭제
-    for f in files:
-        dept = f["department"]
-        filename = f["filename"]
-        file_path = os.path.join(app.config["UPLOAD_FOLDER"], dept, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-    # DB에서 삭제
-    cur.execute("DELETE FROM report_files WHERE report_id = ?", (report_id,))
-    cur.execute("DELETE FROM report_contents WHERE report_id = ?", (report_id,))
-    cur.execute("DELETE FROM reports WHERE id = ?", (report_id,))
-    conn.commit()
-    conn.close()
+    # 휴지통으로 이동만 (행 1개 UPDATE), 내용·첨부파일은 보관 기간이 지나면 purge_trash 작업이 일괄 삭제
+    with write_transaction(conn):
+        cur.execute(
+            "UPDATE reports SET deleted_at = ?, deleted_by = ? WHERE id = ? AND deleted_at IS NULL",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), session["user"]["username"], report_id)
+        )
+        record_audit(cur, "delete", report_id, report["title"], audit_file_names(files), report["department"],
+                     detail={"created_at": report["created_at"]})
+    invalidate_report_cache(report_id, report["department"])
+    invalidate_file_info(files)
 
-    flash("🗑️ 보고서가 삭제되었습니다.")
+    flash(f"🗑️ 보고서가 휴지통으로 이동되었습니다. ({app.config['TRASH_RETENTION_DAYS']}일 후 영구 삭제)")
     return redirect("/list")
 
 # =========================
@@ -539,80 +2009,153 @@ def delete_report(report_id):
 def delete_file(report_id, filename):
     conn = get_db()
     cur = conn.cursor()
-    file_row = cur.execute(
-        "SELECT department FROM report_files WHERE report_id = ? AND filename = ?",
-        (report_id, filename)
-    ).fetchone()
+    file_row = cur.execute("""
+        SELECT f.id, f.department, f.filename, f.original_name, f.content_hash
+        FROM report_files f JOIN reports r ON r.id = f.report_id
+        WHERE f.report_id = ? AND f.filename = ? AND r.deleted_at IS NULL
+        ORDER BY f.id LIMIT 1
+    """, (report_id, filename)).fetchone()
 
     if not file_row:
-        conn.close()
         return jsonify({"status": "error", "message": "파일 정보가 없습니다."}), 404
 
-    dept = file_row["department"]
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], dept, filename)
-
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        cur.execute('DELETE FROM report_files WHERE report_id = ? AND filename = ?', (report_id, filename))
-        conn.commit()
-        conn.close()
+    if os.path.exists(attachment_path(file_row)):
+        with write_transaction(conn):
+            cur.execute("DELETE FROM report_files WHERE id = ?", (file_row["id"],))
+            remove_attachment_files(conn, [file_row])
+            record_audit(cur, "delete_file", report_id, files=audit_file_names([file_row]),
+                         department=file_row["department"])
+        invalidate_report_cache(report_id, file_row["department"])
         return jsonify({"status": "success", "message": f"{filename} 삭제됨"}), 200
     else:
-        conn.close()
         return jsonify({"status": "error", "message": "파일이 존재하지 않습니다."}), 404
 
 # =========================
 # 파일 미리보기/다운로드
 # =========================
+# 첨부파일 전송 방식 (환경변수 FILE_OFFLOAD)
+# - "" (기본): Flask가 직접 전송 (ETag/Last-Modified, 304, Range 지원)
+# - "x-sendfile": Apache/lighttpd 등이 X-Sendfile 헤더의 경로를 직접 전송
+# - "x-accel": nginx가 X-Accel-Redirect 경로(internal location)를 직접 전송
+#   예) location /_protected_uploads/ { internal; alias /var/data/uploads/; }
+# 로그인 확인/권한 판단은 항상 Flask에서 하고, 바이트 전송만 프록시에 넘긴다.
+app.config["FILE_OFFLOAD"] = os.environ.get("FILE_OFFLOAD", "").lower()
+app.config["X_ACCEL_PREFIX"] = os.environ.get("X_ACCEL_PREFIX", "/_protected_uploads/")
+app.config["USE_X_SENDFILE"] = app.config["FILE_OFFLOAD"] == "x-sendfile"
+
+# 해시 저장소 파일은 내용이 바뀌지 않으므로 브라우저에 1년 캐시 (로그인 사용자 전용 → private)
+ATTACHMENT_CACHE_SECONDS = 365 * 24 * 3600
+
+# (부서, 파일명) → report_files 정보 캐시 (프로세스별 LRU)
+# 휴지통 여부(reports.deleted_at)는 다른 워커에서 바뀌어도 알 수 없으므로 캐시하지 않고 매번 조회
+FILE_INFO_CACHE_SIZE = 2048
+_file_info_cache = OrderedDict()
+_file_info_lock = threading.Lock()
+
+
+def lookup_file_info(department, filename):
+    """첨부파일 DB 정보 조회 (있는 행만 캐시, 없으면 None)"""
+    key = (department, filename)
+    with _file_info_lock:
+        info = _file_info_cache.get(key)
+        if info is not None:
+            _file_info_cache.move_to_end(key)
+            return info
+
+    row = get_db().execute(
+        "SELECT report_id, department, filename, original_name, content_hash "
+        "FROM report_files WHERE department = ? AND filename = ? ORDER BY id LIMIT 1",
+        (department, filename)
+    ).fetchone()
+    if not row:
+        return None
+    info = dict(row)
+    with _file_info_lock:
+        _file_info_cache[key] = info
+        if len(_file_info_cache) > FILE_INFO_CACHE_SIZE:
+            _file_info_cache.popitem(last=False)
+    return info
+
+
+def invalidate_file_info(file_rows):
+    """첨부파일 삭제/변경 시 캐시 제거 (다른 워커 캐시는 파일 존재 확인 후 재조회로 보정)"""
+    with _file_info_lock:
+        for f in file_rows:
+            _file_info_cache.pop((f["department"], f["filename"]), None)
+
+
 @app.route("/uploads/<department>/<path:filename>")
 @login_required
 def uploaded_file(department, filename):
     """첨부파일 다운로드 및 미리보기 (이미지 직접보기, 기타파일 다운로드)"""
-    upload_path = os.path.join(app.config["UPLOAD_FOLDER"], department)
-    full_path = os.path.join(upload_path, filename)
+    # DB에서 저장 위치(해시)와 원래 파일 이름 조회
+    file_info = lookup_file_info(department, filename)
+    full_path = attachment_path(file_info) if file_info else legacy_file_path(department, filename)
+
+    if file_info and not os.path.exists(full_path):
+        # 캐시가 오래됐을 수 있음 (다른 워커에서 삭제/저장소 이동) → 한 번 재조회
+        invalidate_file_info([file_info])
+        file_info = lookup_file_info(department, filename)
+        full_path = attachment_path(file_info) if file_info else legacy_file_path(department, filename)
 
-    if not os.path.exists(full_path):
+    # 휴지통 보고서의 첨부파일은 관리자만 (기본키 조회 1번, 캐시하지 않음 / 영구 삭제됐으면 행 없음)
+    trashed = file_info and session["user"]["department"] != "관리자" and not get_db().execute(
+        "SELECT 1 FROM reports WHERE id = ? AND deleted_at IS NULL", (file_info["report_id"],)
+    ).fetchone()
+    if trashed or not os.path.exists(full_path):
         return jsonify({"status": "error", "message": "파일이 존재하지 않습니다."}), 404
 
     try:
-        # DB에서 원래 파일 이름 조회
-        conn = get_db()
-        cur = conn.cursor()
-        file_info = cur.execute(
-            "SELECT original_name FROM report_files WHERE department = ? AND filename = ?",
-            (department, filename)
-        ).fetchone()
-        conn.close()
-
         download_name = file_info["original_name"] if file_info and file_info["original_name"] else filename
+        content_hash = file_info["content_hash"] if file_info else None
+        immutable = bool(content_hash) and full_path == blob_path(content_hash)
 
-        # MIME 타입 자동 추정
-        mime_type, _ = mimetypes.guess_type(full_path)
+        # MIME 타입 자동 추정 (저장소 파일은 확장자가 없으므로 파일명 기준)
+        mime_type, _ = mimetypes.guess_type(filename)
+        if not mime_type:
+            mime_type, _ = mimetypes.guess_type(download_name)
         mime_type = mime_type or "application/octet-stream"
 
-        # ✅ 이미지 파일은 새창 열기 (as_attachment=False)
-        if mime_type.startswith("image/"):
-            response = send_file(
-                full_path,
-                as_attachment=False,
-                mimetype=mime_type
-            )
+        # ✅ 이미지 파일은 새창 열기, 나머지는 다운로드
+        as_attachment = not mime_type.startswith("image/")
+        # 저장소 파일은 내용 해시가 곧 강한 ETag, 예전 폴더 파일은 Werkzeug 기본값(mtime/크기)
+        etag = content_hash if immutable else True
+
+        if app.config["FILE_OFFLOAD"] == "x-accel":
+            # nginx가 파일 전송(Range 포함), Flask는 헤더와 304 판단만
+            relative_path = os.path.relpath(full_path, app.config["UPLOAD_FOLDER"])
+            response = Response(mimetype=mime_type)
+            response.headers["X-Accel-Redirect"] = app.config["X_ACCEL_PREFIX"] + urllib.parse.quote(relative_path)
+            response.set_etag(content_hash or f"{os.path.getmtime(full_path)}-{os.path.getsize(full_path)}")
+            response.last_modified = os.path.getmtime(full_path)
+            response = response.make_conditional(request)
         else:
-            # ✅ 나머지는 다운로드 (as_attachment=True)
+            # conditional=True: If-None-Match/If-Modified-Since → 304, Range → 206
             response = send_file(
                 full_path,
-                as_attachment=True,
+                as_attachment=as_attachment,
                 download_name=download_name,
-                mimetype=mime_type
+                mimetype=mime_type,
+                conditional=True,
+                etag=etag,
             )
+
+        if as_attachment:
             quoted_name = urllib.parse.quote(download_name)
             response.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quoted_name}"
 
-        # ✅ 캐시 방지 헤더
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-        response.headers["Pragma"] = "no-cache"
+        # ✅ 캐시 헤더: 해시 저장소 파일은 장기 캐시, 예전 폴더 파일은 매번 ETag로 재검증
+        if immutable:
+            response.headers["Cache-Control"] = f"private, max-age={ATTACHMENT_CACHE_SECONDS}, immutable"
+        else:
+            response.headers["Cache-Control"] = "private, no-cache"
         response.headers["X-Render-Bypass"] = "true"
 
+        # 감사 로그: 실제 전송만 (304 재검증, 이어받기 중간 구간은 제외)
+        if response.status_code == 200 or (
+            response.status_code == 206 and request.range and request.range.ranges[0][0] == 0
+        ):
+            record_download(file_info, department, filename)
         return response
 
     except Exception as e:
@@ -620,13 +2163,2405 @@ def uploaded_file(department, filename):
         return jsonify({"status": "error", "message": "파일 전송 중 오류가 발생했습니다."}), 500
 
 # =========================
-# 실행
+# 🗜️ 첨부파일 ZIP 일괄 다운로드
 # =========================
-if __name__ == "__main__":
-    if not os.path.exists(DB_PATH):
-        print("⚙️ reports.db not found. Creating new persistent database...")
-        init_db()
-        print("✅ reports.db created successfully at /var/data")
-    app.run(host="0.0.0.0", port=5000, debug=False)
+# 보고서 1건 또는 /list 필터에 맞는 보고서 전체의 첨부파일을 ZIP 하나로 내려받는다.
+# 압축 결과를 메모리/디스크에 모으지 않고 파일을 ZIP_CHUNK_SIZE씩 읽어 쓰는 즉시 응답으로 흘려보낸다.
+# (되감을 수 없는 스트림이므로 zipfile이 크기/CRC를 각 항목 뒤 data descriptor로 기록)
+# 항목 경로: <부서>/<순번>/<원래 파일명> (한글 이름은 UTF-8 플래그로 저장)
+ZIP_CHUNK_SIZE = 256 * 1024
+# 이미 압축된 형식은 다시 압축해도 줄지 않으므로 그대로 담음 (ZIP_STORED)
+ZIP_STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".hwp", ".hwpx", ".docx", ".xlsx", ".pptx",
+    ".zip", ".7z", ".gz", ".rar", ".mp3", ".mp4", ".mov",
+}
+
+
+class _ZipSink:
+    """zipfile이 쓴 바이트를 모아 두었다가 생성기가 꺼내 가는 쓰기 전용 버퍼"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _zip_segment(name):
+    """ZIP 경로 한 단계로 쓸 수 있게 정리 (경로 구분자/상위 경로 제거)"""
+    name = re.sub(r'[\\/\x00-\x1f]', "_", str(name)).strip()
+    return name if name.strip(".") else "_"
+
+
+def _unique_zip_name(used, name):
+    """같은 폴더 안에서 이름이 겹치면 '이름 (2).확장자' 식으로 번호 붙임"""
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    used.add(candidate.lower())
+    return candidate
+
+
+def iter_zip_file_rows(where, params, search_query="", search_filter="title_content"):
+    """
+    ZIP에 담을 첨부파일 행 생성기 (부서, 순번, 첨부 순서대로)
+    - iter_export_rows와 같이 전용 연결에서 EXPORT_BATCH_SIZE씩 읽음
+    """
+    hits_sql, hits_params = build_search_hits(search_query, search_filter)
+    hit_filter = f"AND r.id IN (SELECT report_id FROM ({hits_sql}))" if hits_sql else ""
+    conn = connect_db()
+    try:
+        cur = conn.execute(f"""
+            SELECT f.report_id, r.local_id, r.title, f.department, f.filename, f.original_name, f.content_hash
+            FROM reports r
+            JOIN report_files f ON f.report_id = r.id
+            WHERE {where} {hit_filter}
+            ORDER BY r.department, r.local_id, f.id
+        """, [*params, *hits_params])
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def stream_attachments_zip(file_rows):
+    """
+    첨부파일 행 → ZIP 바이트 청크 생성기
+    - 보고서별로 다운로드 감사 기록 1건 (실제로 담은 파일만)
+    """
+    sink = _ZipSink()
+    current, used, written = None, set(), []
+
+    def flush_audit():
+        if current and written:
+            _audit_buffer.add(_audit_event(
+                "download", current["report_id"], current["title"], written, current["department"],
+                detail={"archive": "zip"},
+            ))
+
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for f in file_rows:
+            if current is None or f["report_id"] != current["report_id"]:
+                flush_audit()
+                current, used, written = f, set(), []
+            path = attachment_path(f)
+            if not os.path.exists(path):
+                continue
+            original_name = f["original_name"] or f["filename"]
+            name = _unique_zip_name(used, _zip_segment(original_name))
+            info = zipfile.ZipInfo(
+                f"{_zip_segment(f['department'])}/{f['local_id']}/{name}",
+                date_time=time.localtime(max(os.path.getmtime(path), 315619200))[:6],  # ZIP 날짜는 1980년부터
+            )
+            info.file_size = os.path.getsize(path)  # 4GB 넘으면 zipfile이 zip64 항목으로 기록
+            info.external_attr = 0o644 << 16
+            stored = os.path.splitext(name)[1].lower() in ZIP_STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, archive.open(info, "w") as dst:
+                for chunk in iter(lambda: src.read(ZIP_CHUNK_SIZE), b""):
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            written.append(original_name)
+            yield sink.drain()
+        flush_audit()
+    # 중앙 디렉터리 (ZipFile 닫을 때 기록)
+    yield sink.drain()
+
+
+def zip_response(file_rows, download_name):
+    response = Response(stream_with_context(stream_attachments_zip(file_rows)), mimetype="application/zip")
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=attachments.zip; filename*=UTF-8''{urllib.parse.quote(download_name)}"
+    )
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Render-Bypass"] = "true"
+    return response
+
+
+@app.route("/view/<int:report_id>/attachments.zip")
+@login_required
+def download_report_attachments(report_id):
+    """보고서 1건의 첨부파일 전체 ZIP"""
+    conn = get_db()
+    report = conn.execute(
+        "SELECT department, local_id FROM reports WHERE id = ? AND deleted_at IS NULL", (report_id,)
+    ).fetchone()
+    if not report:
+        flash("❌ 존재하지 않는 보고서입니다.")
+        return redirect("/list")
+    files = conn.execute("""
+        SELECT f.report_id, r.local_id, r.title, f.department, f.filename, f.original_name, f.content_hash
+        FROM report_files f JOIN reports r ON r.id = f.report_id
+        WHERE f.report_id = ?
+        ORDER BY f.id
+    """, (report_id,)).fetchall()
+    if not files:
+        flash("❌ 첨부파일이 없습니다.")
+        return redirect(url_for("view_report", report_id=report_id))
+    return zip_response(files, f"첨부파일_{report['department']}_{report['local_id']}.zip")
+
+
+# =========================
+# 📦 첨부파일 저장소 (내용 해시 기준, 중복 제거)
+# =========================
+# 원본 파일은 uploads/_store/<해시 앞 2자리>/<SHA-256> 하나만 저장하고
+# report_files 행들이 content_hash로 참조한다. (같은 파일을 여러 번 올려도 디스크는 1개분)
+# 참조 수는 attachment_blobs.refcount (report_files 트리거가 관리),
+# 마지막 참조가 지워질 때만 실제 파일/썸네일 삭제.
+# content_hash가 없거나 저장소에 없는 행은 예전 방식(uploads/<부서>/<파일명>) 그대로 읽는다.
+STORE_DIR = "_store"
+
+
+def blob_path(content_hash):
+    return os.path.join(app.config["UPLOAD_FOLDER"], STORE_DIR, content_hash[:2], content_hash)
+
+
+def legacy_file_path(department, filename):
+    return os.path.join(app.config["UPLOAD_FOLDER"], department, filename)
+
+
+def attachment_path(file_row):
+    """첨부파일 실제 경로 (저장소 우선, 없으면 부서 폴더)"""
+    if file_row["content_hash"]:
+        path = blob_path(file_row["content_hash"])
+        if os.path.exists(path):
+            return path
+    return legacy_file_path(file_row["department"], file_row["filename"])
+
+
+def stored_filename(original_name, content_hash):
+    """
+    DB/URL용 파일명: <해시 앞 12자리>-<임의 8자리>_<정제된 원본명>
+    - 실제 파일은 해시 경로 하나를 공유하지만, 같은 파일을 여러 보고서에 올려도
+      행마다 이름이 달라야 (부서, 파일명)으로 어느 보고서의 첨부인지 구분됨
+    - 한글만 있는 이름은 secure_filename이 확장자만 남기므로 확장자 보존
+    """
+    stem, ext = os.path.splitext(original_name)
+    safe_stem, safe_ext = clean_filename(stem), clean_filename(ext).lower()
+    prefix = f"{content_hash[:12]}-{secrets.token_hex(4)}"
+    name = f"{prefix}_{safe_stem}" if safe_stem else prefix
+    return f"{name}.{safe_ext}" if safe_ext else name
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """파일 내용 SHA-256 (청크 단위로 읽어 메모리 사용 일정)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_tmp_dir():
+    """업로드 임시 폴더 (init_data_dirs()에서 생성)"""
+    return os.path.join(app.config["UPLOAD_FOLDER"], STORE_DIR, "tmp")
+
+
+class StagedUpload:
+    """
+    multipart 파싱 중 파일 본문을 저장소 임시 폴더에 바로 쓰는 스트림
+    - 청크가 들어올 때마다 SHA-256/크기 누적 (저장 후 다시 읽지 않음)
+    - 파일당 용량 초과 시 즉시 중단 (413)
+    - commit_blob()으로 옮겨지지 않은 임시 파일은 요청 종료 시 close()에서 삭제
+    """
+
+    def __init__(self, max_size=None):
+        fd, self.name = tempfile.mkstemp(dir=store_tmp_dir())
+        self._file = os.fdopen(fd, "w+b")
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            self.close()
+            raise RequestEntityTooLarge(f"file exceeds {self.max_size} bytes")
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def finish(self):
+        """디스크에 확실히 기록(fsync)한 뒤 (임시 경로, content_hash) 반환"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        record_upload(self.size)
+        return self.name, self._digest.hexdigest()
+
+    def close(self):
+        self._file.close()
+        if os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """첨부파일을 메모리/시스템 임시폴더 대신 StagedUpload로 받는 Request"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return StagedUpload(max_size=app.config.get("MAX_UPLOAD_FILE_SIZE"))
+
+
+app.request_class = UploadRequest
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    mb = 1024 * 1024
+    file_limit = app.config.get("MAX_UPLOAD_FILE_SIZE") or 0
+    request_limit = app.config.get("MAX_CONTENT_LENGTH") or 0
+    flash(f"❌ 첨부파일 용량이 너무 큽니다. (파일당 {file_limit // mb}MB, 한 번에 {request_limit // mb}MB까지)")
+    return redirect(request.referrer or "/list")
+
+
+def stage_upload(file_storage):
+    """
+    업로드 파일을 저장소 임시 폴더에 확정 기록하고 해시 반환
+    - 반환: (임시 경로, content_hash) → commit_blob()으로 확정
+    - UploadRequest로 받은 파일은 이미 디스크에 있으므로 fsync만,
+      그 외 스트림은 청크 단위로 복사하면서 해시 계산
+    """
+    if not isinstance(file_storage.stream, StagedUpload):
+        staged = StagedUpload(max_size=app.config.get("MAX_UPLOAD_FILE_SIZE"))
+        for chunk in iter(lambda: file_storage.stream.read(1024 * 1024), b""):
+            staged.write(chunk)
+        file_storage.stream = staged  # 요청 종료 시 남은 임시 파일 정리
+    return file_storage.stream.finish()
+
+
+def stage_uploads(files):
+    """
+    요청의 첨부파일들을 DB 트랜잭션 전에 모두 디스크에 기록
+    - 반환: [(임시 경로, content_hash, 원본 파일명)]
+    - 저장소로 옮기지 못한 임시 파일(트랜잭션 실패 등)은 요청 종료 시 삭제됨
+    """
+    return [(*stage_upload(f), f.filename) for f in files if f and f.filename]
+
+
+def commit_blob(tmp_path, content_hash):
+    """
+    임시 파일을 저장소에 확정 (이미 같은 내용이 있으면 임시 파일만 삭제)
+    - write_transaction 안에서 호출: 삭제(purge_unreferenced_blobs)와 쓰기 잠금으로 직렬화되어
+      '있는 줄 알았던 파일이 방금 지워지는' 경합이 없음
+    - 반환: (저장소 경로, 이번에 새로 만들었는지)
+    """
+    dest = blob_path(content_hash)
+    if os.path.exists(dest):
+        os.remove(tmp_path)
+        return dest, False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(tmp_path, dest)
+    return dest, True
+
+
+def save_attachments(cur, report_id, department, staged, undo):
+    """
+    stage_uploads()로 기록해 둔 파일들을 저장소에 확정하고 report_files에 기록
+    - write_transaction(conn, undo) 안에서 호출 (파일 이름 변경만 하므로 쓰기 잠금은 짧게 유지)
+    - 새로 만든 저장소 파일은 undo에 삭제 함수를 추가 → 롤백되면 attachment_blobs 행 없는 파일이 남지 않음
+    - 반환: [(저장소 경로, content_hash)] → 썸네일 작업 등록에 사용
+    """
+    saved = []
+    for tmp_path, content_hash, original_name in staged:
+        path, created = commit_blob(tmp_path, content_hash)
+        if created:
+            undo.append(lambda path=path: os.remove(path))
+        cur.execute(
+            """
+            INSERT INTO report_files (report_id, department, filename, original_name, content_hash)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (report_id, department, stored_filename(original_name, content_hash), original_name, content_hash)
+        )
+        saved.append((path, content_hash))
+    return saved
+
+
+def purge_unreferenced_blobs(conn, hashes):
+    """
+    참조 수 0이 된 저장소 파일 행 삭제 (write_transaction 안에서 report_files 삭제 직후 호출)
+    - 반환: 삭제 대상 content_hash 목록 → 실제 파일은 delete_blob_files()에서 정리
+    """
+    hashes = [h for h in set(hashes) if h]
+    if not hashes:
+        return []
+    rows = conn.execute(
+        """
+        DELETE FROM attachment_blobs
+        WHERE refcount <= 0 AND content_hash IN (SELECT value FROM json_each(?))
+        RETURNING content_hash
+        """,
+        (json.dumps(hashes),)
+    ).fetchall()
+    return [row["content_hash"] for row in rows]
+
+
+def delete_blob_files(conn, hashes):
+    """
+    저장소 파일 + 썸네일 삭제 (작업 큐에서 실행)
+    - 쓰기 잠금 안에서 참조 여부를 다시 확인: 그 사이 같은 내용이 다시 업로드됐으면 남겨둠
+      (commit_blob도 쓰기 잠금 안에서 실행되므로 서로 엇갈리지 않음)
+    - 반환: 실제 삭제한 파일 수
+    """
+    removed = 0
+    with write_transaction(conn):
+        referenced = {row[0] for row in conn.execute(
+            "SELECT content_hash FROM attachment_blobs WHERE content_hash IN (SELECT value FROM json_each(?))",
+            (json.dumps(hashes),)
+        )}
+        for content_hash in hashes:
+            if content_hash in referenced:
+                continue
+            for path in [blob_path(content_hash)] + [thumbnail_path(s, content_hash) for s in THUMBNAIL_SIZES]:
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += path == blob_path(content_hash)
+    return removed
+
+
+def remove_attachment_files(conn, file_rows):
+    """
+    report_files 행 삭제 후 파일 정리 작업 등록 (write_transaction 안에서 호출)
+    - 저장소 파일: 참조 수 0이 된 것만
+    - 예전 부서 폴더 파일: 행마다 고유하므로 있으면 모두
+    - 실제 삭제는 작업 큐(delete_files)에서 처리 → 응답은 커밋 직후 반환
+    """
+    invalidate_file_info(file_rows)
+    if not file_rows:
+        return None
+    return enqueue_job(conn, "delete_files", {
+        "blobs": purge_unreferenced_blobs(conn, [f["content_hash"] for f in file_rows]),
+        "legacy": [[f["department"], f["filename"]] for f in file_rows],
+    })
+
+
+@app.cli.command("migrate-uploads")
+@click.option("--dry-run", is_flag=True, help="옮기지 않고 중복/절약 용량만 계산")
+def migrate_uploads_command(dry_run):
+    """부서별 업로드 폴더의 기존 첨부파일을 해시 저장소로 이동 (중복 파일은 1개만 남김)"""
+    init_db()
+    conn = connect_db()
+    rows = conn.execute(
+        "SELECT DISTINCT department, filename FROM report_files ORDER BY department, filename"
+    ).fetchall()
+    started = time.perf_counter()
+    moved = deduplicated = missing = 0
+    saved_bytes = 0
+    seen = set()
+    for row in rows:
+        legacy_path = legacy_file_path(row["department"], row["filename"])
+        if not os.path.isfile(legacy_path):
+            missing += 1
+            continue
+        content_hash = file_sha256(legacy_path)
+        size = os.path.getsize(legacy_path)
+        duplicate = content_hash in seen or os.path.exists(blob_path(content_hash))
+        seen.add(content_hash)
+        if duplicate:
+            deduplicated += 1
+            saved_bytes += size
+        else:
+            moved += 1
+        if dry_run:
+            continue
+        # 행 갱신과 파일 이동을 같은 쓰기 잠금 안에서 (중간에 실패해도 원본은 그대로 읽힘)
+        with write_transaction(conn):
+            conn.execute(
+                "UPDATE report_files SET content_hash = ? WHERE department = ? AND filename = ?",
+                (content_hash, row["department"], row["filename"])
+            )
+            if duplicate:
+                os.remove(legacy_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path(content_hash)), exist_ok=True)
+                os.replace(legacy_path, blob_path(content_hash))
+    conn.close()
+    if not dry_run:
+        invalidate_all_render_cache()
+    click.echo(
+        f"uploads{' (dry run)' if dry_run else ''}: {moved} moved, {deduplicated} duplicates removed "
+        f"({saved_bytes / 1024 / 1024:.1f} MB saved), {missing} missing "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
+
+# =========================
+# 🖼️ 썸네일 / 미리보기 이미지
+# =========================
+# 업로드 시 원본과 함께 작은 이미지를 만들어 두고 갤러리에서는 원본 대신 사용한다.
+# 파일 경로: uploads/_thumbs/<크기>/<해시 앞 2자리>/<원본 SHA-256>.jpg
+# (내용 기준 키라서 같은 원본은 같은 썸네일을 공유하고, URL이 바뀌지 않으면 내용도 바뀌지 않음)
+THUMBNAIL_SIZES = {
+    "thumb": 400,     # 상세보기 갤러리 (화면 200px, 고해상도 화면 대비 2배)
+    "preview": 1600,  # 이미지 클릭 시 보기
+}
+THUMBNAIL_QUALITY = 82
+THUMBNAIL_CACHE_SECONDS = 365 * 24 * 3600
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+@app.template_global()
+def is_image_file(f):
+    """첨부파일이 이미지인지 (저장 파일명은 한글이 지워져 확장자만 남을 수 있어 원본명도 확인)"""
+    names = (f.get("original_name") or "", f.get("filename") or "")
+    return any(name.lower().endswith(IMAGE_EXTENSIONS) for name in names)
+
+
+def thumbnail_path(size, content_hash):
+    return os.path.join(
+        app.config["UPLOAD_FOLDER"], "_thumbs", size, content_hash[:2], f"{content_hash}.jpg"
+    )
+
+
+def generate_thumbnails(src_path, content_hash, sizes=None, force=False):
+    """
+    원본 이미지로 썸네일 생성 (이미 있으면 건너뜀)
+    - 이미지 여부는 확장자가 아니라 Pillow로 열어서 판단
+    - 이미지가 아니거나 Pillow 미설치/열기 실패 시 빈 목록 반환
+    - 반환: 생성(또는 이미 존재)한 크기 이름 목록
+    """
+    if Image is None:
+        return []
+    sizes = sizes or list(THUMBNAIL_SIZES)
+    todo = [s for s in sizes if force or not os.path.exists(thumbnail_path(s, content_hash))]
+    if not todo:
+        return sizes
+    try:
+        with Image.open(src_path) as img:
+            # 가장 큰 크기부터 줄여가며 재사용 (JPEG는 draft로 디코딩 단계에서 축소)
+            largest = max(THUMBNAIL_SIZES[s] for s in todo)
+            img.draft("RGB", (largest, largest))
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            for size in sorted(todo, key=lambda s: -THUMBNAIL_SIZES[s]):
+                limit = THUMBNAIL_SIZES[size]
+                img.thumbnail((limit, limit), Image.LANCZOS)
+                dest = thumbnail_path(size, content_hash)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp_path = f"{dest}.{os.getpid()}.tmp"
+                img.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+                os.replace(tmp_path, dest)
+    except Image.UnidentifiedImageError:
+        return []  # 이미지가 아닌 첨부파일
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"⚠️ Thumbnail generation failed for {src_path}: {e}")
+        return []
+    return sizes
+
+
+def ensure_content_hash(conn, file_row):
+    """content_hash가 없는 (구버전) 첨부파일은 원본을 읽어 해시 계산 후 저장"""
+    if file_row["content_hash"]:
+        return file_row["content_hash"]
+    src_path = attachment_path(file_row)
+    if not os.path.exists(src_path):
+        return None
+    content_hash = file_sha256(src_path)
+    with write_transaction(conn):
+        conn.execute(
+            "UPDATE report_files SET content_hash = ? WHERE department = ? AND filename = ?",
+            (content_hash, file_row["department"], file_row["filename"])
+        )
+    invalidate_file_info([file_row])
+    return content_hash
+
+
+@app.template_global()
+def thumbnail_url(f, size="thumb"):
+    """템플릿용 썸네일 URL (해시가 있으면 캐시 가능한 고정 URL, 없으면 해시 계산 후 이동)"""
+    if f.get("content_hash"):
+        return url_for("thumbnail", size=size, content_hash=f["content_hash"])
+    return url_for("thumbnail_for_file", size=size, department=f["department"], filename=f["filename"])
+
+
+@app.route("/thumbs/<size>/<content_hash>.jpg")
+@login_required
+def thumbnail(size, content_hash):
+    """썸네일 제공 (없으면 그 자리에서 생성, 내용 기준 URL이므로 장기 캐시)"""
+    if size not in THUMBNAIL_SIZES or not re.fullmatch(r"[0-9a-f]{64}", content_hash):
+        return jsonify({"status": "error", "message": "잘못된 썸네일 요청입니다."}), 404
+
+    path = thumbnail_path(size, content_hash)
+    if not os.path.exists(path):
+        row = get_db().execute(
+            "SELECT department, filename, content_hash FROM report_files WHERE content_hash = ? LIMIT 1",
+            (content_hash,)
+        ).fetchone()
+        if not row:
+            return jsonify({"status": "error", "message": "파일이 존재하지 않습니다."}), 404
+        src_path = attachment_path(row)
+        if not generate_thumbnails(src_path, content_hash, sizes=[size]):
+            # 이미지가 아니거나 변환 불가 → 원본으로
+            return redirect(url_for("uploaded_file", department=row["department"], filename=row["filename"]))
+
+    response = send_file(
+        path,
+        mimetype="image/jpeg",
+        conditional=True,
+        etag=f"{content_hash}-{size}",
+        max_age=THUMBNAIL_CACHE_SECONDS,
+    )
+    response.headers["Cache-Control"] = f"private, max-age={THUMBNAIL_CACHE_SECONDS}, immutable"
+    return response
+
+
+@app.route("/thumbs/<size>/<department>/<path:filename>")
+@login_required
+def thumbnail_for_file(size, department, filename):
+    """해시가 아직 없는 첨부파일의 썸네일 → 해시 계산 후 고정 URL로 이동"""
+    if size not in THUMBNAIL_SIZES:
+        return jsonify({"status": "error", "message": "잘못된 썸네일 요청입니다."}), 404
+    conn = get_db()
+    row = conn.execute(
+        "SELECT department, filename, content_hash FROM report_files WHERE department = ? AND filename = ?",
+        (department, filename)
+    ).fetchone()
+    content_hash = ensure_content_hash(conn, row) if row else None
+    if not content_hash:
+        return jsonify({"status": "error", "message": "파일이 존재하지 않습니다."}), 404
+    return redirect(url_for("thumbnail", size=size, content_hash=content_hash))
+
+
+@app.cli.command("thumbnails-backfill")
+@click.option("--force", is_flag=True, help="이미 있는 썸네일도 다시 생성")
+def thumbnails_backfill_command(force):
+    """기존 첨부 이미지의 해시/썸네일 일괄 생성"""
+    if Image is None:
+        raise click.ClickException("Pillow is not installed")
+    init_db()
+    conn = connect_db()
+    rows = conn.execute(
+        "SELECT department, filename, original_name, content_hash FROM report_files ORDER BY id"
+    ).fetchall()
+    started = time.perf_counter()
+    done = skipped = missing = 0
+    for row in rows:
+        if not is_image_file(dict(row)):
+            skipped += 1
+            continue
+        content_hash = ensure_content_hash(conn, row)
+        if not content_hash:
+            missing += 1
+            continue
+        src_path = attachment_path({**dict(row), "content_hash": content_hash})
+        if generate_thumbnails(src_path, content_hash, force=force):
+            done += 1
+        else:
+            skipped += 1
+    conn.close()
+    click.echo(
+        f"thumbnails: {done} images processed, {skipped} skipped, {missing} missing originals "
+        f"({time.perf_counter() - started:.1f}s)"
+    )
+
+# =========================
+# ⏳ 백그라운드 작업 큐 (SQLite jobs 테이블)
+# =========================
+# 요청 처리 중에는 DB 행과 함께 작업만 등록(같은 트랜잭션)하고 바로 응답,
+# 썸네일 생성·파일 삭제 같은 후처리는 작업 프로세스가 처리한다.
+# - 실행: flask --app app:create_app jobs-worker --processes 2
+#   (gunicorn.conf.py가 JOB_WORKERS 개수만큼 함께 띄움, python app.py 실행 시에는 스레드 1개)
+# - 실패 시 JOB_RETRY_DELAY × 2^(시도-1)초 뒤 재시도, max_attempts 초과 시 failed
+# - running 상태로 JOB_LOCK_TIMEOUT초가 지난 작업(작업 프로세스 비정상 종료)은 다시 가져감
+# 새 작업 종류는 @job_handler("이름")으로 등록한다. 처리 함수는 여러 번 실행돼도 안전해야 한다.
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+JOB_RETRY_DELAY = 10
+JOB_LOCK_TIMEOUT = 600
+JOB_RETENTION_DAYS = 7     # 완료된 작업 기록 보관 기간
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue_job(conn, kind, payload, max_attempts=3, delay=0):
+    """작업 등록 (보통 write_transaction 안에서 호출 → 데이터와 함께 커밋) → 작업 id"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"unknown job kind: {kind}")
+    return conn.execute(
+        """
+        INSERT INTO jobs (kind, payload, max_attempts, run_after, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (kind, json.dumps(payload, ensure_ascii=False), max_attempts, time.time() + delay,
+         datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    ).lastrowid
+
+
+def enqueue_thumbnails(conn, saved):
+    """save_attachments() 결과로 썸네일 작업 등록 (첨부파일이 없으면 등록 안 함)"""
+    hashes = sorted({content_hash for _, content_hash in saved})
+    return enqueue_job(conn, "thumbnails", {"hashes": hashes}) if hashes else None
+
+
+@job_handler("thumbnails")
+def _thumbnails_job(conn, payload):
+    for content_hash in payload["hashes"]:
+        src_path = blob_path(content_hash)
+        if os.path.exists(src_path):  # 그 사이 삭제된 파일은 건너뜀
+            generate_thumbnails(src_path, content_hash)
+
+
+@job_handler("delete_files")
+def _delete_files_job(conn, payload):
+    for department, filename in payload.get("legacy", []):
+        legacy_path = legacy_file_path(department, filename)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+    if payload.get("blobs"):
+        delete_blob_files(conn, payload["blobs"])
+
+
+def claim_job(conn, worker_id):
+    """실행할 작업 1개를 running으로 바꾸고 반환 (없으면 None)"""
+    now = time.time()
+    ready_sql = """
+        SELECT id FROM jobs
+        WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND locked_at < ?)
+        ORDER BY id LIMIT 1
+    """
+    params = (now, now - JOB_LOCK_TIMEOUT)
+    # 대기 작업이 없으면 쓰기 잠금 없이 끝냄 (유휴 시 폴링 비용 최소화)
+    if conn.execute(ready_sql, params).fetchone() is None:
+        return None
+    with write_transaction(conn):
+        return conn.execute(f"""
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?, locked_at = ?
+            WHERE id = ({ready_sql})
+            RETURNING id, kind, payload, attempts, max_attempts
+        """, (worker_id, now, *params)).fetchone()
+
+
+def run_job(conn, job):
+    """작업 1개 실행 후 결과 기록 → 성공 여부 (finished_at은 처리 함수가 끝난 시각)"""
+    try:
+        JOB_HANDLERS[job["kind"]](conn, json.loads(job["payload"]))
+    except Exception as e:
+        finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if conn.in_transaction:
+            conn.rollback()
+        error = f"{type(e).__name__}: {e}"
+        print(f"⚠️ Job {job['id']} ({job['kind']}) failed (attempt {job['attempts']}): {error}")
+        with write_transaction(conn):
+            if job["attempts"] >= job["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', last_error = ?, finished_at = ?, locked_by = NULL WHERE id = ?",
+                    (error, finished_at, job["id"])
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', last_error = ?, run_after = ?, locked_by = NULL WHERE id = ?",
+                    (error, time.time() + JOB_RETRY_DELAY * 2 ** (job["attempts"] - 1), job["id"])
+                )
+        return False
+    finished_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with write_transaction(conn):
+        conn.execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, locked_by = NULL WHERE id = ?",
+            (finished_at, job["id"])
+        )
+    return True
+
+
+def prune_jobs(conn):
+    """보관 기간이 지난 완료 작업 삭제 (실패 작업은 확인용으로 남김)"""
+    cutoff = (datetime.now() - timedelta(days=JOB_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    with write_transaction(conn):
+        conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (cutoff,))
+
+
+def run_job_worker(worker_id=None, once=False, stop=None):
+    """
+    작업 처리 루프
+    - once=True: 지금 실행 가능한 작업을 모두 처리하고 종료 (반환: 처리한 작업 수)
+    - stop: threading.Event 등 is_set()이 참이 되면 현재 작업을 마치고 종료
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    conn = connect_db()
+    processed, last_pruned = 0, 0.0
+    try:
+        while not (stop and stop.is_set()):
+            job = claim_job(conn, worker_id)
+            if job is not None:
+                run_job(conn, job)
+                processed += 1
+                continue
+            if once:
+                break
+            if time.time() - last_pruned > 3600:
+                # 한 시간마다: 오래된 작업 기록 정리 + 휴지통 보관 기간 만료분 삭제 + 정기 백업 예약
+                prune_jobs(conn)
+                schedule_trash_purge(conn)
+                schedule_backup(conn)
+                last_pruned = time.time()
+            if stop:
+                stop.wait(JOB_POLL_INTERVAL)
+            else:
+                time.sleep(JOB_POLL_INTERVAL)
+    finally:
+        conn.close()
+    return processed
+
+
+def _job_worker_process(config):
+    """jobs-worker --processes N의 자식 프로세스 (SIGTERM → 현재 작업 마치고 종료)"""
+    create_app(config)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_job_worker(stop=stop)
+
+
+def _raise_system_exit(signum, frame):
+    raise SystemExit(0)
+
+
+def start_job_thread():
+    """개발 서버(python app.py)용: 같은 프로세스에서 작업 처리 스레드 1개 실행"""
+    thread = threading.Thread(target=run_job_worker, name="job-worker", daemon=True)
+    thread.start()
+    return thread
+
+
+@app.cli.command("jobs-worker")
+@click.option("--processes", default=1, show_default=True, help="작업 처리 프로세스 수")
+@click.option("--once", is_flag=True, help="대기 중인 작업만 처리하고 종료")
+def jobs_worker_command(processes, once):
+    """백그라운드 작업 처리 (Ctrl+C / SIGTERM으로 종료)"""
+    init_db()
+    if once:
+        click.echo(f"jobs: {run_job_worker(once=True)} processed")
+        return
+    config = {key: app.config[key] for key in ("DATA_DIR", "DB_PATH", "UPLOAD_FOLDER", "RENDER_CACHE_PATH", "BACKUP_DIR")}
+    workers = [multiprocessing.Process(target=_job_worker_process, args=(config,), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    click.echo(f"jobs: {processes} worker process(es) started")
+    signal.signal(signal.SIGTERM, _raise_system_exit)  # 종료 시 자식 프로세스도 정리
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join(timeout=JOB_LOCK_TIMEOUT)
+
+
+@app.route("/jobs")
+@admin_required
+def job_summary():
+    """작업 큐 현황 (종류·상태별 개수 + 최근 실패)"""
+    conn = get_db()
+    counts = conn.execute(
+        "SELECT kind, status, COUNT(*) AS count FROM jobs GROUP BY kind, status ORDER BY kind, status"
+    ).fetchall()
+    failed = conn.execute("""
+        SELECT id, kind, attempts, last_error, finished_at FROM jobs
+        WHERE status = 'failed' ORDER BY id DESC LIMIT 20
+    """).fetchall()
+    return jsonify({
+        "status": "success",
+        "counts": [dict(row) for row in counts],
+        "failed": [dict(row) for row in failed],
+    })
+
+
+@app.route("/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    """작업 상태 조회 (queued / running / done / failed)"""
+    row = get_db().execute("""
+        SELECT id, kind, status, attempts, max_attempts, last_error, created_at, finished_at
+        FROM jobs WHERE id = ?
+    """, (job_id,)).fetchone()
+    if not row:
+        return jsonify({"status": "error", "message": "작업이 없습니다."}), 404
+    return jsonify({"status": "success", "job": dict(row)})
+
+
+# =========================
+# 🧾 감사 로그 (audit_events)
+# =========================
+# - 작성/수정/삭제/첨부파일 삭제: 변경과 같은 write_transaction 안에서 1행 추가 (함께 커밋/롤백)
+# - 다운로드: 요청마다 쓰기 잠금을 잡지 않도록 메모리에 모았다가 AUDIT_FLUSH_SECONDS마다 한 번에 저장
+#   (프로세스가 비정상 종료되면 마지막 몇 초의 다운로드 기록은 유실될 수 있음)
+# - 예전 delete_log.txt는 flask import-delete-log 로 한 번 가져온다.
+AUDIT_ACTIONS = ["create", "edit", "delete", "restore", "purge", "delete_file", "download"]
+AUDIT_FLUSH_SECONDS = 2
+AUDIT_BUFFER_LIMIT = 10000   # 저장 실패가 이어질 때 메모리에 보관할 최대 건수
+AUDIT_PAGE_SIZE = 100
+
+AUDIT_COLUMNS = ("occurred_at", "action", "username", "user_department", "department",
+                 "report_id", "title", "files", "detail", "source")
+AUDIT_INSERT_SQL = f"""
+    INSERT INTO audit_events ({", ".join(AUDIT_COLUMNS)})
+    SELECT {", ".join(f"json_extract(value, '$[{i}]')" for i in range(len(AUDIT_COLUMNS)))}
+    FROM json_each(?)
+"""
+
+
+def _audit_event(action, report_id=None, title=None, files=(), department=None, detail=None,
+                 user=None, occurred_at=None, source="app"):
+    """audit_events 1행 (AUDIT_COLUMNS 순서의 목록)"""
+    if user is None:
+        user = session.get("user", {}) if has_request_context() else {}
+    return [
+        occurred_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        action,
+        user.get("username"),
+        user.get("department"),
+        department,
+        report_id,
+        title,
+        json.dumps(list(files), ensure_ascii=False),
+        json.dumps(detail, ensure_ascii=False) if detail else None,
+        source,
+    ]
+
+
+def record_audit(conn, action, report_id=None, title=None, files=(), department=None, detail=None):
+    """감사 로그 기록 (write_transaction 안에서 호출 → 변경과 함께 커밋)"""
+    conn.execute(AUDIT_INSERT_SQL, (json.dumps([_audit_event(
+        action, report_id, title, files, department, detail
+    )], ensure_ascii=False),))
+
+
+def audit_file_names(file_rows):
+    return [f["original_name"] or f["filename"] for f in file_rows]
+
+
+class AuditBuffer:
+    """다운로드 기록을 모아 백그라운드 스레드에서 일괄 저장 (워커 프로세스마다 1개)"""
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def add(self, event):
+        with self.lock:
+            if self.pid != os.getpid():  # fork 이후 첫 기록 시 이 프로세스의 저장 스레드 시작
+                self.pid = os.getpid()
+                self.events = []
+                threading.Thread(target=self._run, name="audit-flush", daemon=True).start()
+            if len(self.events) < AUDIT_BUFFER_LIMIT:
+                self.events.append(event)
+
+    def _run(self):
+        while True:
+            time.sleep(AUDIT_FLUSH_SECONDS)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            events, self.events = self.events, []
+        if not events:
+            return 0
+        try:
+            conn = connect_db()
+            try:
+                with write_transaction(conn):
+                    conn.execute(AUDIT_INSERT_SQL, (json.dumps(events, ensure_ascii=False),))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Audit log flush failed ({len(events)} events kept): {e}")
+            with self.lock:
+                self.events = (events + self.events)[:AUDIT_BUFFER_LIMIT]
+            return 0
+        return len(events)
+
+
+_audit_buffer = AuditBuffer()
+atexit.register(_audit_buffer.flush)
+
+
+def record_download(file_info, department, filename):
+    """다운로드 기록 (일괄 저장 대기열에 추가)"""
+    _audit_buffer.add(_audit_event(
+        "download",
+        report_id=file_info["report_id"] if file_info else None,
+        files=[(file_info and file_info["original_name"]) or filename],
+        department=department,
+    ))
+
+
+def parse_delete_log(text):
+    """
+    예전 delete_log.txt 블록 파싱 → [{occurred_at, username, user_department, report_id, title, department, created_at, files}]
+    - 삭제자 형식: "부서 (아이디)"
+    """
+    events = []
+    for block in re.split(r"^=+\s*$", text, flags=re.M):
+        fields, files = {}, []
+        for line in block.splitlines():
+            m = re.match(r"\s*\[(.+?)\]\s*(.*)$", line)
+            if m:
+                fields[m.group(1)] = m.group(2).strip()
+            elif line.strip().startswith("┗"):
+                files.append(line.strip().lstrip("┗").strip())
+        if "삭제일시" not in fields:
+            continue
+        deleter = re.match(r"(.*?)\s*\((.*)\)$", fields.get("삭제자", ""))
+        report_id = fields.get("보고서ID", "")
+        events.append({
+            "occurred_at": fields["삭제일시"],
+            "username": deleter.group(2) if deleter else fields.get("삭제자") or None,
+            "user_department": deleter.group(1) if deleter else None,
+            "report_id": int(report_id) if report_id.isdigit() else None,
+            "title": fields.get("제목"),
+            "department": fields.get("부서"),
+            "created_at": fields.get("작성일"),
+            "files": files,
+        })
+    return events
+
+
+@app.cli.command("import-delete-log")
+@click.argument("path", default=os.path.join(BASE_DIR, "delete_log.txt"))
+@click.option("--dry-run", is_flag=True, help="파싱 결과만 출력")
+def import_delete_log_command(path, dry_run):
+    """예전 delete_log.txt를 audit_events로 가져오기 (이미 가져온 항목은 건너뜀)"""
+    init_db()
+    with open(path, encoding="utf-8") as fp:
+        events = parse_delete_log(fp.read())
+    conn = connect_db()
+    imported = 0
+    with write_transaction(conn):
+        for e in events:
+            exists = conn.execute("""
+                SELECT 1 FROM audit_events
+                WHERE source = 'delete_log.txt' AND occurred_at = ? AND report_id IS ?
+            """, (e["occurred_at"], e["report_id"])).fetchone()
+            if exists:
+                continue
+            imported += 1
+            if dry_run:
+                click.echo(f"{e['occurred_at']} {e['username']} report {e['report_id']} {e['title']} files={e['files']}")
+                continue
+            conn.execute(AUDIT_INSERT_SQL, (json.dumps([_audit_event(
+                "delete", e["report_id"], e["title"], e["files"], e["department"],
+                detail={"created_at": e["created_at"]} if e["created_at"] else None,
+                user={"username": e["username"], "department": e["user_department"]},
+                occurred_at=e["occurred_at"], source="delete_log.txt",
+            )], ensure_ascii=False),))
+    conn.close()
+    click.echo(f"delete log{' (dry run)' if dry_run else ''}: {imported} imported, "
+               f"{len(events) - imported} already present ({len(events)} entries)")
+
+
+@app.route("/admin/audit")
+@admin_required
+def audit_log():
+    """감사 로그 조회 (기간/사용자/작업/보고서 번호 필터, 최신순 100건씩)"""
+    today = datetime.now().date()
+    filters = {
+        "start_date": request.args.get("start_date") or (today - timedelta(days=30)).isoformat(),
+        "end_date": request.args.get("end_date") or today.isoformat(),
+        "username": request.args.get("username", "").strip(),
+        "action": request.args.get("action", ""),
+        "report_id": request.args.get("report_id", "").strip(),
+    }
+    where = ["occurred_at >= ?", "occurred_at < date(?, '+1 day')"]
+    params = [filters["start_date"], filters["end_date"]]
+    if filters["username"]:
+        where.append("username = ?")
+        params.append(filters["username"])
+    if filters["action"] in AUDIT_ACTIONS:
+        where.append("action = ?")
+        params.append(filters["action"])
+    if filters["report_id"].isdigit():
+        where.append("report_id = ?")
+        params.append(int(filters["report_id"]))
+    before = request.args.get("before", type=int)
+    if before:
+        where.append("id < ?")
+        params.append(before)
+
+    rows = get_db().execute(f"""
+        SELECT * FROM audit_events
+        WHERE {" AND ".join(where)}
+        ORDER BY id DESC
+        LIMIT ?
+    """, [*params, AUDIT_PAGE_SIZE + 1]).fetchall()
+    events = []
+    for row in rows[:AUDIT_PAGE_SIZE]:
+        event = dict(row)
+        event["files"] = json.loads(event["files"] or "[]")
+        event["detail"] = json.loads(event["detail"]) if event["detail"] else None
+        events.append(event)
+    next_before = events[-1]["id"] if len(rows) > AUDIT_PAGE_SIZE else None
+
+    return render_template(
+        "audit.html",
+        events=events,
+        next_before=next_before,
+        actions=AUDIT_ACTIONS,
+        users=sorted(app.config["USERS"]),
+        **filters
+    )
+
+
+# =========================
+# 📡 목록 실시간 갱신 (Server-Sent Events)
+# =========================
+# 작성/수정/삭제는 같은 트랜잭션에서 audit_events에 기록되므로 이 표가 곧 변경 피드다. (별도 브로커 없음)
+# 워커 프로세스마다 폴링 스레드 1개가 새 기록을 LIST_FEED_POLL_SECONDS마다 읽어 최근 목록에 쌓고,
+# /list/events 연결들은 Condition으로 대기하다가 자기 필터(부서/기간/검색)에 맞는 행만 받아 간다.
+# - 같은 프로세스의 변경은 invalidate_report_cache에서 바로 깨워서 지연 없이 전달
+# - 연결 1개가 gunicorn 스레드 1개를 쓰므로 SSE_MAX_CLIENTS로 상한, SSE_MAX_SECONDS마다 끊고
+#   브라우저가 Last-Event-ID로 다시 연결 (놓친 변경은 audit_events에서 이어서 읽음)
+LIST_FEED_ACTIONS = ("create", "edit", "delete", "restore", "purge", "delete_file")
+LIST_FEED_POLL_SECONDS = 1.0
+LIST_FEED_BUFFER_SIZE = 1000
+SSE_KEEPALIVE_SECONDS = 15
+app.config["SSE_MAX_SECONDS"] = int(os.environ.get("SSE_MAX_SECONDS", "300"))
+app.config["SSE_MAX_CLIENTS"] = int(os.environ.get("SSE_MAX_CLIENTS", "48"))
+
+
+def list_feed_position(conn):
+    """현재 변경 피드 위치 (목록 화면이 이 뒤의 변경부터 구독)"""
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_events").fetchone()[0]
+
+
+def _read_feed(conn, after_id, limit=LIST_FEED_BUFFER_SIZE):
+    """after_id 이후 기록 → ([(id, action, department, report_id)], 마지막으로 읽은 id)"""
+    rows = conn.execute(
+        "SELECT id, action, department, report_id FROM audit_events WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, limit)
+    ).fetchall()
+    last_id = rows[-1][0] if rows else after_id
+    return [tuple(r) for r in rows if r[1] in LIST_FEED_ACTIONS and r[3] is not None], last_id
+
+
+class ListFeed:
+    """audit_events 폴링 → 구독 중인 SSE 연결에 변경 알림 (워커 프로세스마다 1개)"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=LIST_FEED_BUFFER_SIZE)
+        self.first_id = self.last_id = 0  # events에 (first_id, last_id] 구간이 모두 들어 있음
+        self.clients = 0
+        self.pid = None
+        self.wake = threading.Event()
+
+    def subscribe(self):
+        """연결 수 상한 안이면 True (fork 이후 첫 구독 시 이 프로세스의 폴링 스레드 시작)"""
+        with self.cond:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.events.clear()
+                self.clients = 0
+                conn = connect_db()
+                try:
+                    self.first_id = self.last_id = list_feed_position(conn)
+                finally:
+                    conn.close()
+                threading.Thread(target=self._run, name="list-feed", daemon=True).start()
+            if self.clients >= app.config["SSE_MAX_CLIENTS"]:
+                return False
+            self.clients += 1
+            return True
+
+    def unsubscribe(self):
+        with self.cond:
+            self.clients -= 1
+
+    def notify(self):
+        """같은 프로세스에서 변경 커밋 직후 호출 → 다음 폴링을 기다리지 않고 바로 읽음"""
+        self.wake.set()
+
+    def _run(self):
+        conn = connect_db()
+        while True:
+            self.wake.wait(LIST_FEED_POLL_SECONDS)
+            self.wake.clear()
+            if not self.clients:
+                continue
+            try:
+                events, last_id = _read_feed(conn, self.last_id)
+            except sqlite3.Error as e:
+                print(f"⚠️ List feed poll failed: {e}")
+                continue
+            if last_id == self.last_id:
+                continue
+            with self.cond:
+                for event in events:
+                    if len(self.events) == self.events.maxlen:
+                        self.first_id = self.events[0][0]
+                    self.events.append(event)
+                self.last_id = last_id
+                self.cond.notify_all()
+
+    def wait(self, conn, after_id, timeout):
+        """after_id 이후 변경 → (변경 목록, 새 위치), timeout 동안 없으면 빈 목록"""
+        with self.cond:
+            if after_id >= self.first_id:
+                self.cond.wait_for(lambda: self.last_id > after_id, timeout)
+                return [e for e in self.events if e[0] > after_id], max(after_id, self.last_id)
+        # 버퍼보다 오래된 위치 (재연결이 늦었거나 페이지가 오래 열려 있었음) → DB에서 직접
+        return _read_feed(conn, after_id)
+
+
+_list_feed = ListFeed()
+
+
+def build_list_patch(conn, events, filters, where, params):
+    """
+    변경 목록 → 목록 화면 패치 {"rows": [{"id", "html"}], "removed": [id]}
+    - 보고서별 마지막 변경 기준: 삭제/영구삭제면 제거, 그 외는 현재 필터로 다시 조회해서
+      맞으면 행 HTML, 더 이상 맞지 않으면(날짜 변경 등) 제거
+    """
+    latest = {}
+    for _, action, _, report_id in events:
+        latest[report_id] = action
+    removed = [rid for rid, action in latest.items() if action in ("delete", "purge")]
+    changed = [rid for rid, action in latest.items() if action not in ("delete", "purge")]
+    rows = []
+    if changed:
+        reports, _ = fetch_report_list(
+            conn, f"{where} AND r.id IN (SELECT value FROM json_each(?))", [*params, json.dumps(changed)],
+            filters["search_query"], filters["search_filter"], limit=None,
+        )
+        for report in reports:
+            rows.append({"id": report["id"], "html": render_template(
+                "_report_rows.html",
+                reports=[report],
+                row_offset=0,
+                user=filters["user"],
+                selected_dept=filters["selected_dept"],
+                search_query=filters["search_query"],
+                search_filter=filters["search_filter"],
+            )})
+        found = {r["id"] for r in rows}
+        removed += [rid for rid in changed if rid not in found]
+    return {"rows": rows, "removed": removed}
+
+
+@app.route("/list/events")
+@login_required
+def report_list_events():
+    """목록 변경 피드 (text/event-stream, 파라미터는 /list와 동일 + since=피드 위치)"""
+    filters = _list_filters()
+    user = filters["user"]
+    where, params = build_report_filter(
+        user["department"], filters["selected_dept"], filters["start_date"], filters["end_date"]
+    )
+    # 재연결이면 브라우저가 보낸 Last-Event-ID, 처음이면 목록을 그린 시점(since)부터
+    position = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        position = int(position)
+    except (TypeError, ValueError):
+        position = list_feed_position(get_db())
+
+    if not _list_feed.subscribe():
+        # 204면 EventSource가 재연결하지 않음 (화면은 잠시 후 다시 시도)
+        return Response(status=204)
+
+    visible_department = None if user["department"] == "관리자" else user["department"]
+
+    def stream(position):
+        try:
+            yield "retry: 3000\n\n"
+            deadline = time.monotonic() + app.config["SSE_MAX_SECONDS"]
+            while True:
+                # 마지막 대기도 SSE_MAX_SECONDS를 넘기지 않음 (스레드/DB 연결을 오래 잡지 않도록)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                events, position = _list_feed.wait(get_db(), position, min(SSE_KEEPALIVE_SECONDS, remaining))
+                if visible_department:
+                    events = [e for e in events if e[2] == visible_department]
+                if events:
+                    patch = build_list_patch(get_db(), events, filters, where, params)
+                    yield f"id: {position}\nevent: rows\ndata: {json.dumps(patch, ensure_ascii=False)}\n\n"
+                else:
+                    # 연결 유지 + 끊긴 연결 감지 (쓰기 실패 시 생성기 종료)
+                    yield f"id: {position}\n: keepalive\n\n"
+        finally:
+            _list_feed.unsubscribe()
+
+    response = Response(stream_with_context(stream(position)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx 프록시 버퍼링 끔
+    response.headers["X-Render-Bypass"] = "true"
+    return response
+
+
+# =========================
+# 🗑️ 휴지통 (soft delete)
+# =========================
+# 보고서 삭제는 deleted_at만 기록하고(목록/상세/검색/통계에서 제외), 관리자가 휴지통에서 복원할 수 있다.
+# TRASH_RETENTION_DAYS가 지난 보고서는 작업 큐의 purge_trash가 PURGE_BATCH_SIZE건씩
+# 한 트랜잭션으로 영구 삭제하고, 더 이상 참조되지 않는 첨부파일은 delete_files 작업으로 정리한다.
+app.config["TRASH_RETENTION_DAYS"] = int(os.environ.get("TRASH_RETENTION_DAYS", "30"))
+PURGE_BATCH_SIZE = 500
+TRASH_PAGE_SIZE = 200
+
+
+def purge_reports(conn, report_ids=None, deleted_before=None, user=None, batch_size=PURGE_BATCH_SIZE):
+    """
+    휴지통 보고서 영구 삭제 → 삭제한 보고서 수
+    - report_ids: 지정한 보고서만 (휴지통에 있는 것만 삭제됨)
+    - deleted_before: 이 시각 이전에 휴지통으로 옮긴 보고서 전체 (batch_size건씩 나눠 커밋)
+    """
+    user = user or {"username": "system", "department": None}
+    total = 0
+    while True:
+        with write_transaction(conn):
+            if report_ids is not None:
+                reports = conn.execute("""
+                    SELECT id, department, title, created_at FROM reports
+                    WHERE deleted_at IS NOT NULL AND id IN (SELECT value FROM json_each(?))
+                """, (json.dumps(list(report_ids)),)).fetchall()
+            else:
+                reports = conn.execute("""
+                    SELECT id, department, title, created_at FROM reports
+                    WHERE deleted_at IS NOT NULL AND deleted_at < ?
+                    ORDER BY deleted_at LIMIT ?
+                """, (deleted_before, batch_size)).fetchall()
+            if not reports:
+                break
+            ids = json.dumps([r["id"] for r in reports])
+            files = conn.execute(
+                "SELECT * FROM report_files WHERE report_id IN (SELECT value FROM json_each(?))", (ids,)
+            ).fetchall()
+            files_by_report = {}
+            for f in files:
+                files_by_report.setdefault(f["report_id"], []).append(f)
+            # report_contents / report_files는 ON DELETE CASCADE, 첨부파일 삭제는 작업 큐로
+            conn.execute("DELETE FROM reports WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+            remove_attachment_files(conn, files)
+            conn.execute(AUDIT_INSERT_SQL, (json.dumps([
+                _audit_event("purge", r["id"], r["title"], audit_file_names(files_by_report.get(r["id"], [])),
+                             r["department"], detail={"created_at": r["created_at"]}, user=user)
+                for r in reports
+            ], ensure_ascii=False),))
+        total += len(reports)
+        if report_ids is not None:
+            break
+    return total
+
+
+def trash_cutoff(days=None):
+    days = app.config["TRASH_RETENTION_DAYS"] if days is None else days
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@job_handler("purge_trash")
+def _purge_trash_job(conn, payload):
+    purged = purge_reports(conn, deleted_before=trash_cutoff())
+    if purged:
+        print(f"🗑️ Purged {purged} report(s) from trash")
+
+
+def schedule_trash_purge(conn):
+    """보관 기간이 지난 휴지통 보고서가 있으면 purge_trash 작업 등록 (이미 대기 중이면 건너뜀)"""
+    with write_transaction(conn):
+        pending = conn.execute(
+            "SELECT 1 FROM jobs WHERE kind = 'purge_trash' AND status IN ('queued', 'running')"
+        ).fetchone()
+        expired = conn.execute(
+            "SELECT 1 FROM reports WHERE deleted_at IS NOT NULL AND deleted_at < ? LIMIT 1", (trash_cutoff(),)
+        ).fetchone()
+        if expired and not pending:
+            return enqueue_job(conn, "purge_trash", {})
+    return None
+
+
+@app.cli.command("purge-trash")
+@click.option("--days", type=int, default=None, help="보관 기간(일), 기본값 TRASH_RETENTION_DAYS")
+def purge_trash_command(days):
+    """보관 기간이 지난 휴지통 보고서를 바로 영구 삭제"""
+    init_db()
+    conn = connect_db()
+    started = time.perf_counter()
+    purged = purge_reports(conn, deleted_before=trash_cutoff(days))
+    conn.close()
+    click.echo(f"trash: {purged} report(s) purged ({time.perf_counter() - started:.1f}s)")
+
+
+@app.route("/admin/trash")
+@admin_required
+def trash():
+    """휴지통 (삭제된 보고서 목록, 최근 삭제순)"""
+    reports = get_db().execute("""
+        SELECT r.id, r.local_id, r.title, r.date, r.department, r.deleted_at, r.deleted_by,
+               (SELECT COUNT(*) FROM report_files f WHERE f.report_id = r.id) AS file_count
+        FROM reports r
+        WHERE r.deleted_at IS NOT NULL
+        ORDER BY r.deleted_at DESC
+        LIMIT ?
+    """, (TRASH_PAGE_SIZE,)).fetchall()
+    retention = timedelta(days=app.config["TRASH_RETENTION_DAYS"])
+    items = []
+    for r in reports:
+        item = dict(r)
+        item["purge_at"] = (datetime.strptime(r["deleted_at"], "%Y-%m-%d %H:%M:%S") + retention).strftime("%Y-%m-%d")
+        items.append(item)
+    return render_template("trash.html", reports=items, retention_days=app.config["TRASH_RETENTION_DAYS"])
+
+
+@app.route("/admin/trash/<int:report_id>/restore", methods=["POST"])
+@admin_required
+def restore_report(report_id):
+    conn = get_db()
+    with write_transaction(conn):
+        report = conn.execute(
+            "UPDATE reports SET deleted_at = NULL, deleted_by = NULL WHERE id = ? AND deleted_at IS NOT NULL "
+            "RETURNING title, department",
+            (report_id,)
+        ).fetchone()
+        if report:
+            record_audit(conn, "restore", report_id, report["title"], department=report["department"])
+    if not report:
+        flash("❌ 휴지통에 없는 보고서입니다.")
+        return redirect(url_for("trash"))
+    invalidate_report_cache(report_id, report["department"])
+    invalidate_file_info(get_db().execute(
+        "SELECT department, filename FROM report_files WHERE report_id = ?", (report_id,)
+    ).fetchall())
+    flash(f"♻️ '{report['title']}' 보고서를 복원했습니다.")
+    return redirect(url_for("trash"))
+
+
+@app.route("/admin/trash/<int:report_id>/purge", methods=["POST"])
+@admin_required
+def purge_report(report_id):
+    """휴지통 보고서 즉시 영구 삭제"""
+    if not purge_reports(get_db(), report_ids=[report_id], user=session["user"]):
+        flash("❌ 휴지통에 없는 보고서입니다.")
+    else:
+        flash("🗑️ 보고서를 영구 삭제했습니다.")
+    return redirect(url_for("trash"))
+
+
+# =========================
+# 💾 백업 (온라인 DB 백업 + 첨부파일 증분 복사)
+# =========================
+# BACKUP_DIR/
+#   20250101-030000/reports.db, manifest.json   스냅샷 1개 = DB 사본 + 기록
+#   _blobs/<해시 앞 2자리>/<SHA-256>            첨부파일 (스냅샷끼리 공유, 새로 생긴 것만 복사)
+#   _legacy/<부서>/<파일명>                     예전 폴더 방식 첨부파일
+# - DB는 SQLite 온라인 백업 API로 BACKUP_PAGES_PER_STEP 페이지씩 복사하고 단계마다 잠깐 쉬어서
+#   요청 처리를 막지 않음 (WAL이라 쓰기도 계속 가능)
+# - 복사 중 다른 연결이 쓰면 SQLite가 처음부터 다시 시작하므로, BACKUP_MAX_RESTARTS번 넘게 다시 시작되면
+#   한 번에 복사 (읽기 트랜잭션 1개라 쓰기를 막지 않음)
+# - 첨부파일은 지난 스냅샷 DB와 비교해서 새로 생긴 report_files 행만 확인해서 복사, 복사하면서 해시 검증
+# - 작성 중인 스냅샷은 <이름>.partial 폴더에 만들고 끝나면 이름 변경 → 반쯤 만든 스냅샷이 보이지 않음
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+BACKUP_MAX_RESTARTS = 3
+BACKUP_DB_NAME = "reports.db"
+BACKUP_MANIFEST = "manifest.json"
+app.config["BACKUP_KEEP"] = int(os.environ.get("BACKUP_KEEP", "7"))
+app.config["BACKUP_INTERVAL_HOURS"] = int(os.environ.get("BACKUP_INTERVAL_HOURS", "0"))  # 0이면 자동 백업 안 함
+
+
+class _BackupRestarting(Exception):
+    pass
+
+
+def _backup_blob_path(backup_dir, content_hash):
+    return os.path.join(backup_dir, "_blobs", content_hash[:2], content_hash)
+
+
+def _backup_legacy_path(backup_dir, department, filename):
+    return os.path.join(backup_dir, "_legacy", department, filename)
+
+
+def list_snapshots(backup_dir=None):
+    """완성된 스냅샷 이름 목록 (오래된 순)"""
+    backup_dir = backup_dir or app.config["BACKUP_DIR"]
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(backup_dir)
+        if not name.startswith("_") and not name.endswith(".partial")
+        and os.path.exists(os.path.join(backup_dir, name, BACKUP_MANIFEST))
+    )
+
+
+def read_manifest(backup_dir, name):
+    with open(os.path.join(backup_dir, name, BACKUP_MANIFEST), encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _open_snapshot(path):
+    conn = sqlite3.connect(f"file:{urllib.parse.quote(path)}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def backup_database(dest_path, pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep=BACKUP_STEP_SLEEP):
+    """
+    현재 DB → dest_path (온라인 백업 API, 단계별 복사)
+    반환: {"pages", "steps", "restarts", "single_step"}
+    """
+    state = {"pages": 0, "steps": 0, "restarts": 0, "single_step": pages_per_step <= 0, "remaining": None}
+
+    def progress(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            # 그 사이 다른 연결이 DB를 바꿔서 처음부터 다시 복사 중
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _BackupRestarting()
+        state.update(remaining=remaining, pages=total, steps=state["steps"] + 1)
+        if remaining:
+            time.sleep(step_sleep)
+
+    src = connect_db()
+    dst = sqlite3.connect(dest_path)
+    try:
+        try:
+            src.backup(dst, pages=pages_per_step if pages_per_step > 0 else -1, progress=progress)
+        except _BackupRestarting:
+            state["single_step"] = True
+            src.backup(dst, pages=-1, progress=progress)
+        # 사본은 파일 하나로 완결되도록 (WAL 파일 없이)
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+    del state["remaining"]
+    return state
+
+
+def _copy_verified(src_path, dest_path, content_hash=None, chunk_size=1024 * 1024):
+    """임시 파일로 복사 후 이름 변경 (content_hash가 있으면 복사하면서 내용 검증) → 복사한 바이트 수"""
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.tmp{os.getpid()}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+        if content_hash and digest.hexdigest() != content_hash:
+            raise ValueError(f"첨부파일 내용이 해시와 다릅니다: {src_path}")
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return size
+
+
+def backup_attachments(backup_dir, snapshot_conn, previous_db=None):
+    """
+    스냅샷 DB가 참조하는 첨부파일을 백업 폴더로 복사 → {"checked", "copied", "bytes", "missing": [...]}
+    - previous_db: 지난 스냅샷 DB 경로, 주면 그 스냅샷에 없던 (부서, 파일명, 해시) 행만 확인
+      (report_files.id는 삭제/복원 후 다시 쓰일 수 있어 id 대신 내용으로 비교)
+    """
+    result = {"checked": 0, "copied": 0, "bytes": 0, "missing": []}
+    if previous_db:
+        snapshot_conn.execute("ATTACH DATABASE ? AS prev", (f"file:{urllib.parse.quote(previous_db)}?mode=ro",))
+        rows = snapshot_conn.execute("""
+            SELECT department, filename, content_hash FROM main.report_files f
+            WHERE NOT EXISTS (
+                SELECT 1 FROM prev.report_files p
+                WHERE p.department = f.department AND p.filename = f.filename AND p.content_hash IS f.content_hash
+            )
+        """).fetchall()
+        snapshot_conn.execute("DETACH DATABASE prev")
+    else:
+        rows = snapshot_conn.execute("SELECT department, filename, content_hash FROM report_files")
+    for row in rows:
+        result["checked"] += 1
+        content_hash = row["content_hash"]
+        if content_hash and os.path.exists(blob_path(content_hash)):
+            src, dest = blob_path(content_hash), _backup_blob_path(backup_dir, content_hash)
+        else:
+            content_hash = None
+            src = legacy_file_path(row["department"], row["filename"])
+            dest = _backup_legacy_path(backup_dir, row["department"], row["filename"])
+            if not os.path.exists(src):
+                result["missing"].append(f"{row['department']}/{row['filename']}")
+                continue
+        if os.path.exists(dest) and os.path.getsize(dest) == os.path.getsize(src):
+            continue
+        result["bytes"] += _copy_verified(src, dest, content_hash)
+        result["copied"] += 1
+    return result
+
+
+def create_snapshot(backup_dir=None, full=False, pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep=BACKUP_STEP_SLEEP):
+    """
+    스냅샷 1개 생성 → manifest
+    - full=False: 마지막 스냅샷 이후 추가된 첨부파일만 확인/복사 (full=True면 전체 확인)
+    """
+    backup_dir = backup_dir or app.config["BACKUP_DIR"]
+    os.makedirs(backup_dir, exist_ok=True)
+    previous = list_snapshots(backup_dir)
+    previous_db = os.path.join(backup_dir, previous[-1], BACKUP_DB_NAME) if previous and not full else None
+
+    name = datetime.now().strftime("%Y%m%d-%H%M%S")
+    while os.path.exists(os.path.join(backup_dir, name)) or os.path.exists(os.path.join(backup_dir, name + ".partial")):
+        name += "_"
+    partial = os.path.join(backup_dir, name + ".partial")
+    os.makedirs(partial)
+
+    started = time.perf_counter()
+    try:
+        db_path = os.path.join(partial, BACKUP_DB_NAME)
+        db_result = backup_database(db_path, pages_per_step, step_sleep)
+        db_seconds = time.perf_counter() - started
+        with closing(_open_snapshot(db_path)) as snapshot:
+            check = snapshot.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise RuntimeError(f"백업 DB 검사 실패: {check}")
+            reports = snapshot.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+            files_result = backup_attachments(backup_dir, snapshot, previous_db)
+        db_bytes = os.path.getsize(db_path)
+        manifest = {
+            "name": name,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "reports": reports,
+            "db_bytes": db_bytes,
+            "db_seconds": round(db_seconds, 3),
+            "db": db_result,
+            "incremental_from": previous[-1] if previous_db else None,
+            "files": files_result,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        with open(os.path.join(partial, BACKUP_MANIFEST), "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, ensure_ascii=False, indent=2)
+        os.replace(partial, os.path.join(backup_dir, name))
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    return manifest
+
+
+def rotate_snapshots(backup_dir=None, keep=None):
+    """
+    최근 keep개만 남기고 오래된 스냅샷 삭제 + 남은 스냅샷이 참조하지 않는 첨부파일 정리
+    반환: (삭제한 스냅샷 이름 목록, 삭제한 첨부파일 수)
+    """
+    backup_dir = backup_dir or app.config["BACKUP_DIR"]
+    keep = app.config["BACKUP_KEEP"] if keep is None else keep
+    snapshots = list_snapshots(backup_dir)
+    removed = snapshots[:-keep] if keep > 0 else []
+    for name in removed:
+        shutil.rmtree(os.path.join(backup_dir, name))
+    if not removed:
+        return [], 0
+
+    # 남은 스냅샷들이 참조하는 파일 (증분 복사라 예전 스냅샷이 복사한 파일을 나중 스냅샷도 참조함)
+    referenced = set()
+    for name in snapshots[len(removed):]:
+        with closing(_open_snapshot(os.path.join(backup_dir, name, BACKUP_DB_NAME))) as snapshot:
+            for row in snapshot.execute("SELECT department, filename, content_hash FROM report_files"):
+                referenced.add(_backup_blob_path(backup_dir, row["content_hash"]) if row["content_hash"] else None)
+                referenced.add(_backup_legacy_path(backup_dir, row["department"], row["filename"]))
+    deleted = 0
+    for root in ("_blobs", "_legacy"):
+        for dirpath, _, filenames in os.walk(os.path.join(backup_dir, root)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path not in referenced:
+                    os.remove(path)
+                    deleted += 1
+    return removed, deleted
+
+
+def verify_snapshot(name=None, backup_dir=None, full=False):
+    """
+    스냅샷 검사 → 문제 목록 (비어 있으면 정상)
+    - DB PRAGMA integrity_check + 참조 첨부파일 존재 확인 (full=True면 해시까지 다시 계산)
+    """
+    backup_dir = backup_dir or app.config["BACKUP_DIR"]
+    snapshots = list_snapshots(backup_dir)
+    name = name or (snapshots[-1] if snapshots else None)
+    if name not in snapshots:
+        return [f"스냅샷이 없습니다: {name}"]
+    problems = []
+    with closing(_open_snapshot(os.path.join(backup_dir, name, BACKUP_DB_NAME))) as snapshot:
+        problems += [f"DB: {row[0]}" for row in snapshot.execute("PRAGMA integrity_check") if row[0] != "ok"]
+        for row in snapshot.execute("SELECT department, filename, content_hash FROM report_files"):
+            content_hash = row["content_hash"]
+            path = _backup_blob_path(backup_dir, content_hash) if content_hash else None
+            if not path or not os.path.exists(path):
+                # 저장소 이전 전에 백업된 파일은 예전 폴더 방식으로 남아 있음
+                content_hash = None
+                path = _backup_legacy_path(backup_dir, row["department"], row["filename"])
+                if not os.path.exists(path):
+                    problems.append(f"첨부파일 없음: {row['department']}/{row['filename']}")
+                    continue
+            if full and content_hash and file_sha256(path) != content_hash:
+                problems.append(f"첨부파일 손상: {row['department']}/{row['filename']}")
+    return problems
+
+
+def restore_snapshot(name, backup_dir=None, pages_per_step=BACKUP_PAGES_PER_STEP):
+    """
+    스냅샷 → 현재 DB/첨부파일 복원 (서버 실행 중에도 가능하지만 복원 동안 쓰기는 대기)
+    - 첨부파일을 먼저 되돌린 뒤 DB를 온라인 백업 API로 덮어씀 (열린 연결도 새 내용을 봄)
+    - 스냅샷이 예전 스키마면 이어서 마이그레이션 적용
+    """
+    global _db_ready
+    backup_dir = backup_dir or app.config["BACKUP_DIR"]
+    snapshot_path = os.path.join(backup_dir, name, BACKUP_DB_NAME)
+    restored = 0
+    with closing(_open_snapshot(snapshot_path)) as snapshot:
+        for row in snapshot.execute("SELECT department, filename, content_hash FROM report_files"):
+            content_hash = row["content_hash"]
+            src = _backup_blob_path(backup_dir, content_hash) if content_hash else None
+            if src and os.path.exists(src):
+                dest = blob_path(content_hash)
+            else:
+                content_hash = None
+                src = _backup_legacy_path(backup_dir, row["department"], row["filename"])
+                dest = legacy_file_path(row["department"], row["filename"])
+            if os.path.exists(src) and not os.path.exists(dest):
+                _copy_verified(src, dest, content_hash)
+                restored += 1
+        conn = connect_db()
+        try:
+            snapshot.backup(conn, pages=pages_per_step)
+        finally:
+            conn.close()
+    _db_ready = False
+    init_db()
+    invalidate_all_render_cache()
+    with _file_info_lock:
+        _file_info_cache.clear()
+    return restored
+
+
+def schedule_backup(conn):
+    """BACKUP_INTERVAL_HOURS가 지났으면 backup 작업 등록 (이미 대기 중이면 건너뜀)"""
+    hours = app.config["BACKUP_INTERVAL_HOURS"]
+    if hours <= 0:
+        return None
+    snapshots = list_snapshots()
+    if snapshots:
+        last = read_manifest(app.config["BACKUP_DIR"], snapshots[-1])["created_at"]
+        if datetime.strptime(last, "%Y-%m-%d %H:%M:%S") > datetime.now() - timedelta(hours=hours):
+            return None
+    with write_transaction(conn):
+        if conn.execute("SELECT 1 FROM jobs WHERE kind = 'backup' AND status IN ('queued', 'running')").fetchone():
+            return None
+        return enqueue_job(conn, "backup", {})
+
+
+@job_handler("backup")
+def _backup_job(conn, payload):
+    manifest = create_snapshot()
+    removed, deleted = rotate_snapshots()
+    print(f"💾 Backup {manifest['name']}: {manifest['db_bytes'] / 1e6:.1f} MB DB, "
+          f"{manifest['files']['copied']} new file(s), {len(removed)} old snapshot(s) removed")
+
+
+@app.cli.command("backup")
+@click.option("--full", is_flag=True, help="첨부파일 전체 확인 (기본: 지난 스냅샷 이후 추가분만)")
+@click.option("--keep", type=int, default=None, help="남길 스냅샷 수, 기본값 BACKUP_KEEP")
+@click.option("--pages", type=int, default=BACKUP_PAGES_PER_STEP, show_default=True,
+              help="DB 백업 단계당 페이지 수 (0이면 한 번에)")
+def backup_command(full, keep, pages):
+    """DB + 첨부파일 스냅샷 생성 후 오래된 스냅샷 정리"""
+    init_db()
+    manifest = create_snapshot(full=full, pages_per_step=pages)
+    removed, deleted = rotate_snapshots(keep=keep)
+    files = manifest["files"]
+    click.echo(
+        f"backup {manifest['name']}: DB {manifest['db_bytes'] / 1e6:.1f} MB in {manifest['db_seconds']:.2f}s "
+        f"({manifest['db']['steps']} steps, {manifest['db']['restarts']} restarts), "
+        f"files {files['copied']}/{files['checked']} copied ({files['bytes'] / 1e6:.1f} MB), "
+        f"{manifest['seconds']:.2f}s total"
+    )
+    for path in files["missing"][:20]:
+        click.echo(f"  missing: {path}", err=True)
+    if removed:
+        click.echo(f"rotated: {len(removed)} snapshot(s), {deleted} file(s) removed")
+
+
+@app.cli.command("backup-verify")
+@click.argument("name", required=False)
+@click.option("--full", is_flag=True, help="첨부파일 해시까지 다시 계산")
+def backup_verify_command(name, full):
+    """스냅샷 무결성 검사 (기본: 가장 최근 스냅샷)"""
+    problems = verify_snapshot(name, full=full)
+    for problem in problems[:50]:
+        click.echo(f"  {problem}", err=True)
+    if problems:
+        raise click.ClickException(f"{len(problems)} problem(s) found")
+    click.echo("verify: ok")
+
+
+@app.cli.command("backup-restore")
+@click.argument("name")
+@click.option("--yes", is_flag=True, help="확인 없이 진행")
+def backup_restore_command(name, yes):
+    """스냅샷으로 DB/첨부파일 복원 (현재 내용은 덮어씀)"""
+    if name not in list_snapshots():
+        raise click.ClickException(f"스냅샷이 없습니다: {name}")
+    problems = verify_snapshot(name)
+    if problems:
+        raise click.ClickException(f"스냅샷 검사 실패 ({len(problems)}건): {problems[0]}")
+    if not yes:
+        click.confirm(f"현재 DB를 스냅샷 {name} 내용으로 덮어씁니다. 계속할까요?", abort=True)
+    restored = restore_snapshot(name)
+    click.echo(f"restore {name}: done ({restored} attachment file(s) restored)")
+
+
+# =========================
+# 📈 계측 (Prometheus 메트릭 / Server-Timing)
+# =========================
+# METRICS_ENABLED=1 일 때만 동작 (기본 꺼짐)
+# - 라우트별 응답 시간 히스토그램, 요청당 SQL 실행 수/시간, 템플릿 렌더링 시간, 업로드 바이트
+# - /metrics: Prometheus 텍스트 형식 (관리자 로그인 또는 METRICS_TOKEN Bearer 토큰)
+# - METRICS_SERVER_TIMING=1 이면 응답에 Server-Timing 헤더 (브라우저 개발자도구에서 확인)
+# 값은 프로세스(워커)별로 집계되므로 gunicorn 워커가 여러 개면 스크랩마다 다른 워커 값이 보일 수 있다.
+app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "") == "1"
+app.config["METRICS_SERVER_TIMING"] = os.environ.get("METRICS_SERVER_TIMING", "") == "1"
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램 (Prometheus histogram 형식으로 출력)"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name, self.help_text = name, help_text
+        self.label_names, self.buckets = label_names, buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in sorted(self.series.items()):
+            label_text = _prometheus_labels(self.label_names, labels)
+            for bound, n in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {n}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    """라벨별 누적 카운터"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self.series = {}
+
+    def inc(self, labels=(), value=1):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            label_text = _prometheus_labels(self.label_names, labels)
+            lines.append(f"{self.name}{{{label_text}}} {value}" if label_text else f"{self.name} {value}")
+        return lines
+
+
+def _prometheus_labels(names, values):
+    return ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+
+
+_metrics_lock = threading.Lock()
+METRICS = {
+    "requests": Counter("gaja_http_requests_total", "HTTP requests", ("endpoint", "method", "status")),
+    "latency": Histogram("gaja_http_request_duration_seconds", "Request latency", ("endpoint", "method"), LATENCY_BUCKETS),
+    "sql_count": Histogram("gaja_sql_statements_per_request", "SQL statements per request", ("endpoint",), SQL_COUNT_BUCKETS),
+    "sql_seconds": Counter("gaja_sql_duration_seconds_total", "Time spent executing SQL", ("endpoint",)),
+    "render": Histogram("gaja_template_render_seconds", "Template render time", ("template",), LATENCY_BUCKETS),
+    "upload_bytes": Counter("gaja_upload_bytes_total", "Attachment bytes received"),
+}
+
+
+def _record_sql(seconds):
+    """SQL 1건 실행 시간 기록 (요청 안이면 g에 누적, after_request에서 라우트별로 반영)"""
+    if has_request_context():
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_seconds = g.get("sql_seconds", 0.0) + seconds
+
+
+def record_upload(size):
+    if app.config["METRICS_ENABLED"]:
+        with _metrics_lock:
+            METRICS["upload_bytes"].inc(value=size)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """execute 시간 측정 (SELECT는 첫 행까지, 이후 fetch 시간은 포함하지 않음)"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_sql(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """conn.execute / conn.cursor() 모두 InstrumentedCursor를 거치도록 하는 연결"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+@app.before_request
+def start_request_timer():
+    if app.config["METRICS_ENABLED"]:
+        g.request_started = time.perf_counter()
+
+
+@before_render_template.connect_via(app)
+def _start_render_timer(sender, template, context, **extra):
+    if app.config["METRICS_ENABLED"]:
+        g.setdefault("render_stack", []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def _stop_render_timer(sender, template, context, **extra):
+    stack = g.get("render_stack")
+    if not stack:
+        return
+    seconds = time.perf_counter() - stack.pop()
+    g.render_seconds = g.get("render_seconds", 0.0) + seconds
+    with _metrics_lock:
+        METRICS["render"].observe((template.name or "?",), seconds)
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unknown"
+    sql_count, sql_seconds = g.get("sql_count", 0), g.get("sql_seconds", 0.0)
+    with _metrics_lock:
+        METRICS["requests"].inc((endpoint, request.method, response.status_code))
+        METRICS["latency"].observe((endpoint, request.method), elapsed)
+        METRICS["sql_count"].observe((endpoint,), sql_count)
+        METRICS["sql_seconds"].inc((endpoint,), sql_seconds)
+
+    if app.config["METRICS_SERVER_TIMING"]:
+        response.headers.add(
+            "Server-Timing",
+            f'app;dur={elapsed * 1000:.1f}, db;dur={sql_seconds * 1000:.1f};desc="{sql_count} queries", '
+            f'render;dur={g.get("render_seconds", 0.0) * 1000:.1f}'
+        )
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus 스크랩 엔드포인트 (관리자 로그인 또는 Authorization: Bearer <METRICS_TOKEN>)"""
+    token = app.config["METRICS_TOKEN"]
+    authorized = bool(token) and request.headers.get("Authorization") == f"Bearer {token}"
+    if not authorized and session.get("user", {}).get("department") != "관리자":
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+    if not app.config["METRICS_ENABLED"]:
+        return jsonify({"status": "error", "message": "METRICS_ENABLED=1 로 실행해야 합니다."}), 404
+
+    with _metrics_lock:
+        lines = [line for metric in METRICS.values() for line in metric.render()]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+# =========================
+# 🗂️ 렌더링 캐시 (보고서 상세 HTML / 목록 조회 결과)
+# =========================
+# 보고서는 작성 후 거의 바뀌지 않으므로 같은 보고서/같은 조건의 목록을 반복 조회하지 않도록 캐시한다.
+# - 상세: 렌더링된 view.html (관리자/부서 사용자 화면만 다르므로 둘로 나눠 저장)
+# - 목록: fetch_report_list/count_reports 결과 (목록 화면 렌더링은 매번)
+# 무효화는 세대 번호(generation)로 처리: 캐시 키에 조회 시점의 세대 번호를 넣고,
+# 작성/수정/삭제 시 해당 보고서·부서의 세대 번호만 올려 이전 항목을 더 이상 찾지 않게 한다.
+# (조회 중에 수정이 커밋돼도 이전 세대 키로 저장되므로 오래된 내용이 다시 보이지 않음)
+# RENDER_CACHE:
+# - sqlite (기본): DATA_DIR/render_cache.db를 gunicorn 워커끼리 공유
+# - memory: 프로세스 내 LRU (워커 1개일 때만 사용, 다른 워커의 수정은 TTL까지 반영 안 됨)
+# - off: 캐시 사용 안 함
+app.config["RENDER_CACHE"] = os.environ.get("RENDER_CACHE", "sqlite").lower()
+app.config["RENDER_CACHE_TTL"] = int(os.environ.get("RENDER_CACHE_TTL", "300"))
+app.config["RENDER_CACHE_SIZE"] = int(os.environ.get("RENDER_CACHE_SIZE", "2000"))
+
+METRICS["render_cache"] = Counter("gaja_render_cache_total", "Render cache lookups", ("cache", "result"))
+
+
+class MemoryCacheBackend:
+    """프로세스 내 LRU + TTL"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get_generations(self, names):
+        with self.lock:
+            return [self.generations.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self.lock:
+            for name in names:
+                self.generations[name] = self.generations.get(name, 0) + 1
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generations.clear()
+
+
+class SQLiteCacheBackend:
+    """
+    로컬 SQLite 파일 공유 캐시 (gunicorn 워커 간 공유)
+    - 값은 pickle로 저장, 오래 조회되지 않은 항목부터 정리 (근사 LRU)
+    - 캐시 오류(잠금 등)는 요청을 실패시키지 않고 미적중으로 처리
+    - 생성/무효화(bump)가 실패하면 예전 값이 남아 있을 수 있으므로 unhealthy로 표시하고
+      캐시를 쓰지 않다가, RECOVER_INTERVAL마다 clear()를 다시 시도해 성공하면 복구
+    """
+    PRUNE_EVERY = 100       # set 호출 몇 번마다 정리할지
+    TOUCH_INTERVAL = 30     # 적중 시 마지막 조회 시각 갱신 간격(초)
+    RECOVER_INTERVAL = 5    # unhealthy 상태에서 clear() 재시도 간격(초)
+
+    def __init__(self, path, max_entries):
+        self.path, self.max_entries = path, max_entries
+        self.local = threading.local()
+        self.sets = 0
+        self.healthy = False
+        self.failed_at = 0.0
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode = WAL")
+                self._create_tables(conn)
+            self.healthy = True
+        except sqlite3.Error as e:
+            self._mark_unhealthy(e)
+
+    def _create_tables(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries(accessed_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+        conn.execute("PRAGMA synchronous = OFF")  # 캐시는 유실돼도 다시 만들면 됨
+        return conn
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = self.local.conn = self._connect()
+            self.local.pid = os.getpid()
+        return conn
+
+    def _mark_unhealthy(self, error):
+        if self.healthy or not self.failed_at:
+            print(f"⚠️ Render cache disabled until it can be cleared: {error}")
+        self.healthy = False
+        self.failed_at = time.monotonic()
+
+    def get_generations(self, names):
+        if not self.healthy:
+            if time.monotonic() - self.failed_at < self.RECOVER_INTERVAL:
+                return None
+            self.clear()  # 무효화를 놓쳤을 수 있으므로 전부 지운 뒤에만 다시 사용
+            if not self.healthy:
+                return None
+        try:
+            found = dict(self._conn().execute(
+                "SELECT name, value FROM cache_generations WHERE name IN (SELECT value FROM json_each(?))",
+                (json.dumps(names),)
+            ).fetchall())
+        except sqlite3.Error:
+            return None
+        return [found.get(name, 0) for name in names]
+
+    def bump(self, names):
+        try:
+            self._conn().executemany("""
+                INSERT INTO cache_generations (name, value) VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET value = value + 1
+            """, [(name,) for name in names])
+        except sqlite3.Error as e:
+            self._mark_unhealthy(e)  # 요청(이미 커밋됨)은 실패시키지 않음
+
+    def get(self, key):
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL:
+                self._conn().execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return pickle.loads(row[0])
+        except sqlite3.Error:
+            return None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl, now)
+            )
+            self.sets += 1
+            if self.sets % self.PRUNE_EVERY == 0:
+                self.prune(conn, now)
+        except sqlite3.Error:
+            pass
+
+    def prune(self, conn, now):
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+        conn.execute("""
+            DELETE FROM cache_entries WHERE key IN (
+                SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def clear(self):
+        try:
+            conn = self._conn()
+            self._create_tables(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM cache_entries")
+                conn.execute("DELETE FROM cache_generations")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._mark_unhealthy(e)
+            return
+        self.healthy = True
+
+
+class RenderCache:
+    """세대 번호 기반 무효화 + 적중/미적중 집계"""
+
+    def __init__(self, backend, ttl):
+        self.backend, self.ttl = backend, ttl
+
+    def get_or_build(self, cache_name, generation_names, key, build):
+        """
+        캐시된 값 반환, 없으면 build() 결과를 저장 후 반환 (None은 저장하지 않음)
+        - generation_names: 이 값이 의존하는 세대 번호 이름 (조회 전에 읽어 키에 포함)
+        """
+        if self.backend is None:
+            return build()
+        generations = self.backend.get_generations(["all", *generation_names])
+        if generations is None:
+            return build()
+        digest = hashlib.sha1(repr((key, generations)).encode("utf-8")).hexdigest()
+        full_key = f"{cache_name}:{digest}"
+        value = self.backend.get(full_key)
+        with _metrics_lock:
+            METRICS["render_cache"].inc((cache_name, "miss" if value is None else "hit"))
+        if value is None:
+            value = build()
+            if value is not None:
+                self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def invalidate(self, generation_names):
+        if self.backend is not None:
+            self.backend.bump(generation_names)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+_render_cache = None
+
+
+def get_render_cache():
+    """설정(RENDER_CACHE)에 맞는 캐시 (프로세스당 1개, create_app()에서 다시 생성)"""
+    global _render_cache
+    if _render_cache is None:
+        kind, size = app.config["RENDER_CACHE"], app.config["RENDER_CACHE_SIZE"]
+        if kind == "sqlite":
+            backend = SQLiteCacheBackend(app.config["RENDER_CACHE_PATH"], size)
+        elif kind == "memory":
+            backend = MemoryCacheBackend(size)
+        else:
+            backend = None
+        _render_cache = RenderCache(backend, app.config["RENDER_CACHE_TTL"])
+    return _render_cache
+
+
+def list_generation_names(user_dept, selected_dept):
+    """목록 조회 범위(build_report_filter와 동일)에 해당하는 세대 번호 이름"""
+    if user_dept != "관리자":
+        return [f"dept:{user_dept}"]
+    return [f"dept:{selected_dept}"] if selected_dept else ["dept:*"]
+
+
+def invalidate_report_cache(report_id=None, department=None):
+    """보고서 작성/수정/삭제 후 호출 (커밋 이후): 해당 보고서 상세 + 그 부서/전체 목록 무효화"""
+    names = ["dept:*"]
+    if department:
+        names.append(f"dept:{department}")
+    if report_id is not None:
+        names.append(f"report:{report_id}")
+    get_render_cache().invalidate(names)
+    _list_feed.notify()  # 이 프로세스의 목록 실시간 갱신 구독자에게 바로 전달
+
+
+def invalidate_all_render_cache():
+    """일괄 가져오기/마이그레이션 등 범위를 특정하기 어려운 변경 후 전체 무효화"""
+    get_render_cache().invalidate(["all"])
+
+
+# =========================
+# 🗜️ 응답 압축 / 정적 파일 (내용 해시 URL)
+# =========================
+# 화면별 CSS/JS는 static/css, static/js 파일로 분리하고 템플릿에서는 asset_url()로 참조한다.
+# asset_url("css/list.css") → /assets/css/list.<내용 해시 12자리>.css
+# - 파일 내용이 바뀌면 URL도 바뀌므로 1년 immutable 캐시 (재방문 시 요청 자체가 없음)
+# - 프로세스당 한 번 읽어서 gzip(+brotli 설치 시 br) 압축본까지 메모리에 만들어 둔다
+#   (--preload면 마스터에서 한 번만 → 워커는 fork로 공유)
+# HTML/JSON 응답은 after_request에서 Accept-Encoding에 맞춰 압축 (br > gzip).
+# 스트리밍 응답(SSE, CSV/ZIP 내보내기)과 파일 전송(send_file)은 건드리지 않는다.
+ASSET_CACHE_SECONDS = 365 * 24 * 3600
+ASSET_COMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt")
+ASSET_NAME_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[A-Za-z0-9]+)$")
+COMPRESS_MIMETYPES = {"text/html", "application/json"}
+COMPRESS_MIN_SIZE = 1024  # 이보다 작으면 헤더/CPU 비용이 더 큼
+GZIP_LEVEL = 6            # 요청마다 압축하므로 속도 우선 (정적 파일은 최고 압축)
+BROTLI_QUALITY = 5
+app.config["COMPRESS_RESPONSES"] = os.environ.get("COMPRESS_RESPONSES", "1") == "1"
+
+_assets = None
+_assets_lock = threading.Lock()
+
+
+def load_assets():
+    """static 폴더 → {상대 경로: {"hash", "mimetype", "identity", "gzip", "br"}} (프로세스당 1회)"""
+    global _assets
+    if _assets is not None:
+        return _assets
+    with _assets_lock:
+        if _assets is None:
+            assets = {}
+            for dirpath, _, filenames in os.walk(app.static_folder):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    rel = os.path.relpath(path, app.static_folder).replace(os.sep, "/")
+                    with open(path, "rb") as fp:
+                        data = fp.read()
+                    entry = {
+                        "hash": hashlib.sha256(data).hexdigest()[:12],
+                        "mimetype": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                        "identity": data,
+                    }
+                    if filename.endswith(ASSET_COMPRESS_EXTENSIONS):
+                        entry["gzip"] = gzip.compress(data, 9, mtime=0)
+                        if brotli:
+                            entry["br"] = brotli.compress(data, quality=11)
+                    assets[rel] = entry
+            _assets = assets
+    return _assets
+
+
+@app.template_global()
+def asset_url(path):
+    """템플릿용 정적 파일 URL (내용 해시가 붙은 장기 캐시 URL)"""
+    entry = load_assets()[path]
+    stem, ext = os.path.splitext(path)
+    return url_for("asset", filename=f"{stem}.{entry['hash']}{ext}")
+
+
+def preferred_encoding(available=("br", "gzip")):
+    """Accept-Encoding 중 서버가 만들 수 있는 압축 방식 (br 우선, 없으면 None)"""
+    accept = request.accept_encodings
+    for encoding in available:
+        if encoding == "br" and brotli is None:
+            continue
+        if accept[encoding]:
+            return encoding
+    return None
+
+
+def compress_bytes(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+@app.route("/assets/<path:filename>")
+def asset(filename):
+    """지문 URL 정적 파일 (해시가 현재 내용과 다르면 404 → 예전 URL에 새 내용이 캐시되지 않도록)"""
+    m = ASSET_NAME_RE.match(filename)
+    entry = load_assets().get(f"{m['stem']}{m['ext']}") if m else None
+    if not entry or entry["hash"] != m["hash"]:
+        return jsonify({"status": "error", "message": "파일이 존재하지 않습니다."}), 404
+
+    encoding = preferred_encoding([e for e in ("br", "gzip") if e in entry])
+    response = Response(entry[encoding or "identity"], mimetype=entry["mimetype"])
+    if "gzip" in entry:  # 압축본이 있는 파일 (css/js)
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.set_etag(f"{entry['hash']}-{encoding or 'identity'}")
+    response.headers["Cache-Control"] = f"public, max-age={ASSET_CACHE_SECONDS}, immutable"
+    return response.make_conditional(request)
+
+
+@app.after_request
+def compress_response(response):
+    """HTML/JSON 응답 압축 (메트릭 after_request보다 먼저 실행 → 압축 시간도 요청 시간에 포함)"""
+    if (
+        not app.config["COMPRESS_RESPONSES"]
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = preferred_encoding()
+    if not encoding or (response.content_length or 0) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress_bytes(response.get_data(), encoding))  # Content-Length도 갱신됨
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def warm_templates():
+    """템플릿을 미리 컴파일 (바이트코드 캐시에 저장 → 재시작 후에도 파싱 없이 로드)"""
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
+
+
+# =========================
+# 실행
+# =========================
+def create_app(config=None):
+    """
+    앱 설정 적용 + 1회 초기화 (폴더, 스키마 마이그레이션, 검색 색인)
+    - config: app.config에 덮어쓸 값 (DATA_DIR만 주면 DB_PATH/UPLOAD_FOLDER도 그 아래로)
+    - gunicorn은 --preload로 마스터에서 한 번 호출 → 워커는 초기화된 앱을 fork
+      (DB 연결은 워커/스레드별로 새로 생성)
+    """
+    global _db_ready, _render_cache
+    config = dict(config or {})
+    if "DATA_DIR" in config:
+        config = {**data_paths(config["DATA_DIR"]), **config}
+    if "USERS_FILE" in config:
+        config.setdefault("USERS", load_users(config["USERS_FILE"]))
+    app.config.update(config)
+    app.config["USE_X_SENDFILE"] = app.config["FILE_OFFLOAD"] == "x-sendfile"
+    _db_ready = False
+    _render_cache = None
+    init_db()
+    # 템플릿 바이트코드 캐시 + 미리 컴파일, 정적 파일 압축본 준비
+    # (--preload면 마스터에서 한 번 → 워커의 첫 요청이 템플릿 컴파일을 기다리지 않음)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_DIR"])
+    app.jinja_env.cache.clear()
+    warm_templates()
+    load_assets()
+    return app
+
+
+if __name__ == "__main__":
+    create_app()
+    start_job_thread()
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "5000")), debug=False)
 
 
@@ -0,0 +1,152 @@
+"""
+백업 벤치마크 (DB 온라인 백업 처리량 + 백업 중 요청 지연)
+
+사용법:
+    python bench/bench_backup.py --reports 200000 --files 300 --pages 64 256 1024 0
+
+합성 보고서 + 첨부파일(해시 저장소)을 만든 뒤
+- 백업 없이 /list 요청 지연 (기준값)
+- 단계당 페이지 수별 전체 스냅샷: DB 복사 MB/s, 다시 시작 횟수, 그 동안의 /list 지연
+- 첨부파일 몇 개 추가 후 증분 스냅샷: 새 파일만 복사되는지와 걸린 시간
+을 출력한다. --writes를 주면 백업 중에도 /create 쓰기를 섞는다. (0은 한 번에 복사)
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_list import seed  # noqa: E402
+
+
+def add_blobs(app_module, conn, n_files, size_kb, start=0):
+    """첨부파일 n개를 저장소에 만들고 report_files 행에 해시 연결"""
+    rows = conn.execute(
+        "SELECT id FROM report_files WHERE content_hash IS NULL ORDER BY id LIMIT ?", (n_files,)
+    ).fetchall()
+    for i, row in enumerate(rows):
+        data = hashlib.sha256(str(start + i).encode()).digest() * (size_kb * 1024 // 32)
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = app_module.blob_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fp:
+            fp.write(data)
+        conn.execute("UPDATE report_files SET content_hash = ? WHERE id = ?", (content_hash, row["id"]))
+    conn.commit()
+    return len(rows)
+
+
+class Probe:
+    """백그라운드에서 /list(+선택적으로 /create)를 계속 요청하며 지연 기록"""
+
+    def __init__(self, app_module, writes):
+        self.app_module = app_module
+        self.writes = writes
+        self.latencies = []
+        self.stop = threading.Event()
+        self.threads = [threading.Thread(target=self._read)]
+        if writes:
+            self.threads.append(threading.Thread(target=self._write))
+
+    def _client(self):
+        client = self.app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess["user"] = {"username": "gajaopd", "department": "외래"}
+        return client
+
+    def _read(self):
+        client = self._client()
+        while not self.stop.is_set():
+            t0 = time.perf_counter()
+            assert client.get("/list").status_code == 200
+            self.latencies.append((time.perf_counter() - t0) * 1000)
+            time.sleep(0.01)
+
+    def _write(self):
+        client = self._client()
+        n = 0
+        while not self.stop.is_set():
+            n += 1
+            client.post("/create", data={"title": f"bench {n}", "category[]": ["일반"], "content[]": ["x"]})
+            time.sleep(0.1)
+
+    def __enter__(self):
+        for t in self.threads:
+            t.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for t in self.threads:
+            t.join()
+
+    def summary(self):
+        lat = sorted(self.latencies)
+        p95 = lat[int(len(lat) * 0.95) - 1] if lat else 0
+        return f"n={len(lat):>4} p50={statistics.median(lat):6.1f} p95={p95:6.1f} max={max(lat):6.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200000)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--pages", type=int, nargs="+", default=[64, 256, 1024, 0])
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    parser.add_argument("--writes", action="store_true", help="백업 중 /create 쓰기도 계속")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="gaja_bench_")
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.create_app({"DATA_DIR": data_dir})
+    seed(app_module.app.config["DB_PATH"], args.reports)
+    conn = app_module.connect_db()
+    add_blobs(app_module, conn, args.files, args.file_kb)
+    conn.execute("DELETE FROM report_files WHERE content_hash IS NULL")  # 파일 없는 합성 행 제외
+    conn.commit()
+    db_mb = os.path.getsize(app_module.app.config["DB_PATH"]) / 1e6
+    print(f"## reports={args.reports:,} db={db_mb:.1f} MB files={args.files} x {args.file_kb} KB"
+          f"{' (+writes)' if args.writes else ''}")
+
+    with Probe(app_module, args.writes) as probe:
+        time.sleep(args.idle_seconds)
+    print(f"{'no backup':<22} {'':<38} /list {probe.summary()}")
+
+    for pages in args.pages:
+        backup_dir = tempfile.mkdtemp(prefix="gaja_backup_", dir=data_dir)
+        with Probe(app_module, args.writes) as probe:
+            manifest = app_module.create_snapshot(backup_dir, full=True, pages_per_step=pages)
+        db = manifest["db"]
+        label = f"pages={pages or 'all'}"
+        print(f"{label:<22} DB {manifest['db_bytes'] / 1e6 / manifest['db_seconds']:6.0f} MB/s "
+              f"{manifest['db_seconds']:5.2f}s {db['steps']:>4} steps {db['restarts']} restarts"
+              f"{' (single step)' if db['single_step'] and pages else ''}  /list {probe.summary()}")
+        files = manifest["files"]
+        print(f"{'':<22} files {files['copied']} copied, {files['bytes'] / 1e6:.1f} MB, total {manifest['seconds']:.2f}s")
+
+    # 증분: 새 첨부파일 몇 개만 추가
+    conn.execute("""
+        INSERT INTO report_files (report_id, department, filename, original_name)
+        SELECT id, department, id || '_new.bin', 'new.bin' FROM reports ORDER BY id LIMIT 20
+    """)
+    conn.commit()
+    added = add_blobs(app_module, conn, 20, args.file_kb, start=args.files)
+    t0 = time.perf_counter()
+    manifest = app_module.create_snapshot(backup_dir)
+    files = manifest["files"]
+    print(f"{'incremental':<22} +{added} files: checked {files['checked']}, copied {files['copied']}, "
+          f"{time.perf_counter() - t0:.2f}s total")
+    problems = app_module.verify_snapshot(manifest["name"], backup_dir, full=True)
+    print(f"{'verify --full':<22} {'ok' if not problems else problems[:3]}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
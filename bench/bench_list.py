@@ -0,0 +1,126 @@
+"""
+/list 조회 벤치마크 (쿼리 수 + 응답 시간)
+
+사용법:
+    python bench/bench_list.py --reports 10000 100000
+
+임시 DATA_DIR에 합성 보고서를 채운 뒤 Flask test client로 /list를 호출하고,
+모드(전체/제목+내용/카테고리)별 SQL 실행 횟수와 평균 응답 시간을 출력한다.
+3글자 이상 검색어는 FTS 색인 사용/미사용(LIKE)을 나눠서 비교한다.
+렌더링 캐시는 끈다(RENDER_CACHE=off): 켜 두면 두 번째 반복부터 캐시된 조회 결과만 읽어
+모든 모드가 쿼리 1건이 되고 FTS/LIKE 비교도 의미가 없어진다.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEPTS = ["외래", "병동", "수술실", "상담실"]
+CATEGORIES = ["일 반", "인사행정", "사건보고", "구매요청", "요청사항", "장비수리", "특이사항", "익일업무"]
+WORDS = ["환자", "수술", "장비", "교체", "요청", "퇴원", "입원", "보호자", "처방", "점검", "회의", "근무"]
+
+
+def seed(db_path, n_reports):
+    """합성 보고서 n건 생성 (보고서당 내용 3건, 10%는 첨부파일 1건)"""
+    rnd = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    reports, contents, files = [], [], []
+    local_ids = {d: 0 for d in DEPTS}
+    days = max(n_reports // 200, 30)
+    for rid in range(1, n_reports + 1):
+        dept = DEPTS[rid % len(DEPTS)]
+        local_ids[dept] += 1
+        date = time.strftime("%Y-%m-%d", time.localtime(time.time() - rnd.randrange(days) * 86400))
+        reports.append((rid, local_ids[dept], " ".join(rnd.sample(WORDS, 3)), date, dept, date + " 09:00:00"))
+        for _ in range(3):
+            contents.append((rid, rnd.choice(CATEGORIES), " ".join(rnd.sample(WORDS, 6))))
+        if rid % 100 == 0:
+            # 선택도 높은(1%) 검색어
+            contents.append((rid, "장비수리", "내시경세척기 고장으로 수리 요청"))
+        if rid % 10 == 0:
+            files.append((rid, dept, f"{rid}.jpg", f"사진{rid}.jpg"))
+    conn.executemany("INSERT INTO reports (id, local_id, title, date, department, created_at) VALUES (?, ?, ?, ?, ?, ?)", reports)
+    conn.executemany("INSERT INTO report_contents (report_id, category, content) VALUES (?, ?, ?)", contents)
+    conn.executemany("INSERT INTO report_files (report_id, department, filename, original_name) VALUES (?, ?, ?, ?)", files)
+    # 이후 /create로 작성할 때 순번이 이어지도록 부서 카운터도 맞춤
+    conn.executemany(
+        "INSERT OR REPLACE INTO department_counters (department, last_local_id) VALUES (?, ?)",
+        local_ids.items()
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(n_reports, repeat):
+    data_dir = tempfile.mkdtemp(prefix="gaja_bench_")
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.create_app({"DATA_DIR": data_dir, "RENDER_CACHE": "off"})
+    seed(app_module.app.config["DB_PATH"], n_reports)
+
+    # get_db()가 돌려주는 연결마다 SQL 실행 횟수 집계
+    # (트리거 내부 문장 "-- ..."와 FTS5가 내부적으로 실행하는 'main'.테이블 조회는 제외)
+    counter = {"n": 0}
+    original_get_db = app_module.get_db
+
+    def count_statement(sql):
+        if not sql.lstrip().startswith("--") and "'main'." not in sql:
+            counter["n"] += 1
+
+    def counting_get_db():
+        conn = original_get_db()
+        conn.set_trace_callback(count_statement)
+        return conn
+
+    app_module.get_db = counting_get_db
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user"] = {"username": "gajakjh", "department": "관리자"}
+
+    query = "start_date=2000-01-01&end_date=2100-12-31"
+    # (이름, URL, FTS 색인 사용 여부)
+    cases = [
+        ("전체", f"/list?{query}", True),
+        ("제목+내용", f"/list?{query}&filter=title_content&search=교체", True),
+        ("카테고리", f"/list?{query}&filter=category&search=수리", True),
+        # 3글자 이상 검색어 → FTS 색인 vs LIKE 전체 스캔 비교
+        ("제목+내용 FTS", f"/list?{query}&filter=title_content&search=세척기", True),
+        ("제목+내용 LIKE", f"/list?{query}&filter=title_content&search=세척기", False),
+        ("카테고리 FTS", f"/list?{query}&filter=category&search=장비수", True),
+        ("카테고리 LIKE", f"/list?{query}&filter=category&search=장비수", False),
+    ]
+    search_index = app_module.SEARCH_INDEX_ENABLED
+    print(f"\n## reports={n_reports:,}")
+    print(f"{'mode':<14} {'queries':>8} {'mean ms':>10} {'p95 ms':>10}")
+    for label, url, use_index in cases:
+        app_module.SEARCH_INDEX_ENABLED = search_index and use_index
+        timings = []
+        for _ in range(repeat):
+            counter["n"] = 0
+            t0 = time.perf_counter()
+            resp = client.get(url)
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert resp.status_code == 200, resp.status_code
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{label:<14} {counter['n']:>8} {statistics.mean(timings):>10.1f} {p95:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for n in args.reports:
+        run(n, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+페이지 전송량 / 첫 화면 표시 시간 벤치마크
+
+사용법:
+    python bench/bench_pages.py --reports 5000
+    python bench/bench_pages.py --root /path/to/other/checkout   # 다른 버전과 비교
+
+주요 화면(로그인, 목록, 상세, 작성, 수정)마다
+- 첫 방문: HTML + 화면이 참조하는 CSS/JS/이미지 전송 바이트 (Accept-Encoding: gzip, br)
+- 재방문: 브라우저 캐시 규칙(Cache-Control max-age/immutable, ETag 재검증)을 따랐을 때 전송 바이트
+- 서버 응답 시간(TTFB, 중앙값)과 예상 첫 화면 표시 시간
+  (RTT/대역폭 모델: TTFB + 왕복 + HTML 전송 + <head>의 CSS·동기 JS 왕복/전송, 병렬 요청)
+- 새 프로세스의 첫 /list 응답 시간 (템플릿 컴파일 포함, 두 번째 실행은 Jinja 바이트코드 캐시 사용)
+을 출력한다. 실제 브라우저 렌더링이 아니라 네트워크 모델 추정치다.
+렌더링 캐시는 운영 기본값(RENDER_CACHE=sqlite)대로 켜 둔다: 반복 요청의 TTFB는 캐시 적중 기준.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+from bench_list import seed  # noqa: E402
+
+ACCEPT = {"Accept-Encoding": "gzip, br"}
+SUBRESOURCE_RE = re.compile(
+    r'<link[^>]+rel="stylesheet"[^>]+href="([^"]+)"|<script[^>]+src="([^"]+)"|<img[^>]+src="(/[^"]+)"'
+)
+
+COLD_START = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import app as app_module
+t0 = time.perf_counter()
+app_module.create_app({"DATA_DIR": sys.argv[2], "RENDER_CACHE": "sqlite"})
+init = time.perf_counter() - t0
+client = app_module.app.test_client()
+with client.session_transaction() as sess:
+    sess["user"] = {"username": "gajaopd", "department": "외래"}
+t0 = time.perf_counter()
+client.get("/list")
+first = time.perf_counter() - t0
+t0 = time.perf_counter()
+client.get("/list")
+print(f"{init * 1000:.1f} {first * 1000:.1f} {(time.perf_counter() - t0) * 1000:.1f}")
+"""
+
+
+def wire_bytes(resp):
+    """응답 본문 + 헤더 바이트 (대략적인 전송량)"""
+    headers = sum(len(k) + len(v) + 4 for k, v in resp.headers.items()) + 17
+    return headers + len(resp.get_data())
+
+
+def max_age(resp):
+    m = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+    return int(m.group(1)) if m and "no-cache" not in resp.headers.get("Cache-Control", "") else 0
+
+
+def page_view(client, url, cache):
+    """
+    화면 1회 표시 → (HTML 바이트, 차단 리소스 바이트 목록, 전체 바이트, TTFB ms)
+    cache: {url: (etag, last_modified, max_age)} 브라우저 캐시 흉내 (재방문 시 사용)
+    """
+    t0 = time.perf_counter()
+    resp = client.get(url, headers=ACCEPT)
+    ttfb = (time.perf_counter() - t0) * 1000
+    assert resp.status_code == 200, (url, resp.status_code)
+    html_bytes = wire_bytes(resp)
+    html = resp.get_data(as_text=True) if not resp.headers.get("Content-Encoding") else None
+    if html is None:
+        # 압축된 응답이면 참조 리소스를 찾기 위해 원문으로 한 번 더 (전송량에는 포함하지 않음)
+        html = client.get(url).get_data(as_text=True)
+    head = html.split("</head>", 1)[0]
+
+    blocking, total = [], html_bytes
+    for match in SUBRESOURCE_RE.finditer(html):
+        src = next(g for g in match.groups() if g)
+        if src.startswith("http"):
+            continue
+        cached = cache.get(src)
+        if cached and cached[2] > 0:
+            size = 0  # 유효기간 안 → 요청 없음
+        else:
+            headers = dict(ACCEPT)
+            if cached and cached[0]:
+                headers["If-None-Match"] = cached[0]
+            if cached and cached[1]:
+                headers["If-Modified-Since"] = cached[1]
+            r = client.get(src, headers=headers)
+            size = wire_bytes(r)
+            if r.status_code == 200:
+                cache[src] = (r.headers.get("ETag"), r.headers.get("Last-Modified"), max_age(r))
+        total += size
+        is_blocking = match.group(1) or (match.group(2) and match.start() < len(head) and "defer" not in match.group(0))
+        if is_blocking and size:
+            blocking.append(size)
+    return html_bytes, blocking, total, ttfb
+
+
+def first_render_ms(ttfb, html_bytes, blocking, rtt_ms, mbps):
+    per_byte = 8 / (mbps * 1000)  # ms/byte
+    ms = ttfb + rtt_ms + html_bytes * per_byte
+    if blocking:
+        ms += rtt_ms + sum(blocking) * per_byte  # 병렬 요청, 같은 대역폭 공유
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=os.path.dirname(BENCH_DIR), help="측정할 app.py가 있는 폴더")
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=40)
+    parser.add_argument("--mbps", type=float, default=10)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="gaja_bench_")
+    sys.path.insert(0, os.path.abspath(args.root))
+    import app as app_module
+
+    app_module.create_app({"DATA_DIR": data_dir, "RENDER_CACHE": "sqlite"})
+    seed(app_module.app.config["DB_PATH"], args.reports)
+    report_id = args.reports - 4  # 외래 부서 보고서
+
+    anon = app_module.app.test_client()
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user"] = {"username": "gajaopd", "department": "외래"}
+    pages = [
+        ("login", anon, "/login"),
+        ("list", client, "/list"),
+        ("view", client, f"/view/{report_id}"),
+        ("create", client, "/create"),
+        ("edit", client, f"/edit/{report_id}"),
+    ]
+
+    print(f"## {os.path.abspath(args.root)} (RTT {args.rtt_ms:.0f} ms, {args.mbps:.0f} Mbit/s)")
+    print(f"{'page':<8} {'first KB':>9} {'repeat KB':>10} {'TTFB ms':>8} {'render ms':>10} {'repeat render':>14}")
+    cache = {}
+    totals = [0, 0]
+    for name, c, url in pages:
+        html_bytes, blocking, first_total, _ = page_view(c, url, cache)
+        ttfbs = []
+        for _ in range(args.repeat):
+            repeat_html, repeat_blocking, repeat_total, ttfb = page_view(c, url, cache)
+            ttfbs.append(ttfb)
+        ttfb = statistics.median(ttfbs)
+        totals[0] += first_total
+        totals[1] += repeat_total
+        print(f"{name:<8} {first_total / 1024:>9.1f} {repeat_total / 1024:>10.1f} {ttfb:>8.2f} "
+              f"{first_render_ms(ttfb, html_bytes, blocking, args.rtt_ms, args.mbps):>10.1f} "
+              f"{first_render_ms(ttfb, repeat_html, repeat_blocking, args.rtt_ms, args.mbps):>14.1f}")
+    print(f"{'total':<8} {totals[0] / 1024:>9.1f} {totals[1] / 1024:>10.1f}")
+
+    for label in ("cold start", "cold start (warm disk cache)"):
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_START, os.path.abspath(args.root), data_dir],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        print(f"{label:<30} create_app {out[0]} ms, first /list {out[1]} ms, second /list {out[2]} ms")
+
+
+if __name__ == "__main__":
+    main()
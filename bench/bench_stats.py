@@ -0,0 +1,86 @@
+"""
+/stats 조회 벤치마크 (집계 테이블 vs 원본 GROUP BY)
+
+사용법:
+    python bench/bench_stats.py --reports 10000 100000 300000
+
+보고서 수를 늘려가며 같은 기간(최근 1년, 전체 부서)의 통계를
+- /stats (report_stats 집계 테이블 + pandas 주/월 합계)
+- 원본 테이블 직접 집계 (reports × report_contents GROUP BY)
+로 조회해 평균 응답 시간을 비교한다. 집계 테이블 쪽은 보고서 수와 무관하게 일정해야 한다.
+렌더링 캐시는 끄고(RENDER_CACHE=off) 매번 실제 조회 비용을 잰다.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_list import seed  # noqa: E402
+
+RAW_STATS_SQL = """
+    SELECT r.department, c.category, r.date, COUNT(*)
+    FROM report_contents c JOIN reports r ON r.id = c.report_id
+    WHERE r.date BETWEEN ? AND ?
+    GROUP BY r.department, c.category, r.date
+"""
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.mean(timings)
+
+
+def run(n_reports, repeat):
+    data_dir = tempfile.mkdtemp(prefix="gaja_bench_")
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.create_app({"DATA_DIR": data_dir, "RENDER_CACHE": "off"})
+    seed(app_module.app.config["DB_PATH"], n_reports)
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user"] = {"username": "gajakjh", "department": "관리자"}
+
+    conn = app_module.connect_db()
+    end = time.strftime("%Y-%m-%d")
+    start = time.strftime("%Y-%m-%d", time.localtime(time.time() - 365 * 86400))
+    summary_rows = conn.execute("SELECT COUNT(*) FROM report_stats").fetchone()[0]
+
+    def page(period):
+        resp = client.get(f"/stats?period={period}&start_date={start}&end_date={end}")
+        assert resp.status_code == 200, resp.status_code
+
+    results = [
+        ("/stats 주별", timed(lambda: page("week"), repeat)),
+        ("/stats 월별", timed(lambda: page("month"), repeat)),
+        ("집계 테이블 조회", timed(lambda: app_module.fetch_stats_rows(conn, start, end), repeat)),
+        ("원본 GROUP BY", timed(lambda: conn.execute(RAW_STATS_SQL, (start, end)).fetchall(), repeat)),
+    ]
+    conn.close()
+
+    print(f"\n## reports={n_reports:,} (report_stats rows={summary_rows:,})")
+    print(f"{'mode':<16} {'mean ms':>10}")
+    for label, mean in results:
+        print(f"{label:<16} {mean:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for n in args.reports:
+        run(n, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+동시 작성 시 부서별 순번(local_id) 중복/누락 검사
+
+사용법:
+    python bench/stress_local_id.py --processes 8 --threads 4 --reports 50
+
+여러 프로세스(각각 여러 스레드)가 같은 임시 DB에 Flask test client로 /create를
+동시에 호출한 뒤, 부서마다 local_id가 1..N으로 중복 없이 연속인지 확인한다.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERS = ["gajaopd", "gajaward", "gajaor", "gajacoordi"]
+
+
+def worker(args):
+    """프로세스 1개: threads개의 스레드가 각자 reports건씩 작성"""
+    data_dir, threads, reports, barrier = args
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    app_module.create_app({"DATA_DIR": data_dir})
+
+    errors = []
+
+    def run(thread_no):
+        client = app_module.app.test_client()
+        username = USERS[(os.getpid() + thread_no) % len(USERS)]
+        with client.session_transaction() as sess:
+            sess["user"] = {"username": username, "department": app_module.app.config["USERS"][username]["department"]}
+        for i in range(reports):
+            resp = client.post("/create", data={
+                "title": f"동시작성 {os.getpid()}-{thread_no}-{i}",
+                "category[]": ["일 반"],
+                "content[]": ["부하 테스트"],
+            })
+            if resp.status_code != 302:
+                errors.append(resp.status_code)
+
+    barrier.wait()
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--reports", type=int, default=50, help="스레드당 작성 건수")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="gaja_stress_")
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    app_module.create_app({"DATA_DIR": data_dir})
+
+    manager = multiprocessing.Manager()
+    barrier = manager.Barrier(args.processes)
+    started = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        results = pool.map(worker, [(data_dir, args.threads, args.reports, barrier)] * args.processes)
+    elapsed = time.perf_counter() - started
+
+    errors = [code for result in results for code in result]
+    expected = args.processes * args.threads * args.reports
+    conn = sqlite3.connect(app_module.app.config["DB_PATH"])
+    total = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    print(f"created {total}/{expected} reports in {elapsed:.1f}s ({total / elapsed:.0f}/s), HTTP errors: {len(errors)}")
+
+    ok = total == expected and not errors
+    for dept, count, lo, hi, distinct in conn.execute("""
+        SELECT department, COUNT(*), MIN(local_id), MAX(local_id), COUNT(DISTINCT local_id)
+        FROM reports GROUP BY department ORDER BY department
+    """):
+        dept_ok = lo == 1 and hi == count == distinct
+        ok = ok and dept_ok
+        print(f"  {dept}: {count} reports, local_id {lo}..{hi}, distinct {distinct} {'OK' if dept_ok else 'FAIL'}")
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
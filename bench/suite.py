@@ -0,0 +1,399 @@
+"""
+주요 라우트 벤치마크 (test client + gunicorn HTTP 부하)
+
+사용법:
+    python bench/suite.py --reports 20000
+    python bench/suite.py --reports 100000 --workers 4 --clients 8 --duration 30
+    python bench/suite.py --reports 20000 --compare bench/results/20251101-093000.json
+    python bench/suite.py --skip-http            # test client만
+
+1. 임시 DATA_DIR(/var/data 아님)에 합성 DB 생성
+   - 4개 부서, 보고서당 카테고리별 한국어 내용 1~4건, 일부 보고서에 첨부파일(이미지/hwp)
+2. Flask test client로 라우트별 요청 → 앱 자체 처리 시간
+3. 같은 DB로 gunicorn을 띄우고 여러 프로세스가 HTTP로 동시 요청 → 서버 포함 지연/처리량
+라우트별 p50/p95/p99(ms)와 처리량(req/s)을 출력하고 bench/results/<시각>.json에 저장한다.
+--compare로 이전 결과 파일을 주면 p95/처리량 변화율을 함께 출력.
+"""
+import argparse
+import hashlib
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+DEPTS = ["외래", "병동", "수술실", "상담실"]
+DEPT_USERS = {"외래": "gajaopd", "병동": "gajaward", "수술실": "gajaor", "상담실": "gajacoordi"}
+ADMIN_USER = "gajakjh"
+PASSWORD = "1234"
+
+# 카테고리별 문장 조각 (실제 보고서 문체 흉내)
+PHRASES = {
+    "일 반": ["오전 회의 진행함", "근무표 공지 확인", "병동 라운딩 완료", "전달사항 공유함"],
+    "인사행정": ["신규 간호사 오리엔테이션 진행", "연차 신청 2건 접수", "교육 이수 현황 제출", "근무 변경 요청 처리"],
+    "사건보고": ["낙상 위험 환자 침상 난간 재확인", "투약 오류 근접오류 1건 보고", "보호자 민원 접수 후 면담", "환자 이탈 시도 있어 보안팀 연락"],
+    "구매요청": ["드레싱 세트 재고 부족으로 구매 요청", "수액 세트 20박스 추가 요청", "멸균 장갑 사이즈별 보충 필요", "체온계 배터리 교체 요청"],
+    "요청사항": ["야간 인력 충원 요청", "전산 프린터 점검 요청", "환자 이송 카트 추가 배치 요청", "청소 구역 재배정 요청"],
+    "장비수리": ["내시경세척기 고장으로 수리 요청", "수액 펌프 알람 오류 점검 필요", "석션기 흡입압 저하 수리 의뢰", "모니터 화면 깜빡임 AS 접수"],
+    "특이사항": ["고열 환자 격리실 배정", "보호자 상주 요청 승인", "퇴원 예정 환자 교육 완료", "수술 일정 변경 안내"],
+    "익일업무": ["오전 수술 3건 준비", "외래 예약 환자 전화 안내", "의약품 재고 조사 예정", "장비 정기 점검 일정 확인"],
+}
+CATEGORIES = list(PHRASES)
+TITLES = ["일일보고서", "주간 업무 보고", "야간 근무 보고", "특이사항 보고", "장비 점검 보고"]
+
+
+# -------------------------------
+# 1. 합성 데이터
+# -------------------------------
+def _make_blobs(upload_folder, rnd, images=12, documents=4):
+    """첨부파일 원본 몇 개를 해시 저장소 형식으로 생성 → [(content_hash, 원본명)]"""
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    blobs = []
+    for n in range(images + documents):
+        if n < images and Image is not None:
+            buf = io.BytesIO()
+            color = tuple(rnd.randrange(256) for _ in range(3))
+            Image.new("RGB", (1600, 1200), color).save(buf, "JPEG", quality=90)
+            data, name = buf.getvalue(), f"현장사진{n + 1}.jpg"
+        else:
+            data, name = os.urandom(rnd.randrange(200, 800) * 1024), f"보고서 첨부{n + 1}.hwp"
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = os.path.join(upload_folder, "_store", content_hash[:2], content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fp:
+            fp.write(data)
+        blobs.append((content_hash, name))
+    return blobs
+
+
+def seed(app_module, n_reports, attach_ratio=0.1, days=365, seed_value=42):
+    """
+    합성 보고서 n건 생성 (app.create_app() 이후 호출)
+    - 내용은 FTS 색인 트리거가 문장마다 색인을 내려쓰지 않도록 json_each로 묶어서 저장
+    반환: 첨부파일 URL 경로 목록
+    """
+    import sqlite3
+
+    rnd = random.Random(seed_value)
+    blobs = _make_blobs(app_module.app.config["UPLOAD_FOLDER"], rnd)
+    conn = sqlite3.connect(app_module.app.config["DB_PATH"])
+    conn.execute("PRAGMA foreign_keys = ON")
+    local_ids = {d: 0 for d in DEPTS}
+    today = time.time()
+    reports, contents, files = [], [], []
+    for rid in range(1, n_reports + 1):
+        dept = DEPTS[rid % len(DEPTS)]
+        local_ids[dept] += 1
+        date = time.strftime("%Y-%m-%d", time.localtime(today - rnd.randrange(days) * 86400))
+        reports.append([rid, local_ids[dept], rnd.choice(TITLES), date, dept, f"{date} {rnd.randrange(7, 20):02d}:00:00"])
+        for category in rnd.sample(CATEGORIES, rnd.randint(1, 4)):
+            text = ", ".join(rnd.sample(PHRASES[category], 2))
+            contents.append([rid, category, text])
+        if rnd.random() < attach_ratio:
+            content_hash, name = rnd.choice(blobs)
+            ext = os.path.splitext(name)[1]
+            files.append((rid, dept, f"{content_hash[:12]}_{rid}{ext}", name, content_hash))
+
+    with conn:
+        conn.execute("""
+            INSERT INTO reports (id, local_id, title, date, department, created_at)
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'),
+                   json_extract(value, '$[3]'), json_extract(value, '$[4]'), json_extract(value, '$[5]')
+            FROM json_each(?)
+        """, (json.dumps(reports, ensure_ascii=False),))
+        conn.execute("""
+            INSERT INTO report_contents (report_id, category, content)
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+            FROM json_each(?)
+        """, (json.dumps(contents, ensure_ascii=False),))
+        conn.executemany(
+            "INSERT INTO report_files (report_id, department, filename, original_name, content_hash) VALUES (?, ?, ?, ?, ?)",
+            files
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO department_counters (department, last_local_id) VALUES (?, ?)",
+            local_ids.items()
+        )
+    conn.close()
+    return [f"/uploads/{urllib.parse.quote(d)}/{urllib.parse.quote(f)}" for _, d, f, _, _ in files]
+
+
+# -------------------------------
+# 2. 요청 시나리오
+# -------------------------------
+def _date_range():
+    end = time.strftime("%Y-%m-%d")
+    start = time.strftime("%Y-%m-%d", time.localtime(time.time() - 30 * 86400))
+    return start, end
+
+
+def build_requests(n_reports, attachment_urls, rnd):
+    """
+    라우트별 요청 생성기 모음 → {이름: (사용자, 함수(rnd) → (method, path, body))}
+    사용자: 관리자(admin) 또는 부서 사용자(dept)
+    """
+    start, end = _date_range()
+    query = f"start_date={start}&end_date={end}"
+
+    def create_body(r):
+        fields = [("title", "벤치마크 보고서"), ("date", end)]
+        for category in r.sample(CATEGORIES, 2):
+            fields += [("category[]", category), ("content[]", ", ".join(r.sample(PHRASES[category], 2)))]
+        return urllib.parse.urlencode(fields)
+
+    scenarios = {
+        "report_list": ("admin", lambda r: ("GET", f"/list?{query}", None)),
+        "report_list_search": ("admin", lambda r: ("GET", f"/list?{query}&filter=title_content&search="
+                                                         f"{urllib.parse.quote('세척기')}", None)),
+        "view_report": ("admin", lambda r: ("GET", f"/view/{r.randint(1, n_reports)}", None)),
+        "create_report": ("dept", lambda r: ("POST", "/create", create_body(r))),
+    }
+    if attachment_urls:
+        scenarios["uploaded_file"] = ("admin", lambda r: ("GET", r.choice(attachment_urls), None))
+    return scenarios
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99/평균 (nearest-rank)"""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+    }
+
+
+# -------------------------------
+# 3. test client
+# -------------------------------
+def run_client(app_module, scenarios, iterations, rnd):
+    clients = {}
+    for role, username in (("admin", ADMIN_USER), ("dept", DEPT_USERS["외래"])):
+        client = app_module.app.test_client()
+        client.post("/login", data={"username": username, "password": PASSWORD})
+        clients[role] = client
+
+    results = {}
+    for name, (role, make) in scenarios.items():
+        timings = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            method, path, body = make(rnd)
+            t0 = time.perf_counter()
+            if method == "GET":
+                resp = clients[role].get(path)
+            else:
+                resp = clients[role].post(path, data=body, content_type="application/x-www-form-urlencoded")
+            resp.get_data()
+            timings.append((time.perf_counter() - t0) * 1000)
+            assert resp.status_code < 400, (name, path, resp.status_code)
+        stats = percentiles(timings)
+        stats["rps"] = iterations / (time.perf_counter() - started)
+        results[name] = stats
+    return results
+
+
+# -------------------------------
+# 4. gunicorn + HTTP 부하
+# -------------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(data_dir, workers, threads, port):
+    env = dict(os.environ, DATA_DIR=data_dir)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads),
+         "-b", f"127.0.0.1:{port}", "--chdir", ROOT, "--log-level", "warning", "--preload",
+         "app:create_app()"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def _login(port, username):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = urllib.parse.urlencode({"username": username, "password": PASSWORD})
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie", "").split(";", 1)[0]
+    return conn, cookie
+
+
+def _load_worker(args):
+    """부하 프로세스 1개: duration초 동안 시나리오를 무작위로 골라 요청 (keep-alive)"""
+    port, n_reports, attachment_urls, names, duration, seed_value = args
+    rnd = random.Random(seed_value)
+    scenarios = build_requests(n_reports, attachment_urls, rnd)
+    sessions = {"admin": _login(port, ADMIN_USER), "dept": _login(port, DEPT_USERS[DEPTS[seed_value % 4]])}
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        name = rnd.choice(names)
+        role, make = scenarios[name]
+        conn, cookie = sessions[role]
+        method, path, body = make(rnd)
+        headers = {"Cookie": cookie}
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            status = 599
+            conn.close()
+        samples[name].append((time.perf_counter() - t0) * 1000)
+        if status >= 400:
+            errors[name] += 1
+    return samples, errors
+
+
+def run_http(data_dir, n_reports, attachment_urls, scenarios, workers, threads, clients, duration):
+    port = _free_port()
+    proc = start_gunicorn(data_dir, workers, threads, port)
+    try:
+        names = list(scenarios)
+        jobs = [(port, n_reports, attachment_urls, names, duration, n) for n in range(clients)]
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            outputs = pool.map(_load_worker, jobs)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    results = {}
+    for name in scenarios:
+        samples = [ms for out, _ in outputs for ms in out[name]]
+        stats = percentiles(samples)
+        stats["rps"] = len(samples) / duration
+        stats["errors"] = sum(err[name] for _, err in outputs)
+        results[name] = stats
+    return results
+
+
+# -------------------------------
+# 출력 / 저장 / 비교
+# -------------------------------
+def print_table(title, results, baseline=None):
+    print(f"\n## {title}")
+    header = f"{'route':<20} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8}"
+    if baseline:
+        header += f" {'Δp95':>8} {'Δreq/s':>8}"
+    print(header)
+    for name, s in results.items():
+        if not s.get("count"):
+            continue
+        line = f"{name:<20} {s['count']:>7} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} {s['rps']:>8.1f}"
+        base = (baseline or {}).get(name)
+        if base and base.get("count"):
+            line += f" {(s['p95'] / base['p95'] - 1) * 100:>+7.0f}% {(s['rps'] / base['rps'] - 1) * 100:>+7.0f}%"
+        if s.get("errors"):
+            line += f"  errors={s['errors']}"
+        print(line)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--attach-ratio", type=float, default=0.1, help="첨부파일이 있는 보고서 비율")
+    parser.add_argument("--iterations", type=int, default=50, help="test client 라우트별 요청 수")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn 워커 수")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn 워커당 스레드 수")
+    parser.add_argument("--clients", type=int, default=4, help="HTTP 부하 프로세스 수")
+    parser.add_argument("--duration", type=float, default=15, help="HTTP 부하 시간(초)")
+    parser.add_argument("--skip-http", action="store_true", help="gunicorn 부하 생략")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: bench/results/<시각>.json)")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="gaja_suite_")
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    app_module.create_app({"DATA_DIR": data_dir})
+    t0 = time.perf_counter()
+    attachment_urls = seed(app_module, args.reports, args.attach_ratio)
+    print(f"seeded {args.reports:,} reports ({len(attachment_urls):,} attachments) "
+          f"in {time.perf_counter() - t0:.1f}s → {data_dir}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fp:
+            baseline = json.load(fp)
+
+    rnd = random.Random(7)
+    scenarios = build_requests(args.reports, attachment_urls, rnd)
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": _git_revision(),
+            "reports": args.reports,
+            "attachments": len(attachment_urls),
+            "iterations": args.iterations,
+            "workers": args.workers,
+            "threads": args.threads,
+            "clients": args.clients,
+            "duration": args.duration,
+        },
+        "client": run_client(app_module, scenarios, args.iterations, rnd),
+    }
+    print_table("test client (ms)", result["client"], baseline.get("client"))
+
+    if not args.skip_http:
+        result["http"] = run_http(data_dir, args.reports, attachment_urls, scenarios,
+                                  args.workers, args.threads, args.clients, args.duration)
+        print_table(f"gunicorn HTTP ({args.workers} workers × {args.threads} threads, "
+                    f"{args.clients} clients, {args.duration:.0f}s)", result["http"], baseline.get("http"))
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fp:
+        json.dump(result, fp, ensure_ascii=False, indent=2)
+    print(f"\nsaved {output}")
+
+
+if __name__ == "__main__":
+    main()
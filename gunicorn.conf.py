@@ -0,0 +1,41 @@
+# gunicorn 설정 (Procfile: gunicorn -c gunicorn.conf.py "app:create_app()")
+# - preload_app: 마스터에서 create_app()을 한 번 실행(폴더/마이그레이션) 후 워커를 fork
+# - 포트/워커 수는 환경변수로 지정 → 같은 서버에서 DATA_DIR/PORT만 바꿔 여러 인스턴스 실행 가능
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# gthread: 요청마다 스레드 1개, 목록 실시간 갱신(/list/events) 연결도 스레드 1개씩 차지
+# → 앱의 SSE_MAX_CLIENTS(기본 48)보다 넉넉하게 두어 일반 요청용 스레드가 항상 남도록
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "64"))
+worker_connections = int(os.environ.get("GUNICORN_CONNECTIONS", "1000"))  # keep-alive 대기 연결 포함
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))  # 대용량 업로드/내보내기
+preload_app = True
+
+# 백그라운드 작업 처리 프로세스 (flask jobs-worker) 를 웹 서버와 함께 실행/종료
+# - JOB_WORKERS=0 이면 띄우지 않음 (별도 서비스로 실행하는 경우)
+job_workers = int(os.environ.get("JOB_WORKERS", "1"))
+_job_process = None
+
+
+def when_ready(server):
+    global _job_process
+    if job_workers > 0:
+        _job_process = subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", "app:create_app", "jobs-worker",
+             "--processes", str(job_workers)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        server.log.info("job worker started (pid %s, %s process(es))", _job_process.pid, job_workers)
+
+
+def on_exit(server):
+    if _job_process is not None and _job_process.poll() is None:
+        _job_process.terminate()
+        try:
+            _job_process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _job_process.kill()
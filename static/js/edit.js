@@ -0,0 +1,82 @@
+document.addEventListener("DOMContentLoaded", () => {
+  const container=document.getElementById('content-container');
+  const addRowBtn=document.getElementById('addRowBtn');
+  const removeRowBtn=document.getElementById('removeRowBtn');
+  const dropZone = document.getElementById("dropZone");
+  const fileInput = document.getElementById("fileInput");
+  const fileList = document.getElementById("fileList");
+  let selectedFiles=[];
+
+  addRowBtn.addEventListener('click',()=>{
+    const block=document.createElement('div');
+    block.className='content-wrapper';
+    block.innerHTML=`
+      <div class="label-row">
+        <span class="label-text">내용</span>
+        <select name="categories[]" required>
+          <option value="일 반" selected>일 반</option>
+          <option value="인사행정">인사행정</option>
+          <option value="사건보고">사건보고</option>
+          <option value="구매요청">구매요청</option>
+          <option value="요청사항">요청사항</option>
+          <option value="장비수리">장비수리</option>
+          <option value="특이사항">특이사항</option>
+          <option value="익일업무">익일업무</option>
+        </select>
+      </div>
+      <textarea name="contents[]" placeholder="내용을 입력하세요" required></textarea>`;
+    container.appendChild(block);
+  });
+
+  // 클릭 시 파일 선택
+  dropZone.addEventListener("click", () => fileInput.click());
+
+  // 드래그 진입 시 시각효과
+  dropZone.addEventListener("dragover", (e) => {
+    e.preventDefault();
+    dropZone.classList.add("active");
+  });
+
+  // 드래그 이탈 시 효과 제거
+  dropZone.addEventListener("dragleave", () => dropZone.classList.remove("active"));
+
+  // 드롭 시 파일 처리
+  dropZone.addEventListener("drop", (e) => {
+    e.preventDefault();
+    dropZone.classList.remove("active");
+    handleFiles(e.dataTransfer.files);
+  });
+
+  // 파일 선택 시 처리
+  fileInput.addEventListener("change", (e) => {
+    handleFiles(e.target.files);
+  });
+
+  function handleFiles(files) {
+    const dt = new DataTransfer();
+    for (const file of files) {
+      dt.items.add(file);
+    }
+    fileInput.files = dt.files;
+
+    fileList.innerHTML = "";
+    for (const file of fileInput.files) {
+      const div = document.createElement("div");
+      div.classList.add("file-item");
+      div.textContent = "📄 " + file.name;
+      fileList.appendChild(div);
+    }
+  }
+
+  // 기존 파일 삭제 요청
+  document.querySelectorAll('.remove-file-existing').forEach(btn=>{
+    btn.addEventListener('click',async e=>{
+      const filename=e.target.dataset.file;
+      if(confirm(`${filename} 파일을 삭제하시겠습니까?`)){
+        const res=await fetch(`/delete_file/${document.body.dataset.reportId}/${filename}`,{method:'POST'});
+        if(res.ok) e.target.parentElement.remove();
+        else alert('삭제 실패');
+      }
+    });
+  });
+});
@@ -0,0 +1,82 @@
+document.addEventListener("DOMContentLoaded", () => {
+  const addRowBtn = document.getElementById("addRowBtn");
+  const removeRowBtn = document.getElementById("removeRowBtn");
+  const container = document.getElementById("content-container");
+
+  addRowBtn.addEventListener("click", () => {
+    const block = document.createElement("div");
+    block.className = "content-wrapper";
+    block.innerHTML = `
+      <div class="label-row">
+        <span class="label-text">내용</span>
+        <select name="category[]" required>
+          <option value="일 반" selected>일 반</option>
+          <option value="인사행정">인사행정</option>
+          <option value="사건보고">사건보고</option>
+          <option value="구매요청">구매요청</option>
+          <option value="요청사항">요청사항</option>
+          <option value="장비수리">장비수리</option>
+          <option value="특이사항">특이사항</option>
+          <option value="익일업무">익일업무</option>
+        </select>
+      </div>
+      <textarea name="content[]" placeholder="내용을 입력하세요" required></textarea>
+    `;
+    container.appendChild(block);
+  });
+
+  removeRowBtn.addEventListener("click", () => {
+    if (container.children.length > 1) container.lastElementChild.remove();
+  });
+
+  // 📂 드래그 & 드롭 업로드
+  const dropZone = document.getElementById("drop-zone");
+  const fileInput = document.getElementById("fileInput");
+  const fileList = document.getElementById("file-list");
+  let selectedFiles = [];
+
+  dropZone.addEventListener("click", () => fileInput.click());
+  dropZone.addEventListener("dragover", (e) => {
+    e.preventDefault();
+    dropZone.classList.add("dragover");
+  });
+  dropZone.addEventListener("dragleave", () => {
+    dropZone.classList.remove("dragover");
+  });
+  dropZone.addEventListener("drop", (e) => {
+    e.preventDefault();
+    dropZone.classList.remove("dragover");
+    handleFiles(e.dataTransfer.files);
+  });
+  fileInput.addEventListener("change", (e) => handleFiles(e.target.files));
+
+  function handleFiles(files) {
+    for (let f of files) selectedFiles.push(f);
+    updateFileList();
+  }
+
+  function updateFileList() {
+    fileList.innerHTML = "";
+    selectedFiles.forEach((f, idx) => {
+      const item = document.createElement("div");
+      item.innerHTML = `
+        <span>📄 ${f.name}</span>
+        <button type="button" class="remove-file" data-idx="${idx}">❌</button>
+      `;
+      fileList.appendChild(item);
+    });
+    document.querySelectorAll(".remove-file").forEach(btn => {
+      btn.addEventListener("click", (e) => {
+        selectedFiles.splice(e.target.dataset.idx, 1);
+        updateFileList();
+      });
+    });
+  }
+
+  const form = document.querySelector("form");
+  form.addEventListener("submit", (e) => {
+    const dataTransfer = new DataTransfer();
+    selectedFiles.forEach(f => dataTransfer.items.add(f));
+    fileInput.files = dataTransfer.files;
+  });
+});
@@ -0,0 +1,217 @@
+const startInput = document.getElementById("start_date");
+const endInput = document.getElementById("end_date");
+const resetBtn = document.getElementById("resetDate");
+
+// ✅ 날짜 포맷 함수
+const formatDate = (d) => d.toISOString().split("T")[0];
+
+// ✅ 기본값(2주 전 ~ 오늘)
+const today = new Date();
+const twoWeeksAgo = new Date();
+twoWeeksAgo.setDate(today.getDate() - 14);
+
+// ✅ URL 파라미터 읽기
+const urlParams = new URLSearchParams(window.location.search);
+const paramStart = urlParams.get("start_date");
+const paramEnd = urlParams.get("end_date");
+
+// ✅ URL 파라미터가 있으면 그 값을 input에 넣기
+if (paramStart) startInput.value = paramStart;
+if (paramEnd) endInput.value = paramEnd;
+
+// ✅ 파라미터가 없으면 기본값(최초 진입)
+if (!paramStart && !paramEnd) {
+  startInput.value = formatDate(twoWeeksAgo);
+  endInput.value = formatDate(today);
+}
+
+// ✅ 날짜 변경 시 → 페이지 새로고침 없이 첫 페이지 행만 다시 받아 표 교체
+//    (검색 중이면 결과 건수 표시도 바뀌므로 전체 새로고침)
+async function updateList() {
+  const start = startInput.value;
+  const end = endInput.value;
+  if (!start || !end) return;
+  const params = new URLSearchParams(window.location.search);
+  params.set("start_date", start);
+  params.set("end_date", end);
+  if (params.get("search")) {
+    window.location.search = params.toString();
+    return;
+  }
+  try {
+    const res = await fetch(`/list/page?${params.toString()}`, { headers: { "Accept": "application/json" } });
+    if (!res.ok) throw new Error(res.status);
+    const data = await res.json();
+    history.replaceState(null, "", `?${params.toString()}`);
+    rowsBody.innerHTML = data.html;
+    rowsBody.dataset.feedSince = data.feed_since;
+    sentinel.dataset.nextCursor = data.next_cursor || '';
+    sentinel.innerHTML = data.next_cursor ? '<span class="list-loading">불러오는 중...</span>' : '';
+    openFeed();
+  } catch (err) {
+    window.location.search = params.toString();
+  }
+}
+
+startInput.addEventListener("change", updateList);
+endInput.addEventListener("change", updateList);
+
+// ✅ 초기화 버튼 → 기본값으로 복귀
+resetBtn.addEventListener("click", () => {
+  const now = new Date();
+  const ago = new Date();
+  ago.setDate(now.getDate() - 14);
+  startInput.value = formatDate(ago);
+  endInput.value = formatDate(now);
+  updateList();
+});
+
+// ✅ 검색 시 현재 날짜를 hidden input으로 전달
+const searchForm = document.getElementById("searchForm");
+searchForm.addEventListener("submit", () => {
+  document.getElementById("hiddenStart").value = startInput.value;
+  document.getElementById("hiddenEnd").value = endInput.value;
+});
+
+
+// ✅ 첨부파일 클릭 시 팝업 열기 (스크롤로 추가된 행도 처리되도록 테이블에 위임)
+document.getElementById('report-table').addEventListener('click', (e) => {
+      const icon = e.target.closest('.file-icon');
+      if (!icon) return;
+      e.stopPropagation();
+      const row = icon.closest('tr');
+      const dept = row.dataset.department || document.body.dataset.department;
+      const files = JSON.parse(row.dataset.files || "[]");
+
+      const list = document.getElementById('file-list');
+      list.innerHTML = '';
+
+      if (files.length > 0) {
+      files.forEach(file => {
+          // file이 문자열일 수도 있는 예외 대비 (예: 오래된 데이터)
+          if (typeof file === "string") {
+          file = { filename: file, original_name: file, department: document.body.dataset.department };
+          }
+
+          const name = file.filename;
+          const dept = file.department;
+          const displayName = file.original_name || file.filename;
+
+          const li = document.createElement('li');
+          li.style.marginBottom = '6px';
+          li.innerHTML = `
+          <a href="/uploads/${dept}/${encodeURIComponent(name)}" download
+              style="display:inline-block; color:#bde6ff; text-decoration:none; font-weight:500;">
+              📎 ${displayName}
+          </a>`;
+          list.appendChild(li);
+      });
+      if (files.length > 1) {
+          const li = document.createElement('li');
+          li.style.marginTop = '12px';
+          li.innerHTML = `
+          <a href="/view/${row.dataset.reportId}/attachments.zip"
+              style="display:inline-block; color:#fff; text-decoration:none; font-weight:600;">
+              🗜️ 전체 다운로드 (ZIP)
+          </a>`;
+          list.appendChild(li);
+      }
+      } else {
+      list.innerHTML = `<li style="color:#ccc;">첨부된 파일이 없습니다.</li>`;
+      }
+
+
+      document.getElementById('file-popup').style.display = 'block';
+});
+
+// ✅ 무한 스크롤: 목록 끝이 보이면 다음 페이지 행을 이어 붙임
+const sentinel = document.getElementById('list-sentinel');
+const rowsBody = document.getElementById('report-rows');
+let loadingPage = false;
+
+async function loadNextPage() {
+  const cursor = sentinel.dataset.nextCursor;
+  if (!cursor || loadingPage) return;
+  loadingPage = true;
+  const params = new URLSearchParams(window.location.search);
+  params.set("start_date", startInput.value);
+  params.set("end_date", endInput.value);
+  params.set("cursor", cursor);
+  params.set("offset", rowsBody.rows.length);
+  try {
+    const res = await fetch(`/list/page?${params.toString()}`, { headers: { "Accept": "application/json" } });
+    if (!res.ok) throw new Error(res.status);
+    const data = await res.json();
+    rowsBody.insertAdjacentHTML('beforeend', data.html);
+    sentinel.dataset.nextCursor = data.next_cursor || '';
+    if (!data.next_cursor) sentinel.innerHTML = '';
+  } catch (err) {
+    sentinel.innerHTML = '<span class="list-loading">목록을 불러오지 못했습니다.</span>';
+    sentinel.dataset.nextCursor = '';
+  } finally {
+    loadingPage = false;
+  }
+}
+
+// 날짜 변경으로 목록을 다시 그려도 계속 동작하도록 항상 관찰 (커서 없으면 loadNextPage가 무시)
+new IntersectionObserver((entries) => {
+  if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+}, { rootMargin: '400px' }).observe(sentinel);
+
+// ✅ 실시간 갱신 (SSE): 다른 사람이 작성/수정/삭제한 행만 표에서 바로 교체
+let feed = null;
+
+function renumberRows() {
+  if (rowsBody.dataset.numbered !== '1') return;
+  [...rowsBody.rows].forEach((tr, i) => { tr.cells[0].textContent = i + 1; });
+}
+
+function applyListPatch(patch) {
+  patch.removed.forEach(id => {
+    const tr = rowsBody.querySelector(`tr[data-report-id="${id}"]`);
+    if (tr) tr.remove();
+  });
+  patch.rows.forEach(({ id, html }) => {
+    const holder = document.createElement('tbody');
+    holder.innerHTML = html;
+    const row = holder.querySelector('tr');
+    row.classList.add('row-updated');
+    const existing = rowsBody.querySelector(`tr[data-report-id="${id}"]`);
+    if (existing) {
+      existing.replaceWith(row);
+      return;
+    }
+    // 새 행은 번호(최신순) 위치에, 아직 안 불러온 페이지 범위면 스크롤할 때 나오므로 생략
+    const next = [...rowsBody.rows].find(tr => Number(tr.dataset.reportId) < id);
+    if (next) rowsBody.insertBefore(row, next);
+    else if (!sentinel.dataset.nextCursor) rowsBody.appendChild(row);
+  });
+  renumberRows();
+}
+
+function openFeed() {
+  if (!window.EventSource) return;
+  if (feed) feed.close();
+  const params = new URLSearchParams(window.location.search);
+  params.set("since", rowsBody.dataset.feedSince);
+  feed = new EventSource(`/list/events?${params.toString()}`);
+  feed.addEventListener('rows', (e) => applyListPatch(JSON.parse(e.data)));
+  feed.addEventListener('error', () => {
+    // 서버가 연결 수 상한으로 거절(204)하면 자동 재연결이 멈추므로 잠시 후 다시 시도
+    if (feed.readyState === EventSource.CLOSED) setTimeout(openFeed, 60000);
+  });
+}
+
+openFeed();
+
+// 닫기 버튼---
+document.getElementById('popup-close').addEventListener('click', () => {
+    document.getElementById('file-popup').style.display = 'none';
+});
+
+// 배경 클릭 닫기
+document.getElementById('file-popup').addEventListener('click', (e) => {
+    if (e.target.id === 'file-popup') {
+        document.getElementById('file-popup').style.display = 'none';
+    }
+});